@@ -0,0 +1,86 @@
+# standard imports
+import sys
+import os
+import re
+import json
+import time
+import logging
+import argparse
+import subprocess
+
+logging.basicConfig(level=logging.WARNING)
+logg = logging.getLogger()
+
+script_dir = os.path.realpath(os.path.dirname(__file__))
+root_dir = os.path.dirname(script_dir)
+
+token_address = '0x' + '11' * 20
+
+# name and code of each startup path measured
+cases = [
+    ('import', 'import erc20_vend'),
+    ('hook_args', 'import erc20_vend; erc20_vend.args("create")'),
+    ('hook_bytecode', 'import erc20_vend; erc20_vend.bytecode()'),
+    ('hook_create', 'import erc20_vend; erc20_vend.create(token_address="{}", decimals="18")'.format(token_address)),
+    ('vend', 'from erc20_vend import Vend'),
+]
+
+re_importtime = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)$')
+
+argparser = argparse.ArgumentParser(description='Measure startup cost of the erc20_vend package and its chainlib cli hooks')
+argparser.add_argument('-n', type=int, default=5, help='Runs per case, the fastest run is reported')
+argparser.add_argument('--json', action='store_true', help='Output results as json')
+argparser.add_argument('--top', type=int, default=0, help='List the given number of most expensive top level imports per case')
+argparser.add_argument('-v', action='store_true', help='Verbose logging')
+args = argparser.parse_args(sys.argv[1:])
+
+if args.v:
+    logg.setLevel(logging.DEBUG)
+
+
+# Cumulative import time in microseconds of all top level imports, and the top level imports by cost.
+def run(code):
+    env = dict(os.environ)
+    env['PYTHONPATH'] = root_dir + os.pathsep + env.get('PYTHONPATH', '')
+    t = time.perf_counter()
+    p = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], env=env, stderr=subprocess.PIPE, stdout=subprocess.DEVNULL, check=True)
+    wall = time.perf_counter() - t
+    total = 0
+    top = []
+    for l in p.stderr.decode('utf-8').split('\n'):
+        m = re_importtime.match(l)
+        if m == None or len(m.group(3)) > 0:
+            continue
+        total += int(m.group(2))
+        top.append((int(m.group(2)), m.group(4),))
+    top.sort(reverse=True)
+    return (total, wall, top,)
+
+
+def main():
+    r = {}
+    for (name, code) in cases:
+        best = None
+        for i in range(args.n):
+            v = run(code)
+            logg.debug('{} run {} import {}us wall {}s'.format(name, i, v[0], v[1]))
+            if best == None or v[0] < best[0]:
+                best = v
+        r[name] = {
+            'import_us': best[0],
+            'wall_ms': round(best[1] * 1000, 1),
+            'top': best[2][:args.top],
+                }
+
+    if args.json:
+        print(json.dumps(r, indent=2))
+        return
+
+    for name in r.keys():
+        print('{:<16} import {:>9.1f}ms  process {:>7.1f}ms'.format(name, r[name]['import_us'] / 1000, r[name]['wall_ms']))
+        for (us, module) in r[name]['top']:
+            print('    {:>9.1f}ms  {}'.format(us / 1000, module))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,294 @@
+# standard imports
+import sys
+import os
+import json
+import time
+import logging
+import argparse
+import platform
+
+script_dir = os.path.realpath(os.path.dirname(__file__))
+root_dir = os.path.dirname(script_dir)
+sys.path.insert(0, root_dir)
+
+# external imports
+from chainlib.eth.nonce import RPCNonceOracle
+from chainlib.eth.tx import receipt
+from chainlib.eth.contract import ABIContractType
+from eth_erc20 import ERC20
+from giftable_erc20_token import GiftableToken
+
+# local imports
+from erc20_vend import Vend
+from erc20_vend import event
+from erc20_vend.calldata import (
+    STRING_ARRAY,
+    ADDRESS_ARRAY,
+    UINT256_ARRAY,
+)
+from erc20_vend.unittest.base import (
+    TestVendCore,
+    bytecode_has_method,
+)
+from erc20_vend.data import (
+    registry,
+    metadata_hash,
+)
+
+logging.basicConfig(level=logging.WARNING)
+logg = logging.getLogger()
+
+# vend token decimals measured for gas, the last one is replaced by the held token decimals
+# so that one vended unit is one held unit
+gas_decimals = [0, 2, None]
+
+argparser = argparse.ArgumentParser(description='Measure build throughput and on-chain gas of vend operations on the eth-tester backend')
+argparser.add_argument('-n', type=int, default=200, help='Operations per throughput run')
+argparser.add_argument('-r', '--repeat', type=int, default=3, help='Throughput runs per operation, the fastest run is reported')
+argparser.add_argument('-o', '--output', type=str, help='Write results as json to file')
+argparser.add_argument('-i', '--input', type=str, help='Read results from json file instead of measuring')
+argparser.add_argument('--compare', type=str, help='Compare results with baseline json file, exit with error on regression')
+argparser.add_argument('--tolerance', type=float, default=0.2, help='Allowed throughput loss against baseline, as a fraction')
+argparser.add_argument('--gas-tolerance', type=float, default=0.0, help='Allowed gas increase against baseline, as a fraction')
+argparser.add_argument('--skip-throughput', action='store_true', help='Do not measure throughput')
+argparser.add_argument('--skip-gas', action='store_true', help='Do not measure gas')
+argparser.add_argument('--contract-version', dest='contract_version', type=str, help='Vend contract version to measure')
+argparser.add_argument('-v', action='store_true', help='Verbose logging')
+args = argparser.parse_args(sys.argv[1:])
+
+if args.v:
+    logg.setLevel(logging.DEBUG)
+
+
+# Fresh eth-tester chain with the held token deployed, from the test fixtures.
+def chain():
+    case = TestVendCore('publish')
+    case.setUp()
+    return case
+
+
+def mode_name(mint, clone=False):
+    r = 'supply'
+    if mint:
+        r = 'mint'
+    if clone:
+        r += '-clone'
+    return r
+
+
+def send(case, tx):
+    (tx_hash, o) = tx
+    case.rpc.do(o)
+    o = receipt(tx_hash)
+    r = case.rpc.do(o)
+    if r['status'] != 1:
+        raise RuntimeError('tx {} reverted'.format(tx_hash))
+    return r
+
+
+# Operations per second of the fastest of the repeated runs.
+def rate(fn):
+    best = None
+    for i in range(args.repeat):
+        t = time.perf_counter()
+        for j in range(args.n):
+            fn()
+        v = time.perf_counter() - t
+        if best == None or v < best:
+            best = v
+    return round(args.n / best, 1)
+
+
+def throughput():
+    case = chain()
+    case.publish(version=args.contract_version)
+    nonce_oracle = RPCNonceOracle(case.accounts[0], conn=case.conn)
+    c = Vend(case.chain_spec, signer=case.signer, nonce_oracle=nonce_oracle)
+    r = send(case, c.create(case.vend_address, case.accounts[0], 'foo vend', 'FOOVEND'))
+    o = c.get_token(case.vend_address, 0, sender_address=case.accounts[0])
+    token_result = case.rpc.do(o)
+    vended_token_address = c.parse_token(token_result)
+
+    # a deposit receipt has the held token transfer, and the vended token mint or transfer logs
+    nonce_oracle_alice = RPCNonceOracle(case.alice, conn=case.conn)
+    c_token = GiftableToken(case.chain_spec, signer=case.signer, nonce_oracle=nonce_oracle)
+    send(case, c_token.mint_to(case.token_address, case.accounts[0], case.alice, 10 ** case.token_decimals))
+    c_token = ERC20(case.chain_spec, signer=case.signer, nonce_oracle=nonce_oracle_alice)
+    send(case, c_token.approve(case.token_address, case.alice, case.vend_address, 10 ** case.token_decimals))
+    c_alice = Vend(case.chain_spec, signer=case.signer, nonce_oracle=nonce_oracle_alice)
+    logs = send(case, c_alice.deposit(case.vend_address, case.alice, vended_token_address))['logs']
+    logs += r['logs']
+
+    cases = [
+        ('build_constructor', lambda: c.constructor(case.accounts[0], case.token_address, version=args.contract_version)),
+        ('build_create', lambda: c.create(case.vend_address, case.accounts[0], 'foo vend', 'FOOVEND')),
+        ('build_deposit', lambda: c.deposit(case.vend_address, case.accounts[0], vended_token_address)),
+        ('build_withdraw', lambda: c.withdraw(case.vend_address, case.accounts[0], vended_token_address)),
+        ('build_get_token', lambda: c.get_token(case.vend_address, 0, sender_address=case.accounts[0])),
+        ('parse_token', lambda: c.parse_token(token_result)),
+        ('parse_logs', lambda: event.parse_logs(logs)),
+    ]
+    r = {}
+    for (name, fn) in cases:
+        r[name] = rate(fn)
+        logg.info('{} {} ops/s'.format(name, r[name]))
+    return r
+
+
+# Gas used by each vend operation for one contract mode, on a fresh chain.
+def gas(mint, decimals, clone=False):
+    case = chain()
+    if decimals == None:
+        decimals = case.token_decimals
+    prefix = '{}/{}/'.format(mode_name(mint, clone), decimals)
+    version = args.contract_version
+    r = {}
+
+    # held tokens are minted first, since the vended supply is taken from the held supply
+    amount = 100 * (10 ** case.token_decimals)
+    vend_amount = amount // (10 ** (case.token_decimals - decimals))
+    nonce_oracle = RPCNonceOracle(case.accounts[0], conn=case.conn)
+    c_token = GiftableToken(case.chain_spec, signer=case.signer, nonce_oracle=nonce_oracle)
+    send(case, c_token.mint_to(case.token_address, case.accounts[0], case.alice, amount))
+    for holder in [case.accounts[3], case.accounts[4]]:
+        send(case, c_token.mint_to(case.token_address, case.accounts[0], holder, amount))
+
+    c = Vend(case.chain_spec, signer=case.signer, nonce_oracle=nonce_oracle)
+    logg.info('measuring gas for {} mode with {} decimals'.format(mode_name(mint, clone), decimals))
+    v = send(case, c.constructor(case.accounts[0], case.token_address, mint=mint, decimals=decimals, version=version, clone=clone))
+    r[prefix + 'constructor'] = v['gas_used']
+    vend_address = v['contract_address']
+
+    v = send(case, c.create(vend_address, case.accounts[0], 'foo vend', 'FOOVEND'))
+    r[prefix + 'create'] = v['gas_used']
+    o = c.get_token(vend_address, 0, sender_address=case.accounts[0])
+    vended_token_address = c.parse_token(case.rpc.do(o))
+
+    nonce_oracle = RPCNonceOracle(case.alice, conn=case.conn)
+    c_token = ERC20(case.chain_spec, signer=case.signer, nonce_oracle=nonce_oracle)
+    send(case, c_token.approve(case.token_address, case.alice, vend_address, amount))
+    send(case, c_token.approve(vended_token_address, case.alice, vend_address, vend_amount))
+    c = Vend(case.chain_spec, signer=case.signer, nonce_oracle=nonce_oracle)
+    v = send(case, c.deposit(vend_address, case.alice, vended_token_address))
+    r[prefix + 'deposit'] = v['gas_used']
+    v = send(case, c.withdraw(vend_address, case.alice, vended_token_address))
+    r[prefix + 'withdraw'] = v['gas_used']
+
+    # methods missing from older artifacts are left out
+    if bytecode_has_method('createMany', [STRING_ARRAY, STRING_ARRAY], version=version):
+        nonce_oracle = RPCNonceOracle(case.accounts[0], conn=case.conn)
+        c = Vend(case.chain_spec, signer=case.signer, nonce_oracle=nonce_oracle)
+        v = send(case, c.create_many_tokens(vend_address, case.accounts[0], ['bar vend', 'baz vend'], ['BARVEND', 'BAZVEND']))
+        r[prefix + 'create_many_2'] = v['gas_used']
+    if bytecode_has_method('distribute', [ABIContractType.ADDRESS, ADDRESS_ARRAY, UINT256_ARRAY], version=version):
+        nonce_oracle = RPCNonceOracle(case.accounts[0], conn=case.conn)
+        c = Vend(case.chain_spec, signer=case.signer, nonce_oracle=nonce_oracle)
+        v = send(case, c.distribute(vend_address, case.accounts[0], vended_token_address, [case.accounts[3], case.accounts[4]], [amount, amount]))
+        r[prefix + 'distribute_2'] = v['gas_used']
+    return r
+
+
+# Metadata hash of the measured contract code, which changes with any change of the contract source or build.
+def contract_hash():
+    h = metadata_hash(registry.get(args.contract_version).code)
+    if h == None:
+        return None
+    return h.hex()
+
+
+def measure():
+    r = {
+        'meta': {
+            'python': platform.python_version(),
+            'contract_version': args.contract_version,
+            'contract_hash': contract_hash(),
+            'n': args.n,
+            'repeat': args.repeat,
+            'time': int(time.time()),
+            },
+        'throughput': {},
+        'gas': {},
+            }
+    if not args.skip_throughput:
+        r['throughput'] = throughput()
+    if not args.skip_gas:
+        # clone mode is measured only if the contract has it
+        clones = [False]
+        if bytecode_has_method('tokenImplementation', version=args.contract_version):
+            clones.append(True)
+        for clone in clones:
+            for mint in [False, True]:
+                for decimals in gas_decimals:
+                    r['gas'].update(gas(mint, decimals, clone=clone))
+    return r
+
+
+# Regressions of the results against the baseline; keys missing on either side are reported but not failed,
+# and sections that were not measured are not compared. Gas is not compared if the baseline was measured
+# on other contract code, since then the difference is not a regression but a stale baseline.
+def compare(r, baseline):
+    regressions = []
+    if len(r['throughput']) == 0:
+        baseline['throughput'] = {}
+    if len(r['gas']) == 0:
+        baseline['gas'] = {}
+    h = baseline.get('meta', {}).get('contract_hash')
+    if len(baseline['gas']) > 0 and h != r['meta'].get('contract_hash'):
+        logg.warning('baseline gas was measured on contract code {}, not {}; regenerate the baseline with --output'.format(h, r['meta'].get('contract_hash')))
+        baseline['gas'] = {}
+    for k in sorted(baseline.get('throughput', {}).keys()):
+        v = r['throughput'].get(k)
+        b = baseline['throughput'][k]
+        if v == None:
+            logg.warning('throughput {} in baseline only'.format(k))
+            continue
+        change = (v - b) / b
+        line = 'throughput {:<24} {:>12.1f} ops/s  baseline {:>12.1f}  {:+.1%}'.format(k, v, b, change)
+        if v < b * (1 - args.tolerance):
+            regressions.append(line)
+        print(line)
+    for k in sorted(baseline.get('gas', {}).keys()):
+        v = r['gas'].get(k)
+        b = baseline['gas'][k]
+        if v == None:
+            logg.warning('gas {} in baseline only'.format(k))
+            continue
+        line = 'gas        {:<24} {:>12}        baseline {:>12}  {:+d}'.format(k, v, b, v - b)
+        if v > b * (1 + args.gas_tolerance):
+            regressions.append(line)
+        print(line)
+    return regressions
+
+
+def main():
+    if args.input != None:
+        f = open(args.input, 'r')
+        r = json.load(f)
+        f.close()
+    else:
+        r = measure()
+
+    if args.output != None:
+        f = open(args.output, 'w')
+        json.dump(r, f, indent=2, sort_keys=True)
+        f.write('\n')
+        f.close()
+
+    if args.compare == None:
+        if args.output == None:
+            print(json.dumps(r, indent=2, sort_keys=True))
+        return
+
+    f = open(args.compare, 'r')
+    baseline = json.load(f)
+    f.close()
+    regressions = compare(r, baseline)
+    if len(regressions) > 0:
+        sys.stderr.write('{} regressions against {}:\n'.format(len(regressions), args.compare))
+        for l in regressions:
+            sys.stderr.write(l + '\n')
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
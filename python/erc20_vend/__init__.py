@@ -1,4 +1,20 @@
-from .vend import Vend
-from .vend import bytecode
-from .vend import create
-from .vend import args
+# standard imports
+import importlib
+
+# Loaded on first use, so that the chainlib cli hooks, the artifacts and the calldata
+# templates can be used without loading the transaction machinery.
+lazy = {
+    'Vend': 'erc20_vend.vend',
+    'bytecode': 'erc20_vend.hooks',
+    'create': 'erc20_vend.hooks',
+    'args': 'erc20_vend.hooks',
+}
+
+
+def __getattr__(name):
+    m = lazy.get(name)
+    if m == None:
+        raise AttributeError('module {} has no attribute {}'.format(__name__, name))
+    v = getattr(importlib.import_module(m), name)
+    globals()[name] = v
+    return v
@@ -0,0 +1,249 @@
+# standard imports
+import logging
+import json
+import base64
+import asyncio
+import queue
+import http.client
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+
+# external imports
+from chainlib.jsonrpc import (
+    ErrorParser,
+    jsonrpc_result,
+)
+from chainlib.error import RPCException
+from chainlib.eth.constant import ZERO_ADDRESS
+from eth_erc20 import ERC20
+
+# local imports
+from erc20_vend.vend import Vend
+
+logg = logging.getLogger(__name__)
+
+error_parser = ErrorParser()
+
+
+def parse_response(o, result, error_parser=error_parser):
+    if not isinstance(result, list):
+        if o['id'] != result['id']:
+            raise ValueError('RPC id mismatch; sent {} received {}'.format(o['id'], result['id']))
+        return jsonrpc_result(result, error_parser)
+    results = []
+    for i in range(len(o)):
+        if o[i]['id'] != result[i]['id']:
+            raise ValueError('RPC id mismatch; sent {} received {}'.format(o[i]['id'], result[i]['id']))
+        results.append(jsonrpc_result(result[i], error_parser))
+    return results
+
+
+class AsyncHTTPConnection:
+    """Awaitable json-rpc connection over a pool of persistent HTTP connections.
+
+    Requests are run on a thread pool of the same size as the connection pool, so the event loop is never blocked by a round trip.
+
+    :param url: Node url, optionally with basic auth credentials
+    :type url: str
+    :param pool_size: Maximum number of open connections
+    :type pool_size: int
+    :param timeout: Socket timeout in seconds
+    :type timeout: float
+    """
+    def __init__(self, url, pool_size=8, timeout=10.0):
+        u = urllib.parse.urlsplit(url)
+        self.scheme = u.scheme
+        self.host = u.hostname
+        self.port = u.port
+        self.path = u.path
+        if self.path == '':
+            self.path = '/'
+        if u.query != '':
+            self.path += '?' + u.query
+        self.headers = {
+            'Content-Type': 'application/json',
+                }
+        if u.username != None:
+            v = '{}:{}'.format(urllib.parse.unquote(u.username), urllib.parse.unquote(u.password or ''))
+            self.headers['Authorization'] = 'Basic ' + base64.b64encode(v.encode('utf-8')).decode('utf-8')
+        self.timeout = timeout
+        self.pool = queue.LifoQueue()
+        self.executor = ThreadPoolExecutor(max_workers=pool_size)
+
+
+    def __connect(self):
+        if self.scheme == 'https':
+            return http.client.HTTPSConnection(self.host, self.port, timeout=self.timeout)
+        return http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+
+
+    # A pooled connection may have been closed by the server while idle,
+    # in which case the request is retried once on a new connection.
+    def __request(self, data):
+        try:
+            conn = self.pool.get_nowait()
+            fresh = False
+        except queue.Empty:
+            conn = self.__connect()
+            fresh = True
+        while True:
+            try:
+                conn.request('POST', self.path, body=data, headers=self.headers)
+                resp = conn.getresponse()
+                body = resp.read()
+                break
+            except (http.client.HTTPException, OSError) as e:
+                conn.close()
+                if fresh:
+                    raise RPCException(e)
+                conn = self.__connect()
+                fresh = True
+        if resp.status != 200:
+            conn.close()
+            raise RPCException('http status {}: {}'.format(resp.status, body))
+        self.pool.put(conn)
+        return body
+
+
+    async def do(self, o, error_parser=error_parser):
+        data = json.dumps(o).encode('utf-8')
+        loop = asyncio.get_running_loop()
+        r = await loop.run_in_executor(self.executor, self.__request, data)
+        return parse_response(o, json.loads(r), error_parser=error_parser)
+
+
+    def close(self):
+        self.executor.shutdown(wait=True)
+        while True:
+            try:
+                self.pool.get_nowait().close()
+            except queue.Empty:
+                break
+
+
+class AsyncConnectionAdapter:
+    """Awaitable wrapper for a synchronous chainlib connection.
+
+    :param conn: RPC connection
+    :type conn: chainlib.connection.RPCConnection
+    :param workers: Number of threads calling the connection, 1 for connections that are not thread-safe
+    :type workers: int
+    """
+    def __init__(self, conn, workers=1):
+        self.conn = conn
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+
+
+    async def do(self, o, error_parser=error_parser):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, self.conn.do, o)
+
+
+    def close(self):
+        self.executor.shutdown(wait=True)
+
+
+class AsyncVend:
+    """Awaitable read paths of the vend contract and the ERC20 tokens around it.
+
+    At most the given number of requests are sent at the same time. Identical eth_call requests that are in flight at the same time are sent only once, and all callers get the same result.
+
+    :param chain_spec: Chain spec
+    :type chain_spec: chainlib.chain.ChainSpec
+    :param conn: Awaitable connection
+    :type conn: erc20_vend.aio.AsyncHTTPConnection or erc20_vend.aio.AsyncConnectionAdapter
+    :param concurrency: Maximum number of requests in flight
+    :type concurrency: int
+    """
+    def __init__(self, chain_spec, conn, concurrency=64, id_generator=None):
+        self.vend = Vend(chain_spec)
+        self.erc20 = ERC20(chain_spec)
+        self.conn = conn
+        self.concurrency = concurrency
+        self.id_generator = id_generator
+        self.semaphore = None
+        self.inflight = {}
+        self.coalesced = 0
+
+
+    async def __do(self, o):
+        if self.semaphore == None:
+            self.semaphore = asyncio.Semaphore(self.concurrency)
+        async with self.semaphore:
+            return await self.conn.do(o)
+
+
+    async def call(self, o):
+        """Send a json-rpc request, sharing the response with identical eth_call requests in flight.
+
+        :param o: json-rpc request
+        :type o: dict
+        :rtype: any
+        :returns: Result of the request
+        """
+        if o['method'] != 'eth_call':
+            return await self.__do(o)
+        k = json.dumps(o['params'], sort_keys=True)
+        task = self.inflight.get(k)
+        if task != None:
+            self.coalesced += 1
+        else:
+            task = asyncio.ensure_future(self.__do(o))
+            self.inflight[k] = task
+            task.add_done_callback(lambda t: self.inflight.pop(k, None))
+        # a cancelled caller must not cancel the request shared with the others
+        return await asyncio.shield(task)
+
+
+    async def get_token(self, contract_address, token_idx, sender_address=ZERO_ADDRESS):
+        o = self.vend.get_token(contract_address, token_idx, sender_address=sender_address, id_generator=self.id_generator)
+        r = await self.call(o)
+        return self.vend.parse_token(r)
+
+
+    async def token_count(self, contract_address, sender_address=ZERO_ADDRESS):
+        o = self.vend.token_count(contract_address, sender_address=sender_address, id_generator=self.id_generator)
+        r = await self.call(o)
+        return self.vend.parse_token_count(r)
+
+
+    async def get_tokens(self, contract_address, offset, count, sender_address=ZERO_ADDRESS):
+        o = self.vend.get_tokens(contract_address, offset, count, sender_address=sender_address, id_generator=self.id_generator)
+        r = await self.call(o)
+        return self.vend.parse_tokens(r)
+
+
+    async def token_implementation(self, contract_address, sender_address=ZERO_ADDRESS):
+        o = self.vend.token_implementation(contract_address, sender_address=sender_address, id_generator=self.id_generator)
+        r = await self.call(o)
+        return self.vend.parse_token_implementation(r)
+
+
+    async def balance_of(self, token_address, holder_address, sender_address=ZERO_ADDRESS):
+        o = self.erc20.balance_of(token_address, holder_address, sender_address=sender_address, id_generator=self.id_generator)
+        r = await self.call(o)
+        return self.erc20.parse_balance(r)
+
+
+    async def allowance(self, token_address, holder_address, spender_address, sender_address=ZERO_ADDRESS):
+        o = self.erc20.allowance(token_address, holder_address, spender_address, sender_address=sender_address, id_generator=self.id_generator)
+        r = await self.call(o)
+        return self.erc20.parse_allowance(r)
+
+
+    async def vendable(self, contract_address, token_address, holder_address, sender_address=ZERO_ADDRESS):
+        """Balance of the held token, and how much of it the vend contract may take on deposit.
+
+        :param contract_address: Vend contract address
+        :type contract_address: str
+        :param token_address: Held token address, the default token of the vend contract
+        :type token_address: str
+        :param holder_address: Holder address
+        :type holder_address: str
+        :rtype: tuple
+        :returns: Balance and allowance of the holder
+        """
+        return tuple(await asyncio.gather(
+            self.balance_of(token_address, holder_address, sender_address=sender_address),
+            self.allowance(token_address, holder_address, contract_address, sender_address=sender_address),
+            ))
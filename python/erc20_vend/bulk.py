@@ -0,0 +1,217 @@
+# standard imports
+import logging
+import json
+import csv
+import collections
+
+# external imports
+from chainlib.error import JSONRPCException
+
+# local imports
+from erc20_vend.pipeline import TxPipeline
+
+logg = logging.getLogger(__name__)
+
+# operation names, and the fields each of them requires
+ops = {
+    'create': ['name', 'symbol'],
+    'deposit': ['token'],
+    'withdraw': ['token'],
+    'get-token': ['idx'],
+}
+
+
+def read_jsonl(f):
+    """Read operations from a file with one json object per line.
+
+    Empty lines and lines starting with # are skipped.
+
+    :rtype: generator
+    :returns: Line number and operation
+    """
+    for i, l in enumerate(f):
+        l = l.strip()
+        if l == '' or l[0] == '#':
+            continue
+        yield (i + 1, json.loads(l),)
+
+
+def read_csv(f):
+    """Read operations from a csv file with a header row naming the fields.
+
+    Empty fields are omitted from the operation.
+
+    :rtype: generator
+    :returns: Line number and operation
+    """
+    reader = csv.DictReader(f)
+    for row in reader:
+        op = {}
+        for k in row.keys():
+            v = row[k]
+            if k == None or v == None:
+                continue
+            v = v.strip()
+            if v != '':
+                op[k.strip()] = v
+        if len(op) == 0:
+            continue
+        yield (reader.line_num, op,)
+
+
+readers = {
+    'jsonl': read_jsonl,
+    'csv': read_csv,
+}
+
+
+class VendBulk:
+    """Run a stream of vend operations over one connection and one nonce oracle.
+
+    Transactions are sent as they are built through a transaction pipeline, with up to the given number of them waiting for their receipt at the same time. Results are written in operation order, each as soon as it and all results before it are known.
+
+    If a transaction cannot be sent the nonces of the following ones would be wrong, so the run stops after the pending transactions have been written.
+
+    :param conn: RPC connection
+    :type conn: chainlib.connection.RPCConnection
+    :param vend: Vend builder with signer and nonce oracle for the sender
+    :type vend: erc20_vend.Vend
+    :param contract_address: Vend contract address
+    :type contract_address: str
+    :param sender_address: Transaction sender
+    :type sender_address: str
+    :param max_inflight: Maximum number of transactions waiting for receipt
+    :type max_inflight: int
+    :param send: Send transactions, otherwise the signed transactions are written with the results
+    :type send: bool
+    :param wait: Wait for receipts, otherwise results are written when the transaction is sent
+    :type wait: bool
+    :param poll_interval: Initial seconds between receipt polls, see erc20_vend.pipeline.TxPipeline
+    :type poll_interval: float
+    :param id_generator: json-rpc id generator
+    :type id_generator: chainlib.connection.JSONRPCIdGenerator
+    """
+    def __init__(self, conn, vend, contract_address, sender_address, max_inflight=16, send=True, wait=True, poll_interval=0.5, id_generator=None):
+        self.conn = conn
+        self.vend = vend
+        self.contract_address = contract_address
+        self.sender_address = sender_address
+        self.max_inflight = max_inflight
+        self.send = send
+        self.wait = wait and send
+        self.id_generator = id_generator
+        self.pipeline = TxPipeline(conn, max_inflight=max_inflight, poll_interval=poll_interval, id_generator=id_generator)
+        self.pending = collections.deque()
+
+
+    def __write(self, w, r):
+        w.write(json.dumps(r) + '\n')
+        w.flush()
+
+
+    def __done(self, r):
+        return not self.wait or r.get('tx_hash') == None or r.get('status') != None
+
+
+    # Results up to the first transaction without receipt are written, and
+    # polling continues until no more than the given number are in flight.
+    def __drain(self, w, limit=0):
+        while True:
+            while len(self.pending) > 0 and self.__done(self.pending[0]):
+                self.__write(w, self.pending.popleft())
+            if len(self.pipeline) <= limit:
+                return
+            for v in self.pipeline.wait():
+                v.tag['status'] = v.status
+
+
+    def __build(self, op):
+        method = op['op']
+        if method == 'create':
+            return self.vend.create(self.contract_address, self.sender_address, op['name'], op['symbol'], id_generator=self.id_generator)
+        elif method == 'deposit':
+            return self.vend.deposit(self.contract_address, self.sender_address, op['token'], id_generator=self.id_generator)
+        elif method == 'withdraw':
+            return self.vend.withdraw(self.contract_address, self.sender_address, op['token'], id_generator=self.id_generator)
+
+
+    def process(self, line, op):
+        """Run one operation.
+
+        :param line: Input line number, copied to the result
+        :type line: int
+        :param op: Operation, with the operation name in the op field
+        :type op: dict
+        :raises chainlib.error.JSONRPCException: Transaction could not be sent
+        """
+        r = {
+            'line': line,
+            'op': op.get('op'),
+                }
+        method = op.get('op')
+        if method not in ops:
+            r['error'] = 'unknown operation {}'.format(method)
+            self.pending.append(r)
+            return
+        for k in ops[method]:
+            if op.get(k) == None:
+                r['error'] = 'missing field {}'.format(k)
+                self.pending.append(r)
+                return
+
+        # invalid field values are found when encoding, before a nonce is taken
+        try:
+            if method == 'get-token':
+                o = self.vend.get_token(self.contract_address, int(op['idx']), sender_address=self.sender_address, id_generator=self.id_generator)
+            else:
+                (tx_hash, o) = self.__build(op)
+        except ValueError as e:
+            r['error'] = str(e)
+            self.pending.append(r)
+            return
+
+        if method == 'get-token':
+            try:
+                r['token'] = self.vend.parse_token(self.conn.do(o))
+            except JSONRPCException as e:
+                r['error'] = str(e)
+            self.pending.append(r)
+            return
+
+        r['tx_hash'] = tx_hash
+        if not self.send:
+            r['tx'] = o['params'][0]
+            self.pending.append(r)
+            return
+        try:
+            if self.wait:
+                self.pipeline.submit(tx_hash, o, tag=r)
+            else:
+                self.conn.do(o)
+        except JSONRPCException as e:
+            del r['tx_hash']
+            r['error'] = str(e)
+            self.pending.append(r)
+            raise e
+        self.pending.append(r)
+
+
+    def run(self, source, w):
+        """Run all operations, writing one json result line per operation.
+
+        :param source: Line number and operation pairs, as from read_jsonl or read_csv
+        :type source: iterable
+        :param w: Result output
+        :type w: file
+        :rtype: int
+        :returns: Number of operations run
+        """
+        c = 0
+        try:
+            for (line, op) in source:
+                self.process(line, op)
+                c += 1
+                self.__drain(w, limit=self.max_inflight - 1)
+        finally:
+            self.__drain(w)
+        return c
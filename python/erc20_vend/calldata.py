@@ -0,0 +1,209 @@
+# standard imports
+import logging
+
+# external imports
+from chainlib.eth.contract import (
+    ABIContractEncoder,
+    ABIContractType,
+)
+from chainlib.hash import keccak256_string_to_hex
+from hexathon import strip_0x
+
+logg = logging.getLogger(__name__)
+
+zero_word = '00' * 32
+
+
+def uint256_word(v):
+    v = int(v)
+    if v < 0 or v >> 256 > 0:
+        raise ValueError('value {} out of range for uint256'.format(v))
+    return format(v, '064x')
+
+
+# Case of the input is kept, as for chainlib.eth.contract.ABIContractEncoder.address
+def address_word(v):
+    v = strip_0x(v)
+    if len(v) != 40:
+        raise ValueError('value wrong size; expected 40, got {}'.format(len(v)))
+    bytes.fromhex(v)
+    return '000000000000000000000000' + v
+
+
+def bool_word(v):
+    if bool(v):
+        return uint256_word(1)
+    return zero_word
+
+
+# Length word, content and padding. As with chainlib.eth.contract.ABIContractEncoder,
+# content already on a word boundary gets a full word of padding.
+def bytes_tail(b):
+    l = len(b)
+    return format(l, '064x') + b.hex() + '00' * (32 - (l % 32))
+
+
+def string_tail(v):
+    return bytes_tail(v.encode('utf-8'))
+
+
+def dynamic_bytes_tail(v):
+    return bytes_tail(bytes.fromhex(strip_0x(v)))
+
+
+# Element of a bytes array. There is no reference encoder for arrays in chainlib, so the
+# content is padded to the word boundary only.
+def bytes_element(v):
+    b = bytes.fromhex(strip_0x(v, allow_empty=True))
+    l = len(b)
+    return format(l, '064x') + b.hex() + '00' * ((32 - (l % 32)) % 32)
+
+
+def address_array_tail(v):
+    return format(len(v), '064x') + ''.join([address_word(x) for x in v])
+
+
+def uint256_array_tail(v):
+    return format(len(v), '064x') + ''.join([uint256_word(x) for x in v])
+
+
+def string_element(v):
+    return bytes_element(v.encode('utf-8').hex())
+
+
+# Length word, element offsets relative to the first offset word, then the elements.
+def dynamic_array_tail(v, element):
+    heads = []
+    tails = []
+    cursor = 32 * len(v)
+    for x in v:
+        t = element(x)
+        heads.append(format(cursor, '064x'))
+        tails.append(t)
+        cursor += len(t) >> 1
+    return format(len(v), '064x') + ''.join(heads) + ''.join(tails)
+
+
+def bytes_array_tail(v):
+    return dynamic_array_tail(v, bytes_element)
+
+
+def string_array_tail(v):
+    return dynamic_array_tail(v, string_element)
+
+
+ADDRESS_ARRAY = 'address[]'
+UINT256_ARRAY = 'uint256[]'
+BYTES_ARRAY = 'bytes[]'
+STRING_ARRAY = 'string[]'
+
+
+static_encoders = {
+    ABIContractType.UINT256: uint256_word,
+    ABIContractType.UINT128: uint256_word,
+    ABIContractType.UINT64: uint256_word,
+    ABIContractType.UINT32: uint256_word,
+    ABIContractType.UINT16: uint256_word,
+    ABIContractType.UINT8: uint256_word,
+    ABIContractType.ADDRESS: address_word,
+    ABIContractType.BOOLEAN: bool_word,
+}
+
+dynamic_encoders = {
+    ABIContractType.STRING: string_tail,
+    ABIContractType.BYTES: dynamic_bytes_tail,
+    ADDRESS_ARRAY: address_array_tail,
+    UINT256_ARRAY: uint256_array_tail,
+    BYTES_ARRAY: bytes_array_tail,
+    STRING_ARRAY: string_array_tail,
+}
+
+
+class CalldataTemplate:
+    """Contract input data encoder with method selector and constant arguments computed once.
+
+    Output is identical to chainlib.eth.contract.ABIContractEncoder for the same method and values.
+
+    :param method: Method name
+    :type method: str
+    :param types: Argument types
+    :type types: list of chainlib.eth.contract.ABIContractType, or the array types of this module
+    :param fixed: Argument values that are the same for every call, by argument position
+    :type fixed: dict
+    """
+    def __init__(self, method, types=[], fixed={}):
+        arrays = False
+        enc = ABIContractEncoder()
+        enc.method(method)
+        for typ in types:
+            if isinstance(typ, str):
+                arrays = True
+            else:
+                enc.typ(typ)
+        if arrays:
+            self.signature = '{}({})'.format(method, ','.join([getattr(typ, 'value', typ) for typ in types]))
+            self.selector = keccak256_string_to_hex(self.signature)[:8]
+        else:
+            self.signature = enc.get_method()
+            self.selector = enc.get_method_signature()
+        self.types = list(types)
+        self.head_size = 32 * len(self.types)
+        self.encoders = []
+        self.fixed = []
+        for i, typ in enumerate(self.types):
+            if typ in dynamic_encoders:
+                self.encoders.append(dynamic_encoders[typ])
+            elif typ in static_encoders:
+                self.encoders.append(static_encoders[typ])
+            else:
+                raise NotImplementedError('no template encoder for type {}'.format(getattr(typ, 'value', typ)))
+            if i in fixed:
+                self.fixed.append(self.encoders[i](fixed[i]))
+            else:
+                self.fixed.append(None)
+        self.arg_count = self.fixed.count(None)
+        logg.debug('calldata template {} selector {}'.format(self.signature, self.selector))
+
+
+    def encode(self, *args):
+        """Encode input data for the non-fixed arguments, in argument order.
+
+        :rtype: str
+        :returns: Contract input data, in hex without 0x prefix
+        """
+        if len(args) != self.arg_count:
+            raise ValueError('{} expects {} arguments, got {}'.format(self.signature, self.arg_count, len(args)))
+        r = [self.selector]
+        tail = []
+        cursor = self.head_size
+        j = 0
+        for i in range(len(self.types)):
+            v = self.fixed[i]
+            if v == None:
+                v = self.encoders[i](args[j])
+                j += 1
+            if self.types[i] in dynamic_encoders:
+                tail.append(v)
+                r.append(format(cursor, '064x'))
+                cursor += len(v) >> 1
+            else:
+                r.append(v)
+        return ''.join(r + tail)
+
+
+create = CalldataTemplate('create', [ABIContractType.STRING, ABIContractType.STRING])
+create_many = CalldataTemplate('createMany', [STRING_ARRAY, STRING_ARRAY])
+deposit = CalldataTemplate('deposit', [ABIContractType.ADDRESS, ABIContractType.UINT256], fixed={1: 0})
+deposit_many = CalldataTemplate('depositMany', [ADDRESS_ARRAY, UINT256_ARRAY])
+withdraw = CalldataTemplate('withdraw', [ABIContractType.ADDRESS, ABIContractType.UINT256], fixed={1: 0})
+get_token_by_index = CalldataTemplate('getTokenByIndex', [ABIContractType.UINT256])
+token_count = CalldataTemplate('tokenCount')
+token_implementation = CalldataTemplate('tokenImplementation')
+get_tokens = CalldataTemplate('getTokens', [ABIContractType.UINT256, ABIContractType.UINT256])
+aggregate = CalldataTemplate('aggregate', [ADDRESS_ARRAY, BYTES_ARRAY])
+balance_of = CalldataTemplate('balanceOf', [ABIContractType.ADDRESS])
+allowance = CalldataTemplate('allowance', [ABIContractType.ADDRESS, ABIContractType.ADDRESS])
+used_by = CalldataTemplate('usedBy', [ABIContractType.ADDRESS, ABIContractType.ADDRESS])
+used_by_many = CalldataTemplate('usedByMany', [ADDRESS_ARRAY, ABIContractType.ADDRESS])
+returned = CalldataTemplate('returned', [ABIContractType.ADDRESS])
+distribute = CalldataTemplate('distribute', [ABIContractType.ADDRESS, ADDRESS_ARRAY, UINT256_ARRAY])
@@ -1,3 +1,173 @@
 import os
+import json
+import hashlib
+import logging
+import collections
+
+logg = logging.getLogger(__name__)
 
 data_dir = os.path.realpath(os.path.dirname(__file__))
+
+# contract artifact names by version; None is the reference implementation, and
+# optimized uses immutables and typed token calls to save gas on deposit and withdraw
+versions = {
+    None: 'Vend',
+    'optimized': 'VendOptimized',
+}
+
+# the multicall aggregator has a single version
+multicall_versions = {
+    None: 'Multicall',
+}
+
+# number of contract versions kept in memory
+default_cache_size = 4
+
+
+def varint(v):
+    r = b''
+    while True:
+        b = v & 0x7f
+        v >>= 7
+        if v == 0:
+            return r + bytes([b])
+        r += bytes([b | 0x80])
+
+
+# IPFS hash of a file small enough for a single block, as solc computes it for the metadata hash.
+def ipfs_hash(v):
+    unixfs = b'\x08\x02\x12' + varint(len(v)) + v + b'\x18' + varint(len(v))
+    node = b'\x0a' + varint(len(unixfs)) + unixfs
+    return b'\x12\x20' + hashlib.sha256(node).digest()
+
+
+# IPFS metadata hash in the CBOR trailer of contract code, or None if there is none.
+def metadata_hash(code):
+    l = int.from_bytes(code[-2:], 'big')
+    trailer = code[-2-l:-2]
+    i = trailer.find(b'\x64ipfs\x58\x22')
+    if i == -1:
+        return None
+    i += 7
+    return trailer[i:i+34]
+
+
+class Artifact:
+    """Compiled contract code and interface of one contract version.
+
+    The code is decoded from hex once. The hex string and the interface are loaded on first use.
+
+    :param name: Artifact file name without extension
+    :type name: str
+    :param path: Artifact directory
+    :type path: str
+    """
+    def __init__(self, name, path=data_dir):
+        self.name = name
+        self.path = path
+        f = open(self.__path('.bin'), 'r')
+        self.code = bytes.fromhex(f.read().strip())
+        f.close()
+        self.__hex = None
+        self.__abi = None
+
+
+    def __path(self, ext):
+        return os.path.join(self.path, self.name + ext)
+
+
+    def hex(self):
+        if self.__hex == None:
+            self.__hex = self.code.hex()
+        return self.__hex
+
+
+    # True if the selector is pushed by the method dispatcher of the code.
+    def has_selector(self, selector):
+        return '63' + selector.lower() in self.hex()
+
+
+    def abi(self):
+        if self.__abi == None:
+            f = open(self.__path('.json'), 'r')
+            self.__abi = json.load(f)
+            f.close()
+        return self.__abi
+
+
+    def verify(self):
+        """Check that the code and the interface were compiled together with the metadata file.
+
+        The metadata file must hash to the metadata hash embedded in the code, and hold the same interface as the interface file.
+
+        :raises ValueError: Artifacts do not match
+        """
+        f = open(self.__path('.metadata.json'), 'rb')
+        metadata = f.read().rstrip(b'\n')
+        f.close()
+        h = metadata_hash(self.code)
+        if h == None:
+            raise ValueError('{} code has no metadata hash'.format(self.name))
+        if h != ipfs_hash(metadata):
+            raise ValueError('{} code does not match metadata'.format(self.name))
+        abi = json.loads(metadata)['output']['abi']
+        if sorted(json.dumps(v, sort_keys=True) for v in abi) != sorted(json.dumps(v, sort_keys=True) for v in self.abi()):
+            raise ValueError('{} interface does not match metadata'.format(self.name))
+
+
+class ArtifactRegistry:
+    """Contract artifacts by version, loaded and verified on first use.
+
+    At most the given number of versions are kept in memory, the least recently used is dropped first.
+
+    :param versions: Artifact names by version
+    :type versions: dict
+    :param path: Artifact directory
+    :type path: str
+    :param cache_size: Maximum number of versions in memory
+    :type cache_size: int
+    :param verify: Verify artifacts against their metadata when loaded
+    :type verify: bool
+    """
+    def __init__(self, versions=versions, path=data_dir, cache_size=default_cache_size, verify=True):
+        self.versions = dict(versions)
+        self.path = path
+        self.cache_size = cache_size
+        self.verify = verify
+        self.artifacts = collections.OrderedDict()
+
+
+    def register(self, version, name):
+        self.versions[version] = name
+        self.artifacts.pop(version, None)
+
+
+    def get(self, version=None):
+        """Artifact of the given contract version.
+
+        :raises ValueError: Unknown version, artifact files missing, or artifacts do not match
+        :rtype: erc20_vend.data.Artifact
+        :returns: Contract artifact
+        """
+        artifact = self.artifacts.get(version)
+        if artifact != None:
+            self.artifacts.move_to_end(version)
+            return artifact
+        name = self.versions.get(version)
+        if name == None:
+            raise ValueError('unknown contract version {}'.format(version))
+        try:
+            artifact = Artifact(name, path=self.path)
+            if self.verify:
+                artifact.verify()
+        except FileNotFoundError as e:
+            raise ValueError('contract version {} artifacts missing, build them with the solidity makefile: {}'.format(version, e))
+        logg.debug('loaded contract artifact {} for version {}'.format(name, version))
+        self.artifacts[version] = artifact
+        while len(self.artifacts) > self.cache_size:
+            self.artifacts.popitem(last=False)
+        return artifact
+
+
+registry = ArtifactRegistry()
+multicall_registry = ArtifactRegistry(multicall_versions, cache_size=1)
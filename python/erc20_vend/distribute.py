@@ -0,0 +1,137 @@
+# standard imports
+import logging
+import csv
+
+# external imports
+from chainlib.eth.tx import TxFormat
+from chainlib.eth.address import to_checksum_address
+from hexathon import (
+    add_0x,
+    strip_0x,
+)
+
+logg = logging.getLogger(__name__)
+
+# holders per distribute transaction; with the static gas table a page stays below
+# 25 million gas in full contract mode
+default_page_size = 128
+
+
+class VendDistribution:
+    """Holder addresses and held token amounts to distribute vended tokens for.
+
+    Addresses and amounts are stored in flat byte arrays of 20 and 32 bytes per holder, so that snapshots of several hundred thousand holders can be paged without keeping a python object per holder. Holders with zero amount are skipped.
+
+    Holders added more than once are not detected here. The vend contract skips holders it has already vended to, so such a holder receives vended tokens for the first amount only, while total counts every amount.
+    """
+    def __init__(self):
+        self.addresses = bytearray()
+        self.values = bytearray()
+
+
+    def __len__(self):
+        return len(self.addresses) // 20
+
+
+    def add(self, address, value):
+        """Add a holder.
+
+        :param address: Holder address
+        :type address: str
+        :param value: Held token amount, in the smallest unit of the held token
+        :type value: int
+        :raises ValueError: Invalid address or amount
+        :rtype: bool
+        :returns: False if the holder was skipped for zero amount
+        """
+        a = bytes.fromhex(strip_0x(address))
+        if len(a) != 20:
+            raise ValueError('invalid address {}'.format(address))
+        value = int(value)
+        if value < 0 or value >> 256 > 0:
+            raise ValueError('amount {} out of range for holder {}'.format(value, address))
+        if value == 0:
+            return False
+        self.addresses += a
+        self.values += value.to_bytes(32, 'big')
+        return True
+
+
+    def extend(self, snapshot):
+        """Add holders from an iterable of address and amount pairs.
+
+        :rtype: int
+        :returns: Number of holders added
+        """
+        c = 0
+        for (address, value) in snapshot:
+            if self.add(address, value):
+                c += 1
+        return c
+
+
+    def read_csv(self, f, address_column=0, value_column=1):
+        """Add holders from a csv file, read one row at a time.
+
+        A first row with a non-numeric amount is taken as the header and skipped.
+
+        :param f: Open csv file
+        :type f: file
+        :rtype: int
+        :returns: Number of holders added
+        """
+        c = 0
+        for i, row in enumerate(csv.reader(f)):
+            if len(row) == 0:
+                continue
+            v = row[value_column].strip()
+            if i == 0 and not v.isdigit():
+                continue
+            if self.add(row[address_column].strip(), v):
+                c += 1
+        return c
+
+
+    def holder(self, idx):
+        a = self.addresses[idx*20:(idx+1)*20]
+        v = self.values[idx*32:(idx+1)*32]
+        return (add_0x(to_checksum_address(a.hex())), int.from_bytes(v, 'big'),)
+
+
+    def page(self, offset, count):
+        addresses = []
+        values = []
+        for i in range(offset, min(offset + count, len(self))):
+            (address, value) = self.holder(i)
+            addresses.append(address)
+            values.append(value)
+        return (addresses, values,)
+
+
+    def total(self):
+        r = 0
+        for i in range(len(self)):
+            r += int.from_bytes(self.values[i*32:(i+1)*32], 'big')
+        return r
+
+
+    def transactions(self, vend, contract_address, sender_address, token_address, page_size=default_page_size, offset=0, tx_format=TxFormat.JSONRPC, id_generator=None):
+        """Build one distribute transaction per page of holders, in order.
+
+        Transactions are built lazily, so nonces are taken from the nonce oracle of the vend builder as they are consumed. The vend contract skips holders it has already vended to, so a page that may or may not have been mined can safely be sent again.
+
+        :param vend: Vend builder with signer and nonce oracle for the sender
+        :type vend: erc20_vend.Vend
+        :param page_size: Holders per transaction
+        :type page_size: int
+        :param offset: Index of first holder, to resume a distribution
+        :type offset: int
+        :rtype: generator
+        :returns: Holder offset of the page and the transaction
+        """
+        while offset < len(self):
+            (addresses, values) = self.page(offset, page_size)
+            tx = vend.distribute(contract_address, sender_address, token_address, addresses, values, tx_format=tx_format, id_generator=id_generator)
+            logg.debug('distribute page {}-{} of {}'.format(offset, offset + len(addresses) - 1, len(self)))
+            yield (offset, tx,)
+            offset += len(addresses)
@@ -0,0 +1,112 @@
+# standard imports
+import logging
+import collections
+
+# external imports
+from chainlib.hash import keccak256_string_to_hex
+from hexathon import add_0x
+
+logg = logging.getLogger(__name__)
+
+topic_token_created = add_0x(keccak256_string_to_hex('TokenCreated(uint256,uint256,address)'))
+topic_vend_mint = add_0x(keccak256_string_to_hex('Mint(address,address,address,uint256)'))
+topic_token_mint = add_0x(keccak256_string_to_hex('Mint(address,address,uint256)'))
+topic_transfer = add_0x(keccak256_string_to_hex('Transfer(address,address,uint256)'))
+
+# Addresses are lowercase hex without 0x prefix.
+# Position fields are None for logs that do not carry them.
+TokenCreated = collections.namedtuple('TokenCreated', ['idx', 'supply', 'token', 'block_number', 'tx_hash', 'log_index'])
+Mint = collections.namedtuple('Mint', ['minter', 'beneficiary', 'token', 'value', 'block_number', 'tx_hash', 'log_index'])
+Transfer = collections.namedtuple('Transfer', ['sender', 'recipient', 'token', 'value', 'block_number', 'tx_hash', 'log_index'])
+
+
+def hex_int(v):
+    if v == None or isinstance(v, int):
+        return v
+    return int(v, 16)
+
+
+# Log position, from json-rpc logs or eth-tester receipt logs.
+def position(l):
+    block_number = l.get('blockNumber')
+    if block_number == None:
+        block_number = l.get('block_number')
+    tx_hash = l.get('transactionHash')
+    if tx_hash == None:
+        tx_hash = l.get('transaction_hash')
+    log_index = l.get('logIndex')
+    if log_index == None:
+        log_index = l.get('log_index')
+    return (hex_int(block_number), tx_hash, hex_int(log_index),)
+
+
+def decode_token_created(l):
+    t = l['topics']
+    return TokenCreated(int(t[1], 16), int(t[2], 16), l['data'][-40:].lower(), *position(l))
+
+
+def decode_vend_mint(l):
+    t = l['topics']
+    return Mint(t[1][-40:].lower(), t[2][-40:].lower(), t[3][-40:].lower(), int(l['data'], 16), *position(l))
+
+
+def decode_token_mint(l):
+    t = l['topics']
+    return Mint(t[1][-40:].lower(), t[2][-40:].lower(), l['address'][-40:].lower(), int(l['data'], 16), *position(l))
+
+
+def decode_transfer(l):
+    t = l['topics']
+    return Transfer(t[1][-40:].lower(), t[2][-40:].lower(), l['address'][-40:].lower(), int(l['data'], 16), *position(l))
+
+
+# decoders and topic count by topic, without 0x prefix
+decoders = {
+    topic_token_created[2:]: (decode_token_created, 3,),
+    topic_vend_mint[2:]: (decode_vend_mint, 4,),
+    topic_token_mint[2:]: (decode_token_mint, 3,),
+    topic_transfer[2:]: (decode_transfer, 3,),
+}
+
+
+def parse_logs(v, topics=None):
+    """Decode all vend events in a list of receipts or logs, in order.
+
+    Logs with other topics, anonymous logs, and logs with a matching topic but other indexed arguments (such as ERC721 Transfer) are skipped.
+
+    :param v: Receipts or logs
+    :type v: list of dict
+    :param topics: Decode only events with these topics
+    :type topics: list of str
+    :rtype: list
+    :returns: TokenCreated, Mint and Transfer tuples
+    """
+    d = decoders
+    if topics != None:
+        d = {}
+        for topic in topics:
+            k = topic[-64:].lower()
+            d[k] = decoders[k]
+
+    r = []
+    for o in v:
+        l = o.get('logs')
+        if l == None:
+            l = [o]
+        for log in l:
+            t = log['topics']
+            if len(t) == 0:
+                continue
+            decoder = d.get(t[0][-64:].lower())
+            if decoder == None or len(t) != decoder[1]:
+                continue
+            r.append(decoder[0](log))
+    return r
+
+
+def parse_log(topic, log):
+    t = log['topics']
+    decoder = decoders[topic[2:]]
+    if len(t) != decoder[1] or t[0][-64:].lower() != topic[2:]:
+        raise ValueError('topic mismatch')
+    return decoder[0](log)
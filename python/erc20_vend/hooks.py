@@ -0,0 +1,69 @@
+# standard imports
+import logging
+
+# local imports
+from erc20_vend.data import registry
+
+logg = logging.getLogger(__name__)
+
+# bytecode, create and args are the chainlib cli hooks, exported by the package as erc20_vend.bytecode and so on
+__all__ = [
+    'bytecode',
+    'create',
+    'args',
+    'constructor_args',
+    'check_clone',
+]
+
+zero_address = '0' * 40
+
+# tokenImplementation(), only in contract code built with clone mode support
+token_implementation_selector = '2f3a3d5d'
+
+
+# Only the standard library and the artifact registry are loaded here, since the chainlib
+# cli tools import the package and call these for every invocation.
+
+
+def address_word(v):
+    if v[:2] in ['0x', '0X']:
+        v = v[2:]
+    if int(v, 16) == 0:
+        v = zero_address
+    if len(v) != 40:
+        raise ValueError('value wrong size; expected 40, got {}'.format(len(v)))
+    return '000000000000000000000000' + v
+
+
+# Same encoding as chainlib.eth.contract.ABIContractEncoder for the constructor argument types.
+def constructor_args(token_address, decimals=0, mint=False, clone=False):
+    return address_word(token_address) + format(int(decimals), '064x') + format(int(bool(mint)), '064x') + format(int(bool(clone)), '064x')
+
+
+# Older contract code ignores the clone constructor argument, and would silently deploy full tokens.
+def check_clone(version=None):
+    if not registry.get(version).has_selector(token_implementation_selector):
+        raise ValueError('vend contract version {} has no clone mode, rebuild the contract artifacts'.format(version))
+
+
+def bytecode(**kwargs):
+    return registry.get(kwargs.get('version')).hex()
+
+
+def create(**kwargs):
+    decimals = kwargs.get('decimals', 0)
+    if decimals == None:
+        decimals = 0
+    if kwargs.get('clone'):
+        check_clone(kwargs.get('version'))
+    args = constructor_args(kwargs['token_address'], decimals=decimals, mint=kwargs.get('mint'), clone=kwargs.get('clone'))
+    logg.debug('constructor code: ' + args)
+    return bytecode(**kwargs) + args
+
+
+def args(v):
+    if v == 'create':
+        return (['token_address'], ['decimals', 'mint', 'clone'],)
+    elif v == 'default' or v == 'bytecode':
+        return ([], ['version'],)
+    raise ValueError('unknown command: ' + v)
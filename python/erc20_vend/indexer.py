@@ -0,0 +1,278 @@
+# standard imports
+import logging
+import sqlite3
+
+# external imports
+from chainlib.eth.block import block_latest
+from chainlib.jsonrpc import JSONRPCRequest
+from chainlib.error import JSONRPCException
+from hexathon import (
+    add_0x,
+    strip_0x,
+)
+
+# local imports
+from erc20_vend.event import (
+    topic_token_created,
+    topic_vend_mint,
+    topic_token_mint,
+    topic_transfer,
+    parse_logs,
+    hex_int,
+    TokenCreated,
+)
+
+logg = logging.getLogger(__name__)
+
+schema = [
+    'CREATE TABLE IF NOT EXISTS checkpoint (contract TEXT PRIMARY KEY, block_number INTEGER NOT NULL)',
+    'CREATE TABLE IF NOT EXISTS token (contract TEXT NOT NULL, idx INTEGER NOT NULL, token TEXT NOT NULL, supply TEXT NOT NULL, block_number INTEGER NOT NULL, tx_hash TEXT NOT NULL, PRIMARY KEY (contract, idx))',
+    'CREATE INDEX IF NOT EXISTS token_token ON token (token)',
+    'CREATE TABLE IF NOT EXISTS mint (contract TEXT NOT NULL, token TEXT NOT NULL, minter TEXT NOT NULL, beneficiary TEXT NOT NULL, value TEXT NOT NULL, created INTEGER NOT NULL, block_number INTEGER NOT NULL, tx_hash TEXT NOT NULL, log_index INTEGER NOT NULL, PRIMARY KEY (tx_hash, log_index))',
+    'CREATE INDEX IF NOT EXISTS mint_token ON mint (token)',
+    'CREATE INDEX IF NOT EXISTS mint_minter ON mint (minter)',
+    'CREATE INDEX IF NOT EXISTS mint_beneficiary ON mint (beneficiary)',
+]
+
+mint_columns = 'contract, token, minter, beneficiary, value, created, block_number, tx_hash, log_index'
+
+
+def address_key(v):
+    return strip_0x(v).lower()
+
+
+def logs(from_block, to_block, address=None, topics=None, id_generator=None):
+    j = JSONRPCRequest(id_generator)
+    o = j.template()
+    o['method'] = 'eth_getLogs'
+    f = {
+        'fromBlock': hex(from_block),
+        'toBlock': hex(to_block),
+            }
+    if address != None:
+        f['address'] = address
+    if topics != None:
+        f['topics'] = topics
+    o['params'].append(f)
+    return j.finalize(o)
+
+
+class VendIndexStore:
+    """SQLite store for vend contract events.
+
+    Addresses are stored in lowercase hex without 0x prefix, and token values as decimal strings.
+
+    :param path: Database file path
+    :type path: str
+    """
+    def __init__(self, path=':memory:'):
+        self.db = sqlite3.connect(path)
+        for s in schema:
+            self.db.execute(s)
+        self.db.commit()
+
+
+    def close(self):
+        self.db.close()
+
+
+    def checkpoint(self, contract_address):
+        r = self.db.execute('SELECT block_number FROM checkpoint WHERE contract = ?', (address_key(contract_address),)).fetchone()
+        if r == None:
+            return None
+        return r[0]
+
+
+    def tokens(self, contract_address):
+        """Vended tokens of a vend contract, in index order.
+
+        :rtype: list
+        :returns: Tuples of index, token address and supply
+        """
+        r = []
+        for (idx, token, supply) in self.db.execute('SELECT idx, token, supply FROM token WHERE contract = ? ORDER BY idx', (address_key(contract_address),)):
+            r.append((idx, token, int(supply),))
+        return r
+
+
+    def token_contract(self, token_address):
+        r = self.db.execute('SELECT contract FROM token WHERE token = ?', (address_key(token_address),)).fetchone()
+        if r == None:
+            return None
+        return r[0]
+
+
+    def mints(self, token_address=None, minter=None, beneficiary=None, created=None):
+        """Mint records matching all given filters, in chain order.
+
+        Records with created set are emitted by the vend contract when a token is created, the others are tokens vended to holders.
+
+        :rtype: list
+        :returns: Tuples of token, minter, beneficiary, value, block number, transaction hash and log index
+        """
+        q = []
+        v = []
+        if token_address != None:
+            q.append('token = ?')
+            v.append(address_key(token_address))
+        if minter != None:
+            q.append('minter = ?')
+            v.append(address_key(minter))
+        if beneficiary != None:
+            q.append('beneficiary = ?')
+            v.append(address_key(beneficiary))
+        if created != None:
+            q.append('created = ?')
+            v.append(int(created))
+        s = 'SELECT token, minter, beneficiary, value, block_number, tx_hash, log_index FROM mint'
+        if len(q) > 0:
+            s += ' WHERE ' + ' AND '.join(q)
+        s += ' ORDER BY block_number, log_index'
+        r = []
+        for (token, minter, beneficiary, value, block_number, tx_hash, log_index) in self.db.execute(s, v):
+            r.append((token, minter, beneficiary, int(value), block_number, tx_hash, log_index,))
+        return r
+
+
+    def vended(self, token_address):
+        """Holders that vended the given token.
+
+        :rtype: list
+        :returns: Holder addresses
+        """
+        r = []
+        for (beneficiary,) in self.db.execute('SELECT DISTINCT beneficiary FROM mint WHERE token = ? AND created = 0 ORDER BY beneficiary', (address_key(token_address),)):
+            r.append(beneficiary)
+        return r
+
+
+    # Records and checkpoint of one block range are committed in a single transaction.
+    def apply(self, contract_address, block_number, tokens, mints):
+        k = address_key(contract_address)
+        with self.db:
+            self.db.executemany('INSERT OR IGNORE INTO token (contract, idx, token, supply, block_number, tx_hash) VALUES (?, ?, ?, ?, ?, ?)', [(k,) + t for t in tokens])
+            self.db.executemany('INSERT OR IGNORE INTO mint (' + mint_columns + ') VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)', [(k,) + m for m in mints])
+            self.db.execute('INSERT OR REPLACE INTO checkpoint (contract, block_number) VALUES (?, ?)', (k, block_number,))
+
+
+class VendIndexer:
+    """Index TokenCreated and Mint events of a vend contract, and tokens vended to holders by its vended tokens.
+
+    Logs are fetched in block ranges that are halved when the node rejects the query, which also caps the range size from then on, and doubled while results stay below the target number of logs. Every range is stored with its checkpoint, so an interrupted sync resumes after the last stored range.
+
+    :param conn: RPC connection
+    :type conn: chainlib.connection.RPCConnection
+    :param contract_address: Vend contract address
+    :type contract_address: str
+    :param store: Index store
+    :type store: erc20_vend.indexer.VendIndexStore
+    :param start_block: First block to index if there is no checkpoint, usually the block the contract was published in
+    :type start_block: int
+    :param chunk_size: Initial number of blocks per log query
+    :type chunk_size: int
+    :param max_chunk_size: Maximum number of blocks per log query
+    :type max_chunk_size: int
+    :param target_logs: Number of logs per query above which the range is not grown
+    :type target_logs: int
+    :param confirmations: Number of blocks behind the latest block to stop at
+    :type confirmations: int
+    :param id_generator: json-rpc id generator
+    :type id_generator: chainlib.connection.JSONRPCIdGenerator
+    """
+    def __init__(self, conn, contract_address, store, start_block=0, chunk_size=1000, max_chunk_size=100000, target_logs=1000, confirmations=0, id_generator=None):
+        self.conn = conn
+        self.contract_address = add_0x(contract_address)
+        self.contract_key = address_key(contract_address)
+        self.store = store
+        self.start_block = start_block
+        self.chunk_size = chunk_size
+        self.max_chunk_size = max_chunk_size
+        self.target_logs = target_logs
+        self.confirmations = confirmations
+        self.id_generator = id_generator
+        self.tokens = set()
+        for (idx, token, supply) in self.store.tokens(contract_address):
+            self.tokens.add(token)
+
+
+    def head(self):
+        o = block_latest(id_generator=self.id_generator)
+        r = self.conn.do(o)
+        return hex_int(r) - self.confirmations
+
+
+    def __fetch(self, from_block, to_block):
+        contract_topic = add_0x('000000000000000000000000' + self.contract_key)
+        o = [
+            logs(from_block, to_block, address=self.contract_address, topics=[[topic_token_created, topic_vend_mint]], id_generator=self.id_generator),
+            logs(from_block, to_block, topics=[[topic_token_mint, topic_transfer], contract_topic], id_generator=self.id_generator),
+            ]
+        return self.conn.do(o)
+
+
+    # Vend contract logs are decoded first, so that tokens created in the range are known
+    # when their vend logs are filtered.
+    def __decode(self, vend_logs, token_logs):
+        tokens = []
+        mints = []
+        for e in parse_logs(vend_logs):
+            if isinstance(e, TokenCreated):
+                tokens.append((e.idx, e.token, str(e.supply), e.block_number, e.tx_hash,))
+                self.tokens.add(e.token)
+            else:
+                mints.append((e.token, e.minter, e.beneficiary, str(e.value), 1, e.block_number, e.tx_hash, e.log_index,))
+
+        # Mint and Transfer alike, the first argument is the vend contract and the second the holder
+        for e in parse_logs(token_logs):
+            if e.token not in self.tokens:
+                continue
+            # initial supply minted to the vend contract itself
+            if e[1] == self.contract_key:
+                continue
+            mints.append((e.token, self.contract_key, e[1], str(e.value), 0, e.block_number, e.tx_hash, e.log_index,))
+        return (tokens, mints,)
+
+
+    def sync(self, to_block=None):
+        """Index all blocks from the checkpoint up to the given block, or the latest confirmed block.
+
+        :param to_block: Last block to index
+        :type to_block: int
+        :rtype: int
+        :returns: Number of records stored
+        """
+        cursor = self.store.checkpoint(self.contract_address)
+        if cursor == None:
+            cursor = self.start_block
+        else:
+            cursor += 1
+        if to_block == None:
+            to_block = self.head()
+
+        count = 0
+        while cursor <= to_block:
+            end = min(cursor + self.chunk_size - 1, to_block)
+            try:
+                (vend_logs, token_logs) = self.__fetch(cursor, end)
+            except JSONRPCException as e:
+                if self.chunk_size == 1:
+                    raise e
+                # a rejected range size is not tried again
+                self.chunk_size = max(1, self.chunk_size // 2)
+                self.max_chunk_size = self.chunk_size
+                logg.debug('log query {}-{} rejected, chunk size now {}: {}'.format(cursor, end, self.chunk_size, e))
+                continue
+
+            (tokens, mints) = self.__decode(vend_logs, token_logs)
+            self.store.apply(self.contract_address, end, tokens, mints)
+            count += len(tokens) + len(mints)
+            logg.debug('indexed blocks {}-{} tokens {} mints {}'.format(cursor, end, len(tokens), len(mints)))
+            cursor = end + 1
+
+            n = len(vend_logs) + len(token_logs)
+            if n > self.target_logs:
+                self.chunk_size = max(1, self.chunk_size // 2)
+            elif n < self.target_logs // 2:
+                self.chunk_size = min(self.max_chunk_size, self.chunk_size * 2)
+
+        return count
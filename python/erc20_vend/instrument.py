@@ -0,0 +1,283 @@
+# standard imports
+import logging
+import time
+import inspect
+import functools
+import threading
+
+# external imports
+from hexathon import strip_0x
+
+logg = logging.getLogger(__name__)
+
+# upper bounds in seconds of the default histogram buckets, 1 microsecond doubling to about 17 seconds;
+# observations above the last bound go in an overflow bucket
+default_buckets = tuple((1 << i) / 1000000 for i in range(25))
+
+
+def contract_label(v):
+    if v == None:
+        return None
+    return strip_0x(v).lower()
+
+
+class Collector:
+    """Interface for instrumentation backends.
+
+    Labels are dicts of str to str or None, and are not modified by the caller after the call.
+    """
+
+    def timing(self, name, seconds, labels):
+        """Record the duration of one operation.
+        """
+        raise NotImplementedError()
+
+
+    def count(self, name, labels, value=1):
+        """Add to a counter.
+        """
+        raise NotImplementedError()
+
+
+class Histogram:
+    """Duration distribution in fixed buckets, with exact count, sum, min and max.
+
+    :param buckets: Ascending bucket upper bounds in seconds
+    :type buckets: tuple of float
+    """
+    def __init__(self, buckets=default_buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.min = None
+        self.max = None
+
+
+    def observe(self, v):
+        i = 0
+        while i < len(self.buckets) and v > self.buckets[i]:
+            i += 1
+        self.counts[i] += 1
+        self.count += 1
+        self.sum += v
+        if self.min == None or v < self.min:
+            self.min = v
+        if self.max == None or v > self.max:
+            self.max = v
+
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the given quantile, or the maximum if it is in the overflow bucket.
+
+        :rtype: float
+        """
+        if self.count == 0:
+            return None
+        target = q * self.count
+        c = 0
+        for i, v in enumerate(self.counts):
+            c += v
+            if c >= target and v > 0:
+                if i == len(self.buckets):
+                    return self.max
+                return min(self.buckets[i], self.max)
+        return self.max
+
+
+    def snapshot(self):
+        return {
+            'count': self.count,
+            'sum': self.sum,
+            'min': self.min,
+            'max': self.max,
+            'p50': self.quantile(0.5),
+            'p99': self.quantile(0.99),
+            'buckets': [[self.buckets[i] if i < len(self.buckets) else None, v] for i, v in enumerate(self.counts) if v > 0],
+                }
+
+
+class HistogramCollector(Collector):
+    """In-memory collector keeping one histogram per timing name and labels, and one total per counter name and labels.
+
+    :param buckets: Histogram bucket upper bounds in seconds
+    :type buckets: tuple of float
+    """
+    def __init__(self, buckets=default_buckets):
+        self.buckets = buckets
+        self.timings = {}
+        self.counters = {}
+        self.lock = threading.Lock()
+
+
+    def timing(self, name, seconds, labels):
+        k = (name, tuple(sorted(labels.items())),)
+        with self.lock:
+            h = self.timings.get(k)
+            if h == None:
+                h = Histogram(self.buckets)
+                self.timings[k] = h
+            h.observe(seconds)
+
+
+    def count(self, name, labels, value=1):
+        k = (name, tuple(sorted(labels.items())),)
+        with self.lock:
+            self.counters[k] = self.counters.get(k, 0) + value
+
+
+    def get(self, name, **labels):
+        """Histogram for the timing name and exact labels, or None if nothing was recorded.
+
+        :rtype: erc20_vend.instrument.Histogram
+        """
+        return self.timings.get((name, tuple(sorted(labels.items())),))
+
+
+    def snapshot(self):
+        """Copy of all recorded values, in a form that can be serialized as json.
+
+        :rtype: dict
+        """
+        r = {
+            'timings': [],
+            'counters': [],
+                }
+        with self.lock:
+            for k in sorted(self.timings.keys(), key=str):
+                v = self.timings[k].snapshot()
+                v['name'] = k[0]
+                v['labels'] = dict(k[1])
+                r['timings'].append(v)
+            for k in sorted(self.counters.keys(), key=str):
+                r['counters'].append({
+                    'name': k[0],
+                    'labels': dict(k[1]),
+                    'value': self.counters[k],
+                    })
+        return r
+
+
+    def reset(self):
+        with self.lock:
+            self.timings = {}
+            self.counters = {}
+
+
+class BuildFrame:
+
+    def __init__(self, method, contract_address):
+        self.method = method
+        self.contract = contract_label(contract_address)
+        self.stages = 0.0
+
+
+    def labels(self, stage):
+        return {
+            'method': self.method,
+            'contract': self.contract,
+            'stage': stage,
+                }
+
+
+def instrumented(fn):
+    """Time a builder method of a class with a collector attribute, under the build timing name.
+
+    Stages timed with stage() while the method runs are recorded with their own stage label. The rest of the method, which is mostly calldata encoding, is recorded as the encode stage, and the whole method as the total stage. Labels are the method name and the contract address argument.
+
+    If the collector is None the method is called directly.
+    """
+    method = fn.__name__
+    params = list(inspect.signature(fn).parameters.keys())
+    contract_idx = None
+    if 'contract_address' in params:
+        contract_idx = params.index('contract_address') - 1
+
+    @functools.wraps(fn)
+    def wrapper(self, *args, **kwargs):
+        if self.collector == None:
+            return fn(self, *args, **kwargs)
+        contract_address = kwargs.get('contract_address')
+        if contract_idx != None and contract_idx < len(args):
+            contract_address = args[contract_idx]
+        frame = BuildFrame(method, contract_address)
+        parent = self.instrument_frame
+        self.instrument_frame = frame
+        t = time.perf_counter()
+        try:
+            return fn(self, *args, **kwargs)
+        finally:
+            total = time.perf_counter() - t
+            self.instrument_frame = parent
+            if parent != None:
+                parent.stages += total
+            self.collector.timing('build', total - frame.stages, frame.labels('encode'))
+            self.collector.timing('build', total, frame.labels('total'))
+
+    return wrapper
+
+
+def stage(builder, name, fn, *args, **kwargs):
+    """Call fn, timing it as a stage of the instrumented builder method being run, if any.
+    """
+    frame = builder.instrument_frame
+    if frame == None:
+        return fn(*args, **kwargs)
+    t = time.perf_counter()
+    try:
+        return fn(*args, **kwargs)
+    finally:
+        v = time.perf_counter() - t
+        frame.stages += v
+        builder.collector.timing('build', v, frame.labels(name))
+
+
+class InstrumentedConnection:
+    """RPC connection wrapper timing each request under the rpc timing name.
+
+    Labels are the json-rpc method and, for calls and gas estimates, the contract address. A batch request is timed once, with method batch, and counted per request method in the rpc_requests counter. Requests that raise are counted in the rpc_errors counter.
+
+    :param conn: RPC connection
+    :type conn: chainlib.connection.RPCConnection
+    :param collector: Instrumentation backend
+    :type collector: erc20_vend.instrument.Collector
+    """
+    def __init__(self, conn, collector):
+        self.conn = conn
+        self.collector = collector
+
+
+    def __getattr__(self, k):
+        return getattr(self.conn, k)
+
+
+    def __labels(self, o):
+        if isinstance(o, list):
+            return {
+                'method': 'batch',
+                'contract': None,
+                    }
+        contract_address = None
+        if o['method'] in ['eth_call', 'eth_estimateGas']:
+            contract_address = o['params'][0].get('to')
+        return {
+            'method': o['method'],
+            'contract': contract_label(contract_address),
+                }
+
+
+    def do(self, o, *args, **kwargs):
+        labels = self.__labels(o)
+        if isinstance(o, list):
+            for v in o:
+                self.collector.count('rpc_requests', self.__labels(v))
+        else:
+            self.collector.count('rpc_requests', labels)
+        t = time.perf_counter()
+        try:
+            return self.conn.do(o, *args, **kwargs)
+        except Exception as e:
+            self.collector.count('rpc_errors', labels)
+            raise e
+        finally:
+            self.collector.timing('rpc', time.perf_counter() - t, labels)
@@ -0,0 +1,293 @@
+# standard imports
+import logging
+
+# external imports
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+logg = logging.getLogger(__name__)
+
+UINT256_MAX = (1 << 256) - 1
+
+# result codes, indexing the revert reasons of the contract
+OK = 0
+ERR_USED = 1
+ERR_TOKEN = 2
+ERR_LOCKED = 3
+ERR_ALREADY_WITHDRAWN = 4
+
+reasons = (
+    '',
+    'ERR_USED',
+    'ERR_TOKEN',
+    'ERR_LOCKED',
+    'ERR_ALREADY_WITHDRAWN',
+)
+
+
+def decimal_divisor(control_decimals, decimals=0):
+    if control_decimals < decimals:
+        raise ValueError('vend decimals {} exceed held token decimals {}'.format(decimals, control_decimals))
+    r = 10 ** (control_decimals - decimals)
+    if r == 0:
+        r = 1
+    return r
+
+
+# Integer values as a numpy array if numpy is available, otherwise as a list.
+# Values that do not all fit in 63 bits are kept as python integers in an object array.
+def as_array(v):
+    if numpy == None:
+        return [int(x) for x in v]
+    if isinstance(v, numpy.ndarray) and v.dtype.kind in 'iuO':
+        return v.copy()
+    v = [int(x) for x in v]
+    if len(v) > 0 and (max(v) >> 63 > 0 or min(v) < 0):
+        return numpy.array(v, dtype=object)
+    return numpy.array(v, dtype=numpy.int64)
+
+
+def zeros_like(v, dtype=None):
+    if numpy == None:
+        if dtype == bool:
+            return [False] * len(v)
+        return [0] * len(v)
+    return numpy.zeros(len(v), dtype=dtype or v.dtype)
+
+
+def total(v):
+    if numpy == None:
+        return sum(v)
+    return int(v.astype(object).sum())
+
+
+class VendTokenState:
+    """State of one vended token in the model.
+
+    Withdrawn holders are flagged separately, so that used amounts keep the integer type of the balances; used_by gives the value the contract reports.
+
+    :param balances: Held token balances, for the array type
+    :type balances: numpy.ndarray or list of int
+    :param reserve: Vended token balance of the vend contract, the held token supply in supply mode
+    :type reserve: int
+    """
+    def __init__(self, balances, reserve=0):
+        self.used = zeros_like(balances)
+        self.withdrawn = zeros_like(balances, dtype=bool)
+        self.balances = zeros_like(balances)
+        self.reserve = reserve
+        self.returned = 0
+        self.minted = reserve
+
+
+    def used_by(self, holder):
+        if self.withdrawn[holder]:
+            return UINT256_MAX
+        return int(self.used[holder])
+
+
+class VendModel:
+    """In-process model of ERC20Vend for a fixed population of holders, addressed by index.
+
+    Allowances of held and vended tokens are assumed to cover every deposit and withdraw. The vend contract is assumed to be the only minter of vended tokens.
+
+    Deposits and withdraws for many holders are evaluated as vectorized numpy operations when numpy is installed, and holder by holder otherwise. Either way the result is that of one transaction per holder, in the given holder order.
+
+    :param balances: Held token balance of each holder
+    :type balances: numpy.ndarray or list of int
+    :param control_decimals: Held token decimals
+    :type control_decimals: int
+    :param decimals: Vended token decimals
+    :type decimals: int
+    :param mint: Vended tokens are minted on deposit
+    :type mint: bool
+    :param supply: Held token total supply, for the vended token supply in supply mode; defaults to the sum of the balances
+    :type supply: int
+    :raises ValueError: Vend decimals exceed held token decimals, as the constructor would revert
+    """
+    def __init__(self, balances, control_decimals, decimals=0, mint=False, supply=None):
+        self.decimal_divisor = decimal_divisor(control_decimals, decimals)
+        self.balances = as_array(balances)
+        if mint:
+            self.supply = 0
+        elif supply == None:
+            self.supply = total(self.balances)
+        else:
+            self.supply = int(supply)
+        self.tokens = []
+
+
+    def __len__(self):
+        return len(self.balances)
+
+
+    def create(self):
+        self.tokens.append(VendTokenState(self.balances, reserve=self.supply))
+        return len(self.tokens) - 1
+
+
+    def vended(self, balances):
+        """Vended token amounts for held token amounts.
+
+        :rtype: numpy.ndarray or list of int
+        """
+        if numpy == None:
+            return [int(x) // self.decimal_divisor for x in balances]
+        return as_array(balances) // self.decimal_divisor
+
+
+    def __holders(self, holders):
+        if holders == None:
+            holders = range(len(self))
+        return [int(i) for i in holders]
+
+
+    def deposit_one(self, token_idx, holder, value=0):
+        """Deposit of one holder.
+
+        :rtype: tuple
+        :returns: Vended amount and result code
+        """
+        t = self.tokens[token_idx]
+        if t.used[holder] != 0 or t.withdrawn[holder]:
+            return (0, ERR_USED,)
+        control = int(value)
+        if control == 0:
+            control = int(self.balances[holder])
+            if control == 0:
+                return (0, OK,)
+        if int(self.balances[holder]) < control:
+            return (0, ERR_TOKEN,)
+        vended = control // self.decimal_divisor
+        if self.supply > 0:
+            if t.reserve < vended:
+                return (0, ERR_TOKEN,)
+            t.reserve -= vended
+        else:
+            t.minted += vended
+        self.balances[holder] -= control
+        t.used[holder] = control
+        t.balances[holder] += vended
+        return (vended, OK,)
+
+
+    def withdraw_one(self, token_idx, holder):
+        """Withdraw of one holder.
+
+        :rtype: tuple
+        :returns: Held token amount returned to the holder and result code
+        """
+        t = self.tokens[token_idx]
+        if t.withdrawn[holder]:
+            return (0, ERR_ALREADY_WITHDRAWN,)
+        used = int(t.used[holder])
+        if used == 0:
+            return (0, OK,)
+        vend_balance = int(t.balances[holder])
+        if vend_balance * self.decimal_divisor != used:
+            return (0, ERR_LOCKED,)
+        t.used[holder] = 0
+        t.withdrawn[holder] = True
+        t.balances[holder] = 0
+        t.reserve += vend_balance
+        t.returned += vend_balance
+        self.balances[holder] += used
+        return (used, OK,)
+
+
+    def transfer(self, token_idx, sender, recipient, value):
+        """Vended token transfer between holders.
+
+        :raises ValueError: Insufficient balance
+        """
+        t = self.tokens[token_idx]
+        if int(t.balances[sender]) < value:
+            raise ValueError('insufficient balance')
+        t.balances[sender] -= value
+        t.balances[recipient] += value
+
+
+    def __loop(self, fn, token_idx, holders, *args):
+        r = []
+        e = []
+        for i, holder in enumerate(holders):
+            (v, err) = fn(token_idx, holder, *[a[i] for a in args])
+            r.append(v)
+            e.append(err)
+        if numpy == None:
+            return (r, e,)
+        return (as_array(r), numpy.array(e, dtype=numpy.int8),)
+
+
+    def deposit(self, token_idx, holders=None, values=None):
+        """Deposit of each of the given holders, or of all holders.
+
+        :param holders: Holder indices, in transaction order
+        :type holders: list of int
+        :param values: Held token amount per holder, 0 for the whole balance
+        :type values: list of int
+        :rtype: tuple
+        :returns: Vended amounts and result codes, by holder position
+        """
+        holders = self.__holders(holders)
+        if values == None:
+            values = [0] * len(holders)
+        if numpy == None or len(set(holders)) != len(holders):
+            return self.__loop(self.deposit_one, token_idx, holders, values)
+
+        t = self.tokens[token_idx]
+        h = numpy.array(holders, dtype=numpy.int64)
+        values = as_array(values)
+        balances = self.balances[h]
+        control = numpy.where(values == 0, balances, values)
+        err = numpy.zeros(len(h), dtype=numpy.int8)
+        err[balances < control] = ERR_TOKEN
+        err[(t.used[h] != 0) | t.withdrawn[h]] = ERR_USED
+        ok = (err == OK) & (control != 0)
+        vended = numpy.where(ok, control // self.decimal_divisor, 0)
+        vended_total = total(vended)
+        if self.supply > 0:
+            # the reserve could run out part way, which only the holder order decides
+            if vended_total > t.reserve:
+                return self.__loop(self.deposit_one, token_idx, holders, values)
+            t.reserve -= vended_total
+        else:
+            t.minted += vended_total
+        self.balances[h[ok]] -= control[ok]
+        t.used[h[ok]] = control[ok]
+        t.balances[h[ok]] += vended[ok]
+        return (vended, err,)
+
+
+    def withdraw(self, token_idx, holders=None):
+        """Withdraw of each of the given holders, or of all holders.
+
+        :param holders: Holder indices, in transaction order
+        :type holders: list of int
+        :rtype: tuple
+        :returns: Held token amounts returned and result codes, by holder position
+        """
+        holders = self.__holders(holders)
+        if numpy == None or len(set(holders)) != len(holders):
+            return self.__loop(self.withdraw_one, token_idx, holders)
+
+        t = self.tokens[token_idx]
+        h = numpy.array(holders, dtype=numpy.int64)
+        used = t.used[h]
+        vend_balances = t.balances[h]
+        err = numpy.zeros(len(h), dtype=numpy.int8)
+        # same as the balance times the divisor being the used amount, without overflow
+        err[(used % self.decimal_divisor != 0) | (vend_balances != used // self.decimal_divisor)] = ERR_LOCKED
+        err[used == 0] = OK
+        err[t.withdrawn[h]] = ERR_ALREADY_WITHDRAWN
+        ok = (err == OK) & (used != 0)
+        returned_total = total(vend_balances[ok])
+        t.reserve += returned_total
+        t.returned += returned_total
+        self.balances[h[ok]] += used[ok]
+        t.used[h[ok]] = 0
+        t.withdrawn[h[ok]] = True
+        t.balances[h[ok]] = 0
+        return (numpy.where(ok, used, 0), err,)
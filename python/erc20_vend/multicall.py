@@ -0,0 +1,84 @@
+# standard imports
+import logging
+
+# external imports
+from chainlib.eth.constant import ZERO_ADDRESS
+from chainlib.eth.tx import (
+    TxFactory,
+    TxFormat,
+)
+from chainlib.jsonrpc import JSONRPCRequest
+from hexathon import (
+    add_0x,
+    strip_0x,
+)
+
+# local imports
+from erc20_vend.data import multicall_registry
+from erc20_vend import calldata
+
+logg = logging.getLogger(__name__)
+
+
+class Multicall(TxFactory):
+
+    def constructor(self, sender_address, tx_format=TxFormat.JSONRPC):
+        code = Multicall.bytecode()
+        tx = self.template(sender_address, None, use_nonce=True)
+        tx = self.set_code(tx, code)
+        return self.finalize(tx, tx_format)
+
+
+    @staticmethod
+    def gas(code=None):
+        return 1000000
+
+
+    @staticmethod
+    def bytecode():
+        return multicall_registry.get().hex()
+
+
+    # calls are (target_address, input_data)
+    def aggregate(self, contract_address, calls, sender_address=ZERO_ADDRESS, id_generator=None):
+        j = JSONRPCRequest(id_generator)
+        o = j.template()
+        o['method'] = 'eth_call'
+        targets = []
+        inputs = []
+        for (target, data) in calls:
+            targets.append(target)
+            inputs.append(data)
+        data = add_0x(calldata.aggregate.encode(targets, inputs))
+        tx = self.template(sender_address, contract_address)
+        tx = self.set_code(tx, data)
+        o['params'].append(self.normalize(tx))
+        o['params'].append('latest')
+        o = j.finalize(o)
+        return o
+
+
+    # (uint256, bool[], bytes[]) return value.
+    # Returns the block number, and a success flag and hex result without 0x for every call.
+    def parse_aggregate(self, v):
+        v = strip_0x(v)
+        block_number = int(v[:64], 16)
+
+        cursor = int(v[64:128], 16) * 2
+        count = int(v[cursor:cursor+64], 16)
+        cursor += 64
+        success = []
+        for i in range(count):
+            success.append(int(v[cursor:cursor+64], 16) > 0)
+            cursor += 64
+
+        base = int(v[128:192], 16) * 2
+        count = int(v[base:base+64], 16)
+        base += 64
+        r = []
+        for i in range(count):
+            cursor = base + int(v[base+i*64:base+i*64+64], 16) * 2
+            l = int(v[cursor:cursor+64], 16) * 2
+            cursor += 64
+            r.append((success[i], v[cursor:cursor+l],))
+        return (block_number, r,)
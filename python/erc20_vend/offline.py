@@ -0,0 +1,151 @@
+# standard imports
+import os
+import logging
+import json
+import collections
+from concurrent.futures import ProcessPoolExecutor
+
+# external imports
+from chainlib.chain import ChainSpec
+from chainlib.eth.tx import TxFormat
+from chainlib.eth.gas import OverrideGasOracle
+from chainlib.eth.constant import MINIMUM_FEE_PRICE
+from funga.eth.signer import EIP155Signer
+from funga.eth.keystore.dict import DictKeystore
+from hexathon import (
+    add_0x,
+    strip_0x,
+)
+
+# local imports
+from erc20_vend.vend import Vend
+from erc20_vend import calldata
+
+logg = logging.getLogger(__name__)
+
+encoders = {
+    'create': calldata.create,
+    'deposit': calldata.deposit,
+    'withdraw': calldata.withdraw,
+}
+
+_worker_vend = None
+
+
+def _worker_init(chain_str, keys, gas_price, gas_limit):
+    global _worker_vend
+    keystore = DictKeystore()
+    for k in keys:
+        keystore.import_raw_key(k)
+    if gas_price == None:
+        gas_price = MINIMUM_FEE_PRICE
+    gas_oracle = OverrideGasOracle(price=gas_price, limit=gas_limit, code_callback=Vend.gas)
+    chain_spec = ChainSpec.from_chain_str(chain_str)
+    _worker_vend = Vend(chain_spec, signer=EIP155Signer(keystore), gas_oracle=gas_oracle)
+
+
+def _worker_sign(contract_address, chunk):
+    r = []
+    for (method, sender_address, nonce, args) in chunk:
+        data = add_0x(encoders[method].encode(*args))
+        tx = _worker_vend.template(sender_address, contract_address)
+        tx['nonce'] = nonce
+        tx = _worker_vend.set_code(tx, data)
+        (tx_hash, tx_raw) = _worker_vend.finalize(tx, TxFormat.RLP_SIGNED)
+        r.append((tx_hash, tx_raw, sender_address, nonce,))
+    return r
+
+
+class VendSignPipeline:
+    """Build and sign vend transactions offline, spread over a pool of worker processes.
+
+    Nonces are allocated in the parent process in job order, so every sender gets a consecutive range starting at the given start nonce, regardless of how jobs are split between workers.
+
+    :param chain_spec: Chain spec to sign for
+    :type chain_spec: chainlib.chain.ChainSpec
+    :param keys: Private keys of all senders, as bytes
+    :type keys: list
+    :param gas_price: Fixed gas price
+    :type gas_price: int
+    :param gas_limit: Fixed gas limit, defaults to the static vend gas table by method
+    :type gas_limit: int
+    :param workers: Number of worker processes, defaults to the number of cores
+    :type workers: int
+    :param chunk_size: Jobs per worker task
+    :type chunk_size: int
+    """
+    def __init__(self, chain_spec, keys, gas_price=None, gas_limit=None, workers=None, chunk_size=64):
+        self.chain_spec = chain_spec
+        self.keys = list(keys)
+        self.gas_price = gas_price
+        self.gas_limit = gas_limit
+        if workers == None:
+            workers = os.cpu_count()
+        self.workers = workers
+        self.chunk_size = chunk_size
+
+
+    def __chunks(self, jobs, nonces):
+        chunk = []
+        for job in jobs:
+            method = job[0]
+            if encoders.get(method) == None:
+                raise ValueError('unknown vend method: {}'.format(method))
+            k = strip_0x(job[1]).lower()
+            nonce = nonces.get(k)
+            if nonce == None:
+                raise ValueError('no start nonce for sender {}'.format(job[1]))
+            nonces[k] = nonce + 1
+            chunk.append((method, job[1], nonce, job[2:],))
+            if len(chunk) == self.chunk_size:
+                yield chunk
+                chunk = []
+        if len(chunk) > 0:
+            yield chunk
+
+
+    def __write(self, w, results):
+        for (tx_hash, tx_raw, sender_address, nonce) in results:
+            o = {
+                'hash': tx_hash,
+                'raw': tx_raw,
+                'from': sender_address,
+                'nonce': nonce,
+                    }
+            w.write(json.dumps(o) + '\n')
+        return len(results)
+
+
+    def run(self, contract_address, jobs, nonces, w):
+        """Sign all jobs and write one json line per transaction to the writer, in job order.
+
+        Jobs are tuples of method name (create, deposit or withdraw), sender address and the method arguments. Only a bounded number of chunks are in flight at any time, so memory use does not grow with the number of jobs.
+
+        :param contract_address: Vend contract address
+        :type contract_address: str
+        :param jobs: Jobs to sign
+        :type jobs: iterable
+        :param nonces: Start nonce per sender address
+        :type nonces: dict
+        :param w: Output writer
+        :type w: file-like object
+        :rtype: tuple
+        :returns: Number of transactions written, next nonce per sender address
+        """
+        next_nonces = {}
+        for k in nonces.keys():
+            next_nonces[strip_0x(k).lower()] = nonces[k]
+
+        count = 0
+        with ProcessPoolExecutor(max_workers=self.workers, initializer=_worker_init, initargs=(str(self.chain_spec), self.keys, self.gas_price, self.gas_limit)) as executor:
+            window = self.workers * 2
+            pending = collections.deque()
+            for chunk in self.__chunks(jobs, next_nonces):
+                pending.append(executor.submit(_worker_sign, contract_address, chunk))
+                if len(pending) >= window:
+                    count += self.__write(w, pending.popleft().result())
+            while len(pending) > 0:
+                count += self.__write(w, pending.popleft().result())
+
+        logg.info('signed {} vend transactions'.format(count))
+        return (count, next_nonces,)
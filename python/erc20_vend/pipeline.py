@@ -0,0 +1,163 @@
+# standard imports
+import logging
+import time
+import collections
+
+# external imports
+from chainlib.eth.tx import receipt
+from chainlib.error import JSONRPCException
+
+# local imports
+from erc20_vend.event import hex_int
+
+logg = logging.getLogger(__name__)
+
+
+class PipelineResult:
+    """Outcome of one transaction submitted to the pipeline.
+
+    :param tx_hash: Transaction hash
+    :type tx_hash: str
+    :param tag: Caller value identifying the transaction, by default its position in the input
+    :type tag: any
+    """
+    def __init__(self, tx_hash, tag=None):
+        self.tx_hash = tx_hash
+        self.tag = tag
+        self.receipt = None
+        self.status = None
+        self.error = None
+
+
+    def reverted(self):
+        return self.status == 0
+
+
+    def __str__(self):
+        if self.error != None:
+            return 'tx {} not sent: {}'.format(self.tx_hash, self.error)
+        return 'tx {} status {}'.format(self.tx_hash, self.status)
+
+
+class TxPipeline:
+    """Submit signed transactions with a bounded number of them waiting for receipt.
+
+    Receipts of all waiting transactions are polled with one json-rpc batch request. The poll interval starts at the given interval, is multiplied by the backoff factor after each poll that confirms nothing, up to the maximum interval, and is reset when a poll confirms a transaction.
+
+    The connection must accept json-rpc batch (list) requests.
+
+    :param conn: RPC connection
+    :type conn: chainlib.connection.RPCConnection
+    :param max_inflight: Maximum number of transactions waiting for receipt
+    :type max_inflight: int
+    :param poll_interval: Initial seconds between receipt polls
+    :type poll_interval: float
+    :param max_poll_interval: Maximum seconds between receipt polls
+    :type max_poll_interval: float
+    :param backoff: Poll interval multiplier when nothing was confirmed
+    :type backoff: float
+    :param id_generator: json-rpc id generator
+    :type id_generator: chainlib.connection.JSONRPCIdGenerator
+    """
+    def __init__(self, conn, max_inflight=16, poll_interval=0.5, max_poll_interval=8.0, backoff=2.0, id_generator=None):
+        self.conn = conn
+        self.max_inflight = max_inflight
+        self.poll_interval = poll_interval
+        self.max_poll_interval = max_poll_interval
+        self.backoff = backoff
+        self.id_generator = id_generator
+        self.interval = poll_interval
+        self.inflight = collections.OrderedDict()
+
+
+    def __len__(self):
+        return len(self.inflight)
+
+
+    def submit(self, tx_hash, o, tag=None):
+        """Send a transaction and wait for its receipt in later polls.
+
+        :param tx_hash: Transaction hash
+        :type tx_hash: str
+        :param o: Signed transaction json-rpc request, as from the vend and token builders
+        :type o: dict
+        :raises chainlib.error.JSONRPCException: Transaction could not be sent
+        :rtype: erc20_vend.pipeline.PipelineResult
+        :returns: Result, completed when the receipt is polled
+        """
+        r = PipelineResult(tx_hash, tag=tag)
+        self.conn.do(o)
+        self.inflight[tx_hash] = r
+        logg.debug('submitted tx {}, {} in flight'.format(tx_hash, len(self.inflight)))
+        return r
+
+
+    def poll(self):
+        """Poll receipts of all waiting transactions once.
+
+        :rtype: list of erc20_vend.pipeline.PipelineResult
+        :returns: Results confirmed by this poll, in submission order
+        """
+        if len(self.inflight) == 0:
+            return []
+        tx_hashes = list(self.inflight.keys())
+        o = [receipt(tx_hash, id_generator=self.id_generator) for tx_hash in tx_hashes]
+        v = self.conn.do(o)
+        confirmed = []
+        for i, rcpt in enumerate(v):
+            if rcpt == None:
+                continue
+            r = self.inflight.pop(tx_hashes[i])
+            r.receipt = rcpt
+            r.status = hex_int(rcpt['status'])
+            if r.reverted():
+                logg.warning('tx {} reverted'.format(r.tx_hash))
+            confirmed.append(r)
+        if len(confirmed) > 0:
+            self.interval = self.poll_interval
+        else:
+            self.interval = min(self.interval * self.backoff, self.max_poll_interval)
+        return confirmed
+
+
+    def wait(self):
+        """Poll until at least one waiting transaction is confirmed.
+
+        The first poll is made without waiting, since receipts may already be available.
+
+        :rtype: list of erc20_vend.pipeline.PipelineResult
+        :returns: Confirmed results, in submission order
+        """
+        while len(self.inflight) > 0:
+            confirmed = self.poll()
+            if len(confirmed) > 0:
+                return confirmed
+            time.sleep(self.interval)
+        return []
+
+
+    def run(self, txs):
+        """Submit transactions in order and yield their results as they are confirmed.
+
+        If a transaction cannot be sent the nonces of the following ones would be wrong, so its result is yielded with the error set, nothing more is submitted, and the results of the transactions already sent are yielded before the generator ends.
+
+        :param txs: Transaction hash and signed transaction request pairs, built lazily if the builders use a nonce oracle
+        :type txs: iterable
+        :rtype: generator
+        :returns: Results in confirmation order, tagged with the input position
+        """
+        for i, (tx_hash, o) in enumerate(txs):
+            while len(self.inflight) >= self.max_inflight:
+                for r in self.wait():
+                    yield r
+            try:
+                self.submit(tx_hash, o, tag=i)
+            except JSONRPCException as e:
+                r = PipelineResult(tx_hash, tag=i)
+                r.error = str(e)
+                logg.error('tx {} could not be sent, stopping submission: {}'.format(tx_hash, e))
+                yield r
+                break
+        while len(self.inflight) > 0:
+            for r in self.wait():
+                yield r
@@ -0,0 +1,147 @@
+# standard imports
+import logging
+import collections
+
+# external imports
+from chainlib.eth.constant import ZERO_ADDRESS
+from chainlib.eth.address import to_checksum_address
+
+# local imports
+from erc20_vend.multicall import Multicall
+from erc20_vend import calldata
+
+logg = logging.getLogger(__name__)
+
+# Token is None if the token index does not exist.
+# Used is the usedBy value, or None if the token address was not known when the request was built.
+Preflight = collections.namedtuple('Preflight', ['holder', 'token_idx', 'token', 'balance', 'allowance', 'used'])
+
+
+def parse_uint(success, v):
+    if not success or len(v) < 64:
+        return None
+    return int(v[:64], 16)
+
+
+def parse_address(success, v):
+    if not success or len(v) < 64:
+        return None
+    return to_checksum_address(v[24:64])
+
+
+def parse_uint_array(success, v):
+    if not success or len(v) < 128:
+        return None
+    cursor = int(v[:64], 16) * 2
+    count = int(v[cursor:cursor+64], 16)
+    cursor += 64
+    r = []
+    for i in range(count):
+        r.append(int(v[cursor:cursor+64], 16))
+        cursor += 64
+    return r
+
+
+class VendPreflight:
+    """Read the deposit preconditions of many holders and vended tokens with a single call to a multicall contract.
+
+    For every (holder, token index) pair, the holder balance of the held token, the allowance given to the vend contract, and the address of the vended token are read. Every holder and token index is read only once per page.
+
+    Whether the holder already deposited or withdrew is read for tokens that are in the token cache, with one usedByMany call per token. The cache must not change between building the request and parsing the result.
+
+    :param chain_spec: Chain spec
+    :type chain_spec: chainlib.chain.ChainSpec
+    :param multicall_address: Multicall contract address
+    :type multicall_address: str
+    :param contract_address: Vend contract address
+    :type contract_address: str
+    :param token_address: Held token address, the default token of the vend contract
+    :type token_address: str
+    :param token_cache: Vended token addresses of the vend contract
+    :type token_cache: erc20_vend.vend.VendTokenCache
+    """
+    def __init__(self, chain_spec, multicall_address, contract_address, token_address, token_cache=None):
+        self.multicall = Multicall(chain_spec)
+        self.multicall_address = multicall_address
+        self.contract_address = contract_address
+        self.token_address = token_address
+        self.token_cache = token_cache
+
+
+    # Holders in order, token indices to look up, and holders by index of known tokens.
+    def __plan(self, pairs):
+        tokens = []
+        if self.token_cache != None:
+            tokens = self.token_cache.get(self.contract_address)
+        holders = []
+        indices = []
+        known = {}
+        for (holder, token_idx) in pairs:
+            if holder not in holders:
+                holders.append(holder)
+            if token_idx < len(tokens):
+                if known.get(token_idx) == None:
+                    known[token_idx] = []
+                if holder not in known[token_idx]:
+                    known[token_idx].append(holder)
+            elif token_idx not in indices:
+                indices.append(token_idx)
+        return (holders, indices, known, tokens,)
+
+
+    def request(self, pairs, sender_address=ZERO_ADDRESS, id_generator=None):
+        (holders, indices, known, tokens) = self.__plan(pairs)
+        calls = []
+        for holder in holders:
+            calls.append((self.token_address, calldata.balance_of.encode(holder),))
+            calls.append((self.token_address, calldata.allowance.encode(holder, self.contract_address),))
+        for token_idx in indices:
+            calls.append((self.contract_address, calldata.get_token_by_index.encode(token_idx),))
+        for token_idx in known.keys():
+            calls.append((self.contract_address, calldata.used_by_many.encode(known[token_idx], tokens[token_idx]),))
+        return self.multicall.aggregate(self.multicall_address, calls, sender_address=sender_address, id_generator=id_generator)
+
+
+    def parse(self, pairs, v):
+        (holders, indices, known, tokens) = self.__plan(pairs)
+        (block_number, results) = self.multicall.parse_aggregate(v)
+        balances = {}
+        allowances = {}
+        token_addresses = {}
+        used = {}
+        i = 0
+        for holder in holders:
+            balances[holder] = parse_uint(*results[i])
+            allowances[holder] = parse_uint(*results[i+1])
+            i += 2
+        for token_idx in indices:
+            token_addresses[token_idx] = parse_address(*results[i])
+            i += 1
+        for token_idx in known.keys():
+            token_addresses[token_idx] = tokens[token_idx]
+            r = parse_uint_array(*results[i])
+            i += 1
+            if r == None:
+                continue
+            for j, holder in enumerate(known[token_idx]):
+                used[(holder, token_idx,)] = r[j]
+
+        r = []
+        for (holder, token_idx) in pairs:
+            r.append(Preflight(holder, token_idx, token_addresses[token_idx], balances[holder], allowances[holder], used.get((holder, token_idx,))))
+        return r
+
+
+    def check(self, conn, pairs, sender_address=ZERO_ADDRESS, id_generator=None):
+        """Read the deposit preconditions for all pairs in one json-rpc call.
+
+        :param conn: RPC connection
+        :type conn: chainlib.connection.RPCConnection
+        :param pairs: Holder address and vended token index
+        :type pairs: list of tuple
+        :rtype: list of erc20_vend.preflight.Preflight
+        :returns: Preconditions, in the order of the pairs
+        """
+        o = self.request(pairs, sender_address=sender_address, id_generator=id_generator)
+        r = conn.do(o)
+        return self.parse(pairs, r)
@@ -0,0 +1,117 @@
+#!python3
+
+"""Run vend operations in bulk from a jsonl or csv file
+
+.. moduleauthor:: Louis Holbrook <dev@holbrook.no>
+.. pgp:: 0826EDA1702D1E87C6E2875121D2E7BB88C2A746 
+
+"""
+
+# SPDX-License-Identifier: AGPL-3.0-or-later
+
+# standard imports
+import sys
+import os
+import logging
+
+# external imports
+import chainlib.eth.cli
+from chainlib.eth.cli.log import process_log
+from chainlib.eth.settings import process_settings
+from chainlib.settings import ChainSettings
+from chainlib.eth.cli.arg import (
+        Arg,
+        ArgFlag,
+        process_args,
+        )
+from chainlib.eth.cli.config import (
+        Config,
+        process_config,
+        )
+
+# local imports
+from erc20_vend import Vend
+from erc20_vend.bulk import (
+        VendBulk,
+        readers,
+        )
+
+logg = logging.getLogger()
+
+
+def process_config_local(config, arg, args, flags):
+    config.add(args.input, '_INPUT', False)
+    fmt = args.format
+    if fmt == None:
+        fmt = 'jsonl'
+        if os.path.splitext(args.input)[1].lower() == '.csv':
+            fmt = 'csv'
+    config.add(fmt, '_FORMAT', False)
+    config.add(args.output, '_OUTPUT', False)
+    config.add(args.max_inflight, '_MAX_INFLIGHT', False)
+    config.add(args.poll_interval, '_POLL_INTERVAL', False)
+    return config
+
+
+arg_flags = ArgFlag()
+arg = Arg(arg_flags)
+flags = arg_flags.STD_WRITE | arg_flags.EXEC | arg_flags.WALLET
+
+argparser = chainlib.eth.cli.ArgumentParser()
+argparser = process_args(argparser, arg, flags)
+argparser.add_argument('input', type=str, help='Operations file, - for standard input')
+argparser.add_argument('--format', type=str, choices=list(readers.keys()), help='Operations file format, by file extension if not given')
+argparser.add_argument('-o', dest='output', type=str, help='Write results to file instead of standard output')
+argparser.add_argument('--max-inflight', dest='max_inflight', type=int, default=16, help='Maximum number of transactions waiting for receipt')
+argparser.add_argument('--poll-interval', dest='poll_interval', type=float, default=0.5, help='Initial seconds between receipt polls, doubled while nothing is confirmed')
+args = argparser.parse_args()
+
+logg = process_log(args, logg)
+
+config = Config()
+config = process_config(config, arg, args, flags, positional_name='input')
+config = process_config_local(config, arg, args, flags)
+logg.debug('config loaded:\n{}'.format(config))
+
+settings = ChainSettings()
+settings = process_settings(settings, config)
+logg.debug('settings loaded:\n{}'.format(settings))
+
+
+def main():
+    c = Vend(
+            settings.get('CHAIN_SPEC'),
+            signer=settings.get('SIGNER'),
+            gas_oracle=settings.get('GAS_ORACLE'),
+            nonce_oracle=settings.get('NONCE_ORACLE'),
+            )
+    bulk = VendBulk(
+            settings.get('CONN'),
+            c,
+            settings.get('EXEC'),
+            settings.get('SENDER_ADDRESS'),
+            max_inflight=config.get('_MAX_INFLIGHT'),
+            send=settings.get('RPC_SEND'),
+            wait=settings.get('WAIT'),
+            poll_interval=config.get('_POLL_INTERVAL'),
+            id_generator=settings.get('RPC_ID_GENERATOR'),
+            )
+
+    f = sys.stdin
+    if config.get('_INPUT') != '-':
+        f = open(config.get('_INPUT'), 'r')
+    w = sys.stdout
+    if config.get('_OUTPUT') != None:
+        w = open(config.get('_OUTPUT'), 'a')
+
+    c = bulk.run(readers[config.get('_FORMAT')](f), w)
+    logg.info('ran {} operations'.format(c))
+
+    if f != sys.stdin:
+        f.close()
+    if w != sys.stdout:
+        w.close()
+
+
+if __name__ == '__main__':
+    main()
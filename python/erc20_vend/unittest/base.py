@@ -1,10 +1,19 @@
 # standard imports
+import os
 import logging
 import time
 
 # external imports
 from chainlib.eth.unittest.ethtester import EthTesterCase
-from chainlib.connection import RPCConnection
+from chainlib.eth.unittest.base import (
+    TestRPCConnection,
+    to_ethtester_call,
+)
+from hexathon import add_0x
+from chainlib.connection import (
+    RPCConnection,
+    ConnType,
+)
 from chainlib.eth.nonce import RPCNonceOracle
 from chainlib.eth.tx import receipt
 from chainlib.eth.address import to_checksum_address
@@ -14,16 +23,101 @@ from chainlib.eth.block import block_latest
 
 # local imports
 from erc20_vend import Vend
+from erc20_vend.calldata import CalldataTemplate
+from erc20_vend.data import registry
 
 logg = logging.getLogger(__name__)
 
+# chain snapshot and fixture attributes by test class, for the snapshot fixture mode
+fixtures = {}
+
+
+# Lists and dicts of the fixture are copied, so that tests cannot change them for the tests after.
+def copy_value(v):
+    if isinstance(v, list) or isinstance(v, dict):
+        return v.copy()
+    return v
+
+
+# True if the artifact of the contract version has the method, so tests and tools can skip methods that older builds lack.
+def bytecode_has_method(method, types=[], version=None):
+    selector = CalldataTemplate(method, types).selector
+    return registry.get(version).has_selector(selector)
+
+
+# Adds json-rpc batch (list) requests, gas estimates and log queries to the eth-tester connection,
+# in the format served by http nodes.
+class TestBatchRPCConnection(TestRPCConnection):
+
+    def eth_blockNumber(self, p):
+        block = self.backend.get_block_by_number('latest')
+        return hex(block['number'])
+
+
+    def eth_getLogs(self, p):
+        f = p[0]
+        address = f.get('address')
+        if address != None:
+            if isinstance(address, list):
+                address = [add_0x(a) for a in address]
+            else:
+                address = add_0x(address)
+        r = []
+        for l in self.backend.get_logs(from_block=int(f['fromBlock'], 16), to_block=int(f['toBlock'], 16), address=address, topics=f.get('topics')):
+            r.append({
+                'address': l['address'],
+                'topics': list(l['topics']),
+                'data': l['data'],
+                'blockNumber': hex(l['block_number']),
+                'blockHash': l['block_hash'],
+                'transactionHash': l['transaction_hash'],
+                'transactionIndex': hex(l['transaction_index']),
+                'logIndex': hex(l['log_index']),
+                })
+        return r
+
+
+    def eth_estimateGas(self, p):
+        tx = dict(p[0])
+        tx.setdefault('to', None)
+        tx.setdefault('gas', '0x00')
+        tx.setdefault('gasPrice', '0x00')
+        tx = to_ethtester_call(tx)
+        if tx['to'] == None:
+            del tx['to']
+        return hex(self.backend.estimate_gas(tx))
+
+
+    def do(self, o, **kwargs):
+        if isinstance(o, list):
+            r = []
+            for v in o:
+                r.append(super(TestBatchRPCConnection, self).do(v, **kwargs))
+            return r
+        return super(TestBatchRPCConnection, self).do(o, **kwargs)
+
+
 class TestVendCore(TestGiftableToken):
+    """Base case with the held token deployed, and the vend contract deployed by fixture.
+
+    In snapshot mode the fixture is deployed by the first test of the class only. The chain is then snapshotted, and each following test starts from the chain reverted to the snapshot and with the instance attributes set up by the first test. Anything a subclass sets up after calling setUp of this class is still run for every test.
+
+    Snapshot mode is enabled per class with the snapshot attribute, or for all classes with the ERC20_VEND_TEST_SNAPSHOT environment variable.
+    """
 
     expire = 0
 
+    snapshot = os.environ.get('ERC20_VEND_TEST_SNAPSHOT', '') not in ['', '0']
+
     def setUp(self):
+        if self.snapshot and self.restore():
+            return
+
         super(TestVendCore, self).setUp()
 
+        self.rpc = TestBatchRPCConnection(None, self.helper, self.signer)
+        self.conn = self.rpc
+
         self.alice = self.accounts[1]
         self.bob = self.accounts[2]
 
@@ -34,28 +128,75 @@ class TestVendCore(TestGiftableToken):
         r = self.rpc.do(o)
         self.token_decimals = c.parse_decimals(r)
 
+        self.fixture()
+
+        if self.snapshot:
+            self.save()
+
+
+    @classmethod
+    def tearDownClass(cls):
+        fixtures.pop(cls, None)
+        super(TestVendCore, cls).tearDownClass()
+
 
-    def publish(self, mint=False, decimals=0):
+    def fixture(self):
+        """Contracts and state shared by all tests of the class, run at the end of setUp.
+        """
+        pass
+
+
+    def save(self):
+        state = {}
+        for k in self.__dict__.keys():
+            if k[0] != '_':
+                state[k] = copy_value(self.__dict__[k])
+        snapshot_id = self.helper.take_snapshot()
+        fixtures[self.__class__] = (snapshot_id, state,)
+        logg.debug('saved fixture of {} at chain snapshot {}'.format(self.__class__.__name__, snapshot_id))
+
+
+    def restore(self):
+        """Revert to the fixture saved by the first test of the class.
+
+        :rtype: bool
+        :returns: False if no fixture has been saved yet
+        """
+        v = fixtures.get(self.__class__)
+        if v == None:
+            return False
+        (snapshot_id, state) = v
+        for k in state.keys():
+            setattr(self, k, copy_value(state[k]))
+        self.helper.revert_to_snapshot(snapshot_id)
+
+        def rpc_with_tester(chain_spec=self.chain_spec, url=None):
+            return self.rpc
+
+        RPCConnection.register_constructor(ConnType.CUSTOM, rpc_with_tester, tag='default')
+        RPCConnection.register_constructor(ConnType.CUSTOM, rpc_with_tester, tag='signer')
+        return True
+
+
+    def publish(self, mint=False, decimals=0, clone=False, version=None):
         nonce_oracle = RPCNonceOracle(self.accounts[0], conn=self.conn)
         c = Vend(self.chain_spec, signer=self.signer, nonce_oracle=nonce_oracle)
-        (tx_hash, o) = c.constructor(self.accounts[0], self.token_address, mint=mint, decimals=decimals)
+        (tx_hash, o) = c.constructor(self.accounts[0], self.token_address, mint=mint, decimals=decimals, clone=clone, version=version)
         self.rpc.do(o)
         o = receipt(tx_hash)
         r = self.rpc.do(o)
         self.assertEqual(r['status'], 1)
         self.vend_address = to_checksum_address(r['contract_address'])
-        logg.debug('published vend on address {} with hash {}'.format(self.vend_address, tx_hash))
+        logg.debug('published vend on address {} with hash {}'.format(self.vend_address, tx_hash))
 
 
 class TestVend(TestVendCore):
 
-    def setUp(self):
-        super(TestVend, self).setUp()
+    def fixture(self):
         self.publish()
 
 
 class TestVendParams(TestVendCore):
 
-    def setUp(self):
-        super(TestVendParams, self).setUp()
-        self.publish(lock=True, decimals=2)
+    def fixture(self):
+        self.publish(decimals=2)
@@ -1,12 +1,12 @@
 # standard imports
 import logging
-import os
 import enum
 
 # external imports
+import sha3
+import rlp
 from chainlib.eth.constant import ZERO_ADDRESS
 from chainlib.eth.contract import (
-    ABIContractEncoder,
     ABIContractDecoder,
     ABIContractType,
     abi_decode_single,
@@ -17,121 +17,303 @@ from chainlib.eth.tx import (
     TxFactory,
     TxFormat,
 )
+from chainlib.eth.nonce import nonce as nonce_query
+from chainlib.eth.address import (
+    is_same_address,
+    to_checksum_address,
+)
 from chainlib.jsonrpc import JSONRPCRequest
 from chainlib.block import BlockSpec
+from chainlib.error import JSONRPCException
 from hexathon import (
     add_0x,
     strip_0x,
 )
-from chainlib.eth.cli.encode import CLIEncoder
 
 # local imports
-from erc20_vend.data import data_dir
+from erc20_vend.data import registry
+from erc20_vend import calldata
+from erc20_vend import event
+from erc20_vend import gas as vend_gas
+from erc20_vend.gas import VendGasOracle
+from erc20_vend.instrument import (
+    instrumented,
+    stage,
+)
+from erc20_vend.hooks import (
+    constructor_args,
+    check_clone,
+)
 
 logg = logging.getLogger()
 
+# number of token indices to request per json-rpc batch
+token_window = 32
+
+# usedBy value after withdraw
+used_withdrawn = (1 << 256) - 1
+
+
+class VendTokenCache:
+
+    def __init__(self):
+        self.tokens = {}
+
+
+    def get(self, contract_address):
+        k = strip_0x(contract_address).lower()
+        if self.tokens.get(k) == None:
+            self.tokens[k] = []
+        return self.tokens[k]
+
+
+    def clear(self, contract_address=None):
+        if contract_address == None:
+            self.tokens = {}
+            return
+        k = strip_0x(contract_address).lower()
+        if self.tokens.get(k) != None:
+            del self.tokens[k]
 
 
 class Vend(TxFactory):
 
-    __abi = None
-    __bytecode = None
+    collector = None
+    instrument_frame = None
+
+    # A collector (erc20_vend.instrument.Collector) times the stages of every builder method.
+    def __init__(self, chain_spec, signer=None, gas_oracle=None, nonce_oracle=None, token_cache=None, collector=None):
+        super(Vend, self).__init__(chain_spec, signer=signer, gas_oracle=gas_oracle, nonce_oracle=nonce_oracle)
+        if token_cache == None:
+            token_cache = VendTokenCache()
+        self.token_cache = token_cache
+        self.collector = collector
 
-    def constructor(self, sender_address, token_address, decimals=0, mint=False, tx_format=TxFormat.JSONRPC, version=None):
-        code = self.cargs(token_address, decimals=decimals, mint=mint, version=version)
+
+    @instrumented
+    def constructor(self, sender_address, token_address, decimals=0, mint=False, tx_format=TxFormat.JSONRPC, version=None, clone=False):
+        code = self.cargs(token_address, decimals=decimals, mint=mint, version=version, clone=clone)
         tx = self.template(sender_address, None, use_nonce=True)
         tx = self.set_code(tx, code)
         return self.finalize(tx, tx_format)
 
 
     @staticmethod
-    def cargs(token_address, decimals=0, mint=False, version=None):
+    def cargs(token_address, decimals=0, mint=False, version=None, clone=False):
+        if clone:
+            check_clone(version)
         code = Vend.bytecode(version=version)
-        enc = ABIContractEncoder()
-        enc.address(token_address)
-        enc.uintn(decimals, 8)
-        enc.bool(mint)
-        args = enc.get()
+        args = constructor_args(token_address, decimals=decimals, mint=mint, clone=clone)
         code += args
         logg.debug('constructor code: ' + args)
         return code
 
 
+    # Static gas limit for the input data. Mode flags of an existing contract are not known here,
+    # so tables for a supply contract without clones are used; use VendGasOracle for mode-aware limits.
+    # Input data that is neither a vend method nor vend contract creation gets the default limit.
     @staticmethod
     def gas(code=None):
-        return 4000000
+        if code == None:
+            return vend_gas.default_limit
+        code = strip_0x(code)
+        mint = False
+        clone = False
+        method = vend_gas.methods.get(code[:8])
+        if method == None and code[:10] == vend_gas.init_code_prefix:
+            method = 'constructor'
+            (mint, clone) = vend_gas.constructor_mode(code)
+        if method == None:
+            return vend_gas.default_limit
+        count = 1
+        if method in vend_gas.batch_methods:
+            count = vend_gas.item_count(code, vend_gas.batch_methods[method][1])
+        return vend_gas.static_limit(method, mint=mint, clone=clone, count=count)
 
 
 
     @staticmethod
-    def abi():
-        if Vend.__abi == None:
-            f = open(os.path.join(data_dir, 'Vend.json'), 'r')
-            Vend.__abi = json.load(f)
-            f.close()
-        return Vend.__abi
+    def abi(version=None):
+        return registry.get(version).abi()
 
 
+    # Contract code by version; all versions have the same interface and behavior.
     @staticmethod
     def bytecode(version=None):
-        if Vend.__bytecode == None:
-            f = open(os.path.join(data_dir, 'Vend.bin'))
-            Vend.__bytecode = f.read()
-            f.close()
-        return Vend.__bytecode
+        return registry.get(version).hex()
 
     
+    # Gas price and nonce lookup.
+    def template(self, sender, recipient, use_nonce=False):
+        return stage(self, 'template', super(Vend, self).template, sender, recipient, use_nonce=use_nonce)
+
+
+    # Passes sender and recipient to the vend gas oracle, which needs them for node estimates.
+    def set_code(self, tx, data, update_fee=True):
+        return stage(self, 'set_code', self.__set_code, tx, data, update_fee=update_fee)
+
+
+    def __set_code(self, tx, data, update_fee=True):
+        if update_fee and isinstance(self.gas_oracle, VendGasOracle):
+            tx['data'] = data
+            tx['gas'] = self.gas_oracle.get_limit(data, sender_address=tx['from'], contract_address=tx['to'])
+            return tx
+        return super(Vend, self).set_code(tx, data, update_fee=update_fee)
+
+
+    def normalize(self, tx):
+        return stage(self, 'normalize', super(Vend, self).normalize, tx)
+
+
+    # Signing, for the signed formats.
+    def finalize(self, tx, tx_format=TxFormat.JSONRPC, id_generator=None):
+        return stage(self, 'finalize', super(Vend, self).finalize, tx, tx_format=tx_format, id_generator=id_generator)
+
+
+    @instrumented
     def create(self, contract_address, sender_address, name, symbol, tx_format=TxFormat.JSONRPC, id_generator=None):
-        enc = ABIContractEncoder()
-        enc.method('create')
-        enc.typ(ABIContractType.STRING)
-        enc.typ(ABIContractType.STRING)
-        enc.string(name)
-        enc.string(symbol)
-        data = add_0x(enc.get())
+        data = add_0x(calldata.create.encode(name, symbol))
+        tx = self.template(sender_address, contract_address, use_nonce=True)
+        tx = self.set_code(tx, data)
+        tx = self.finalize(tx, tx_format, id_generator=id_generator)
+        return tx
+
+
+    # All tokens are created in one transaction, in order; see create_many for one transaction per token.
+    @instrumented
+    def create_many_tokens(self, contract_address, sender_address, names, symbols, tx_format=TxFormat.JSONRPC, id_generator=None):
+        if len(names) != len(symbols):
+            raise ValueError('got {} names and {} symbols'.format(len(names), len(symbols)))
+        data = add_0x(calldata.create_many.encode(names, symbols))
         tx = self.template(sender_address, contract_address, use_nonce=True)
         tx = self.set_code(tx, data)
         tx = self.finalize(tx, tx_format, id_generator=id_generator)
         return tx
 
 
+    @instrumented
     def deposit(self, contract_address, sender_address, token_address, tx_format=TxFormat.JSONRPC, id_generator=None):
-        enc = ABIContractEncoder()
-        enc.method('deposit')
-        enc.typ(ABIContractType.ADDRESS)
-        enc.typ(ABIContractType.UINT256)
-        enc.address(token_address)
-        enc.uint256(0)
-        data = add_0x(enc.get())
+        data = add_0x(calldata.deposit.encode(token_address))
+        tx = self.template(sender_address, contract_address, use_nonce=True)
+        tx = self.set_code(tx, data)
+        tx = self.finalize(tx, tx_format, id_generator=id_generator)
+        return tx
+
+
+    # Deposit explicit held token amounts for several vended tokens in one transaction, see deposit_many
+    # for one transaction per token. The vend contract needs allowance for the sum of the values.
+    @instrumented
+    def deposit_many_tokens(self, contract_address, sender_address, token_addresses, values, tx_format=TxFormat.JSONRPC, id_generator=None):
+        if len(token_addresses) != len(values):
+            raise ValueError('got {} tokens and {} values'.format(len(token_addresses), len(values)))
+        for v in values:
+            if v <= 0:
+                raise ValueError('deposit value must be positive, got {}'.format(v))
+        data = add_0x(calldata.deposit_many.encode(token_addresses, values))
         tx = self.template(sender_address, contract_address, use_nonce=True)
         tx = self.set_code(tx, data)
         tx = self.finalize(tx, tx_format, id_generator=id_generator)
         return tx
 
 
+    @instrumented
     def withdraw(self, contract_address, sender_address, token_address, tx_format=TxFormat.JSONRPC, id_generator=None):
-        enc = ABIContractEncoder()
-        enc.method('withdraw')
-        enc.typ(ABIContractType.ADDRESS)
-        enc.typ(ABIContractType.UINT256)
-        enc.address(token_address)
-        enc.uint256(0)
-        data = add_0x(enc.get())
+        data = add_0x(calldata.withdraw.encode(token_address))
+        tx = self.template(sender_address, contract_address, use_nonce=True)
+        tx = self.set_code(tx, data)
+        tx = self.finalize(tx, tx_format, id_generator=id_generator)
+        return tx
+
+
+    # Vend tokens to holders for held token amounts, by a vend contract writer. See erc20_vend.distribute
+    # for paging large holder lists.
+    @instrumented
+    def distribute(self, contract_address, sender_address, token_address, holder_addresses, values, tx_format=TxFormat.JSONRPC, id_generator=None):
+        if len(holder_addresses) != len(values):
+            raise ValueError('got {} holders and {} values'.format(len(holder_addresses), len(values)))
+        data = add_0x(calldata.distribute.encode(token_address, holder_addresses, values))
         tx = self.template(sender_address, contract_address, use_nonce=True)
         tx = self.set_code(tx, data)
         tx = self.finalize(tx, tx_format, id_generator=id_generator)
         return tx
 
 
+    # Resolve the first nonce of every sender in the jobs list.
+    # Senders not in the given nonces are resolved from the nonce oracle if it is for that sender,
+    # and the remaining ones with a single json-rpc batch request on the given connection.
+    def __start_nonces(self, jobs, nonces=None, conn=None, id_generator=None):
+        r = {}
+        if nonces != None:
+            for k in nonces.keys():
+                r[strip_0x(k).lower()] = nonces[k]
+        missing = []
+        for job in jobs:
+            k = strip_0x(job[0]).lower()
+            if k in r:
+                continue
+            if self.nonce_oracle != None and is_same_address(self.nonce_oracle.address, k):
+                r[k] = self.nonce_oracle.nonce
+                continue
+            r[k] = None
+            missing.append(job[0])
+        if len(missing) == 0:
+            return r
+        if conn == None:
+            raise ValueError('no nonce source for senders {}'.format(missing))
+        o = []
+        for sender_address in missing:
+            o.append(nonce_query(add_0x(sender_address), id_generator=id_generator))
+        v = conn.do(o)
+        for i, sender_address in enumerate(missing):
+            r[strip_0x(sender_address).lower()] = int(strip_0x(v[i]), 16)
+        return r
+
+
+    def __build_many(self, contract_address, jobs, encoder, nonces=None, conn=None, tx_format=TxFormat.JSONRPC, id_generator=None):
+        next_nonce = self.__start_nonces(jobs, nonces=nonces, conn=conn, id_generator=id_generator)
+        r = []
+        for job in jobs:
+            sender_address = job[0]
+            k = strip_0x(sender_address).lower()
+            data = add_0x(encoder.encode(*job[1:]))
+            tx = self.template(sender_address, contract_address)
+            tx['nonce'] = next_nonce[k]
+            next_nonce[k] += 1
+            tx = self.set_code(tx, data)
+            r.append(self.finalize(tx, tx_format, id_generator=id_generator))
+
+        # keep the oracle in step for single transactions built after this
+        if self.nonce_oracle != None:
+            k = strip_0x(self.nonce_oracle.address).lower()
+            if k in next_nonce:
+                self.nonce_oracle.nonce = next_nonce[k]
+        return r
+
+
+    # jobs are (sender_address, name, symbol)
+    @instrumented
+    def create_many(self, contract_address, jobs, nonces=None, conn=None, tx_format=TxFormat.JSONRPC, id_generator=None):
+        return self.__build_many(contract_address, jobs, calldata.create, nonces=nonces, conn=conn, tx_format=tx_format, id_generator=id_generator)
+
+
+    # jobs are (sender_address, token_address)
+    @instrumented
+    def deposit_many(self, contract_address, jobs, nonces=None, conn=None, tx_format=TxFormat.JSONRPC, id_generator=None):
+        return self.__build_many(contract_address, jobs, calldata.deposit, nonces=nonces, conn=conn, tx_format=tx_format, id_generator=id_generator)
+
+
+    # jobs are (sender_address, token_address)
+    @instrumented
+    def withdraw_many(self, contract_address, jobs, nonces=None, conn=None, tx_format=TxFormat.JSONRPC, id_generator=None):
+        return self.__build_many(contract_address, jobs, calldata.withdraw, nonces=nonces, conn=conn, tx_format=tx_format, id_generator=id_generator)
+
+
+    @instrumented
     def get_token(self, contract_address, token_idx, sender_address=ZERO_ADDRESS, id_generator=None):
         j = JSONRPCRequest(id_generator)
         o = j.template()
         o['method'] = 'eth_call'
-        enc = ABIContractEncoder()
-        enc.method('getTokenByIndex')
-        enc.typ(ABIContractType.UINT256)
-        enc.uint256(token_idx)
-        data = add_0x(enc.get())
+        data = add_0x(calldata.get_token_by_index.encode(token_idx))
         tx = self.template(sender_address, contract_address)
         tx = self.set_code(tx, data)
         o['params'].append(self.normalize(tx))
@@ -148,22 +330,213 @@ class Vend(TxFactory):
         return r[0]
 
 
-def bytecode(**kwargs):
-    return Vend.bytecode(version=kwargs.get('version'))
+    # Vended tokens are the only contracts the vend contract deploys, so token n is created
+    # with contract nonce n+1 (EIP-161), or n+2 when the clone implementation took nonce 1.
+    @staticmethod
+    def predict_token_address(contract_address, token_idx, clone=False):
+        nonce = token_idx + 1
+        if clone:
+            nonce += 1
+        h = sha3.keccak_256()
+        h.update(rlp.encode([bytes.fromhex(strip_0x(contract_address)), nonce]))
+        return to_checksum_address(h.digest()[12:].hex())
+
+
+    def parse_token_created(self, v):
+        return event.parse_log(event.topic_token_created, v)
+
+
+    # Mint from the vend contract on create, or from a vended token on deposit in mint mode.
+    def parse_mint(self, v):
+        if len(v['topics']) == 4:
+            return event.parse_log(event.topic_vend_mint, v)
+        return event.parse_log(event.topic_token_mint, v)
+
+
+    def parse_logs(self, v, topics=None):
+        return event.parse_logs(v, topics=topics)
 
 
-def create(**kwargs):
-    enc = CLIEncoder()
-    (typ, token_address) = enc.translate('a', strip_0x(kwargs['token_address']))
-    decimals = kwargs.get('decimals', 0)
-    if decimals != None:
-        (typ, decimals) = enc.translate('u', decimals)
-    return Vend.cargs(token_address, decimals=decimals, mint=kwargs.get('mint'), version=kwargs.get('version'))
+    @instrumented
+    def token_implementation(self, contract_address, sender_address=ZERO_ADDRESS, id_generator=None):
+        j = JSONRPCRequest(id_generator)
+        o = j.template()
+        o['method'] = 'eth_call'
+        data = add_0x(calldata.token_implementation.encode())
+        tx = self.template(sender_address, contract_address)
+        tx = self.set_code(tx, data)
+        o['params'].append(self.normalize(tx))
+        o['params'].append('latest')
+        o = j.finalize(o)
+        return o
+
+
+    def parse_token_implementation(self, v):
+        return abi_decode_single(ABIContractType.ADDRESS, v)
+
+
+    @instrumented
+    def token_count(self, contract_address, sender_address=ZERO_ADDRESS, id_generator=None):
+        j = JSONRPCRequest(id_generator)
+        o = j.template()
+        o['method'] = 'eth_call'
+        data = add_0x(calldata.token_count.encode())
+        tx = self.template(sender_address, contract_address)
+        tx = self.set_code(tx, data)
+        o['params'].append(self.normalize(tx))
+        o['params'].append('latest')
+        o = j.finalize(o)
+        return o
+
+
+    def parse_token_count(self, v):
+        return abi_decode_single(ABIContractType.UINT256, v)
+
+
+    @instrumented
+    def get_tokens(self, contract_address, offset, count, sender_address=ZERO_ADDRESS, id_generator=None):
+        j = JSONRPCRequest(id_generator)
+        o = j.template()
+        o['method'] = 'eth_call'
+        data = add_0x(calldata.get_tokens.encode(offset, count))
+        tx = self.template(sender_address, contract_address)
+        tx = self.set_code(tx, data)
+        o['params'].append(self.normalize(tx))
+        o['params'].append('latest')
+        o = j.finalize(o)
+        return o
+
+
+    # address[] return value; offset word, length word, then one word per address.
+    def parse_tokens(self, v):
+        v = strip_0x(v)
+        cursor = int(v[:64], 16) * 2
+        count = int(v[cursor:cursor+64], 16)
+        cursor += 64
+        r = []
+        for i in range(count):
+            r.append(abi_decode_single(ABIContractType.ADDRESS, v[cursor:cursor+64]))
+            cursor += 64
+        return r
+
+
+    @instrumented
+    def used_by(self, contract_address, holder_address, token_address, sender_address=ZERO_ADDRESS, id_generator=None):
+        j = JSONRPCRequest(id_generator)
+        o = j.template()
+        o['method'] = 'eth_call'
+        data = add_0x(calldata.used_by.encode(holder_address, token_address))
+        tx = self.template(sender_address, contract_address)
+        tx = self.set_code(tx, data)
+        o['params'].append(self.normalize(tx))
+        o['params'].append('latest')
+        o = j.finalize(o)
+        return o
+
+
+    # Zero if not deposited, used_withdrawn if withdrawn, otherwise the locked held token balance.
+    def parse_used_by(self, v):
+        return abi_decode_single(ABIContractType.UINT256, v)
+
+
+    @instrumented
+    def used_by_many(self, contract_address, holder_addresses, token_address, sender_address=ZERO_ADDRESS, id_generator=None):
+        j = JSONRPCRequest(id_generator)
+        o = j.template()
+        o['method'] = 'eth_call'
+        data = add_0x(calldata.used_by_many.encode(holder_addresses, token_address))
+        tx = self.template(sender_address, contract_address)
+        tx = self.set_code(tx, data)
+        o['params'].append(self.normalize(tx))
+        o['params'].append('latest')
+        o = j.finalize(o)
+        return o
+
+
+    # uint256[] return value; offset word, length word, then one word per holder.
+    def parse_used_by_many(self, v):
+        v = strip_0x(v)
+        cursor = int(v[:64], 16) * 2
+        count = int(v[cursor:cursor+64], 16)
+        cursor += 64
+        r = []
+        for i in range(count):
+            r.append(int(v[cursor:cursor+64], 16))
+            cursor += 64
+        return r
+
+
+    @instrumented
+    def returned(self, contract_address, token_address, sender_address=ZERO_ADDRESS, id_generator=None):
+        j = JSONRPCRequest(id_generator)
+        o = j.template()
+        o['method'] = 'eth_call'
+        data = add_0x(calldata.returned.encode(token_address))
+        tx = self.template(sender_address, contract_address)
+        tx = self.set_code(tx, data)
+        o['params'].append(self.normalize(tx))
+        o['params'].append('latest')
+        o = j.finalize(o)
+        return o
+
+
+    def parse_returned(self, v):
+        return abi_decode_single(ABIContractType.UINT256, v)
+
+
+    @instrumented
+    def get_token_batch(self, contract_address, offset, count, sender_address=ZERO_ADDRESS, id_generator=None):
+        o = []
+        for i in range(offset, offset + count):
+            o.append(self.get_token(contract_address, i, sender_address=sender_address, id_generator=id_generator))
+        return o
 
 
-def args(v):
-    if v == 'create':
-        return (['token_address'], ['decimals', 'mint'],)
-    elif v == 'default' or v == 'bytecode':
-        return ([], ['version'],)
-    raise ValueError('unknown command: ' + v)
+    # The token list has no length, so the end of the list is the first index that reverts.
+    # If a batch contains that index the whole batch fails, and the window is retried one index at a time.
+    def __fetch_tokens(self, conn, contract_address, offset, count, sender_address=ZERO_ADDRESS, id_generator=None):
+        tokens = []
+        o = self.get_token_batch(contract_address, offset, count, sender_address=sender_address, id_generator=id_generator)
+        try:
+            r = conn.do(o)
+            for v in r:
+                tokens.append(self.parse_token(v))
+            return tokens
+        except JSONRPCException:
+            logg.debug('token batch {}+{} on {} hit end of list, probing individually'.format(offset, count, contract_address))
+
+        for i in range(offset, offset + count):
+            o = self.get_token(contract_address, i, sender_address=sender_address, id_generator=id_generator)
+            try:
+                r = conn.do(o)
+            except JSONRPCException:
+                break
+            tokens.append(self.parse_token(r))
+        return tokens
+
+
+    def iter_tokens(self, conn, contract_address, offset=0, window=token_window, sender_address=ZERO_ADDRESS, id_generator=None):
+        tokens = self.token_cache.get(contract_address)
+        i = offset
+        done = False
+        while True:
+            while i < len(tokens):
+                yield tokens[i]
+                i += 1
+            if done:
+                return
+            r = self.__fetch_tokens(conn, contract_address, len(tokens), window, sender_address=sender_address, id_generator=id_generator)
+            tokens.extend(r)
+            done = len(r) < window
+
+
+    def list_tokens(self, conn, contract_address, offset=0, window=token_window, sender_address=ZERO_ADDRESS, id_generator=None):
+        return list(self.iter_tokens(conn, contract_address, offset=offset, window=window, sender_address=sender_address, id_generator=id_generator))
+
+
+# Single json-rpc batch request submitting all transactions built with TxFormat.JSONRPC.
+def batch(txs):
+    o = []
+    for (tx_hash, tx) in txs:
+        o.append(tx)
+    return o
@@ -0,0 +1,93 @@
+# standard imports
+import sys
+import os
+import re
+import time
+import glob
+import logging
+import argparse
+import subprocess
+import concurrent.futures
+
+logging.basicConfig(level=logging.WARNING)
+logg = logging.getLogger()
+
+script_dir = os.path.realpath(os.path.dirname(__file__))
+
+re_ran = re.compile(r'^Ran (\d+) tests? in')
+re_shard = re.compile(r'^(\d+)/(\d+)$')
+
+argparser = argparse.ArgumentParser(description='Run test files in parallel worker processes, each file in a fresh interpreter')
+argparser.add_argument('-j', '--jobs', type=int, default=os.cpu_count() or 1, help='Number of worker processes')
+argparser.add_argument('--shard', type=str, help='Run only shard i of n, given as i/n, of the sorted test files')
+argparser.add_argument('--snapshot', action='store_true', help='Deploy test fixtures once per class and revert the chain between tests')
+argparser.add_argument('-v', action='store_true', help='Write the output of all test files, not only of the failed ones')
+argparser.add_argument('files', nargs='*', type=str, help='Test files, default all files in tests')
+args = argparser.parse_args(sys.argv[1:])
+
+
+def shard(files, v):
+    m = re_shard.match(v)
+    if m == None:
+        raise ValueError('invalid shard {}, must be i/n'.format(v))
+    i = int(m.group(1))
+    n = int(m.group(2))
+    if i < 1 or i > n:
+        raise ValueError('shard {} out of range'.format(v))
+    return files[i-1::n]
+
+
+# Exit code, number of tests, seconds and output of one test file.
+def run(f, env):
+    t = time.perf_counter()
+    p = subprocess.run([sys.executable, f], env=env, cwd=script_dir, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+    elapsed = time.perf_counter() - t
+    out = p.stdout.decode('utf-8', errors='replace')
+    c = 0
+    for l in out.split('\n'):
+        m = re_ran.match(l)
+        if m != None:
+            c = int(m.group(1))
+    return (p.returncode, c, elapsed, out,)
+
+
+def main():
+    files = args.files
+    if len(files) == 0:
+        files = glob.glob(os.path.join(script_dir, 'tests', '*.py'))
+    files = sorted(os.path.realpath(f) for f in files)
+    if args.shard != None:
+        files = shard(files, args.shard)
+
+    env = dict(os.environ)
+    env['PYTHONPATH'] = script_dir + os.pathsep + env.get('PYTHONPATH', '')
+    if args.snapshot:
+        env['ERC20_VEND_TEST_SNAPSHOT'] = '1'
+
+    t = time.perf_counter()
+    failed = []
+    tests = 0
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max(args.jobs, 1)) as executor:
+        futures = {}
+        for f in files:
+            futures[executor.submit(run, f, env)] = f
+        for future in concurrent.futures.as_completed(futures):
+            f = os.path.relpath(futures[future], script_dir)
+            (code, c, elapsed, out) = future.result()
+            tests += c
+            if code != 0:
+                failed.append(f)
+                sys.stdout.write(out)
+            elif args.v:
+                sys.stdout.write(out)
+            print('{} {} tests {:.2f}s {}'.format(f, c, elapsed, 'ok' if code == 0 else 'FAILED'))
+
+    print('{} files {} tests {:.2f}s, {} failed'.format(len(files), tests, time.perf_counter() - t, len(failed)))
+    for f in sorted(failed):
+        print('failed: {}'.format(f))
+    if len(failed) > 0:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,178 @@
+# standard imports
+import unittest
+import logging
+import json
+import asyncio
+import threading
+from http.server import (
+    ThreadingHTTPServer,
+    BaseHTTPRequestHandler,
+)
+
+# external imports
+from chainlib.eth.nonce import RPCNonceOracle
+from chainlib.eth.tx import receipt
+from chainlib.eth.address import is_same_address
+from chainlib.jsonrpc import (
+    jsonrpc_response,
+    jsonrpc_error,
+)
+from chainlib.error import JSONRPCException
+from eth_erc20 import ERC20
+from giftable_erc20_token import GiftableToken
+
+# local imports
+from erc20_vend.unittest import TestVend
+from erc20_vend import Vend
+from erc20_vend.aio import (
+    AsyncVend,
+    AsyncHTTPConnection,
+    AsyncConnectionAdapter,
+)
+
+
+logging.basicConfig(level=logging.DEBUG)
+logg = logging.getLogger()
+
+
+class CountingAsyncConnection(AsyncConnectionAdapter):
+
+    def __init__(self, conn):
+        super(CountingAsyncConnection, self).__init__(conn)
+        self.count = 0
+        self.active = 0
+        self.max_active = 0
+
+
+    async def do(self, o, error_parser=None):
+        self.count += 1
+        self.active += 1
+        self.max_active = max(self.active, self.max_active)
+        try:
+            await asyncio.sleep(0.01)
+            return await super(CountingAsyncConnection, self).do(o)
+        finally:
+            self.active -= 1
+
+
+# Serves json-rpc over http from the eth-tester connection, one request at a time.
+def rpc_handler(conn):
+    lock = threading.Lock()
+
+    class RPCHandler(BaseHTTPRequestHandler):
+
+        protocol_version = 'HTTP/1.1'
+
+        def do_POST(self):
+            o = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+            with lock:
+                try:
+                    r = jsonrpc_response(o['id'], conn.do(o))
+                except JSONRPCException as e:
+                    r = jsonrpc_error(o['id'], message=str(e))
+            v = json.dumps(r).encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(v)))
+            self.end_headers()
+            self.wfile.write(v)
+
+
+        def log_message(self, *args):
+            pass
+
+    return RPCHandler
+
+
+class TestVendAsync(TestVend):
+
+    def setUp(self):
+        super(TestVendAsync, self).setUp()
+        nonce_oracle = RPCNonceOracle(self.accounts[0], conn=self.conn)
+        c = Vend(self.chain_spec, signer=self.signer, nonce_oracle=nonce_oracle)
+        for i in range(3):
+            (tx_hash, o) = c.create(self.vend_address, self.accounts[0], 'foo vend {}'.format(i), 'FOOVEND{}'.format(i))
+            self.rpc.do(o)
+        self.tokens = c.list_tokens(self.rpc, self.vend_address, sender_address=self.accounts[0])
+
+        c = GiftableToken(self.chain_spec, signer=self.signer, nonce_oracle=nonce_oracle)
+        (tx_hash, o) = c.mint_to(self.token_address, self.accounts[0], self.alice, 1000)
+        self.rpc.do(o)
+        nonce_oracle = RPCNonceOracle(self.alice, conn=self.conn)
+        c = ERC20(self.chain_spec, signer=self.signer, nonce_oracle=nonce_oracle)
+        (tx_hash, o) = c.approve(self.token_address, self.alice, self.vend_address, 400)
+        self.rpc.do(o)
+
+
+    def test_read(self):
+        conn = AsyncConnectionAdapter(self.rpc)
+        c = AsyncVend(self.chain_spec, conn)
+
+        async def run():
+            r = await asyncio.gather(*[c.get_token(self.vend_address, i, sender_address=self.accounts[0]) for i in range(3)])
+            vendable = await c.vendable(self.vend_address, self.token_address, self.alice, sender_address=self.accounts[0])
+            return (r, vendable,)
+
+        (r, vendable) = asyncio.run(run())
+        conn.close()
+        for i in range(3):
+            self.assertTrue(is_same_address(r[i], self.tokens[i]))
+        self.assertEqual(vendable, (1000, 400,))
+
+
+    def test_coalesce(self):
+        conn = CountingAsyncConnection(self.rpc)
+        c = AsyncVend(self.chain_spec, conn, concurrency=2)
+
+        async def run():
+            q = []
+            for i in range(30):
+                q.append(c.get_token(self.vend_address, i % 3, sender_address=self.accounts[0]))
+            q.append(c.balance_of(self.token_address, self.alice, sender_address=self.accounts[0]))
+            return await asyncio.gather(*q)
+
+        r = asyncio.run(run())
+        conn.close()
+        self.assertEqual(conn.count, 4)
+        self.assertEqual(c.coalesced, 27)
+        self.assertLessEqual(conn.max_active, 2)
+        self.assertTrue(is_same_address(r[29], self.tokens[2]))
+        self.assertEqual(r[30], 1000)
+        self.assertEqual(len(c.inflight), 0)
+
+
+    def test_http(self):
+        srv = ThreadingHTTPServer(('127.0.0.1', 0), rpc_handler(self.rpc))
+        t = threading.Thread(target=srv.serve_forever)
+        t.start()
+        conn = AsyncHTTPConnection('http://127.0.0.1:{}'.format(srv.server_address[1]), pool_size=4)
+        c = AsyncVend(self.chain_spec, conn)
+
+        async def run():
+            r = []
+            for j in range(3):
+                r.append(await asyncio.gather(*[c.get_token(self.vend_address, i, sender_address=self.accounts[0]) for i in range(3)]))
+            count = await c.allowance(self.token_address, self.alice, self.vend_address, sender_address=self.accounts[0])
+            with self.assertRaises(JSONRPCException):
+                await c.get_token(self.vend_address, 3, sender_address=self.accounts[0])
+            # connections are kept open for reuse
+            self.assertGreater(conn.pool.qsize(), 0)
+            self.assertLessEqual(conn.pool.qsize(), 4)
+            return (r, count,)
+
+        try:
+            (r, allowance) = asyncio.run(run())
+        finally:
+            conn.close()
+            srv.shutdown()
+            srv.server_close()
+            t.join()
+
+        for v in r:
+            for i in range(3):
+                self.assertTrue(is_same_address(v[i], self.tokens[i]))
+        self.assertEqual(allowance, 400)
+
+
+if __name__ == '__main__':
+    unittest.main()
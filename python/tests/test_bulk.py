@@ -0,0 +1,108 @@
+# standard imports
+import unittest
+import logging
+import io
+import json
+
+# external imports
+from chainlib.eth.nonce import RPCNonceOracle
+from chainlib.eth.address import is_same_address
+from eth_erc20 import ERC20
+from giftable_erc20_token import GiftableToken
+
+# local imports
+from erc20_vend.unittest import TestVend
+from erc20_vend import Vend
+from erc20_vend.bulk import (
+    VendBulk,
+    read_jsonl,
+    read_csv,
+)
+
+
+logging.basicConfig(level=logging.DEBUG)
+logg = logging.getLogger()
+
+
+class TestVendBulkRead(unittest.TestCase):
+
+    def test_read(self):
+        f = io.StringIO('{"op": "create", "name": "foo", "symbol": "FOO"}\n\n# comment\n{"op": "get-token", "idx": 0}\n')
+        self.assertEqual(list(read_jsonl(f)), [
+            (1, {'op': 'create', 'name': 'foo', 'symbol': 'FOO'},),
+            (4, {'op': 'get-token', 'idx': 0},),
+            ])
+
+        f = io.StringIO('op,name,symbol,token,idx\ncreate,foo,FOO,,\n\nget-token,,,, 0\n')
+        self.assertEqual(list(read_csv(f)), [
+            (2, {'op': 'create', 'name': 'foo', 'symbol': 'FOO'},),
+            (4, {'op': 'get-token', 'idx': '0'},),
+            ])
+
+
+class TestVendBulk(TestVend):
+
+    def test_bulk(self):
+        src_amount = 100 * (10 ** self.token_decimals)
+        nonce_oracle = RPCNonceOracle(self.accounts[0], conn=self.conn)
+        c = GiftableToken(self.chain_spec, signer=self.signer, nonce_oracle=nonce_oracle)
+        (tx_hash, o) = c.mint_to(self.token_address, self.accounts[0], self.alice, src_amount)
+        self.rpc.do(o)
+
+        nonce_oracle = RPCNonceOracle(self.alice, conn=self.conn)
+        c = ERC20(self.chain_spec, signer=self.signer, nonce_oracle=nonce_oracle)
+        (tx_hash, o) = c.approve(self.token_address, self.alice, self.vend_address, src_amount)
+        self.rpc.do(o)
+
+        ops = [
+            {'op': 'create', 'name': 'foo vend', 'symbol': 'FOOVEND'},
+            {'op': 'create', 'name': 'bar vend', 'symbol': 'BARVEND'},
+            {'op': 'create', 'name': 'baz vend'},
+            {'op': 'burn', 'token': self.token_address},
+            {'op': 'create', 'name': 'baz vend', 'symbol': 'BAZVEND'},
+            {'op': 'get-token', 'idx': 1},
+            {'op': 'get-token', 'idx': 42},
+            {'op': 'get-token', 'idx': 'foo'},
+            {'op': 'deposit', 'token': '0x1234'},
+            ]
+        c = Vend(self.chain_spec, signer=self.signer, nonce_oracle=nonce_oracle)
+        bulk = VendBulk(self.rpc, c, self.vend_address, self.alice, max_inflight=2, poll_interval=0)
+        w = io.StringIO()
+        self.assertEqual(bulk.run(enumerate(ops), w), 9)
+        r = [json.loads(l) for l in w.getvalue().split('\n')[:-1]]
+        self.assertEqual([v['line'] for v in r], list(range(9)))
+        for i in [0, 1, 4]:
+            self.assertEqual(r[i]['status'], 1)
+        self.assertEqual(r[2]['error'], 'missing field symbol')
+        self.assertEqual(r[3]['error'], 'unknown operation burn')
+        self.assertNotIn('token', r[6])
+        for i in [7, 8]:
+            self.assertIn('error', r[i])
+            self.assertNotIn('tx_hash', r[i])
+
+        tokens = c.list_tokens(self.rpc, self.vend_address, sender_address=self.accounts[0])
+        self.assertEqual(len(tokens), 3)
+        self.assertTrue(is_same_address(r[5]['token'], tokens[1]))
+
+        # the same nonce oracle continues
+        ops = [
+            {'op': 'deposit', 'token': tokens[0]},
+            {'op': 'deposit', 'token': tokens[0]},
+            ]
+        w = io.StringIO()
+        bulk.run(enumerate(ops), w)
+        r = [json.loads(l) for l in w.getvalue().split('\n')[:-1]]
+        self.assertEqual(r[0]['status'], 1)
+        self.assertEqual(r[1]['status'], 0)
+
+        # without sending, signed transactions are written
+        bulk = VendBulk(self.rpc, c, self.vend_address, self.alice, send=False)
+        w = io.StringIO()
+        bulk.run([(1, {'op': 'withdraw', 'token': tokens[0]},)], w)
+        r = json.loads(w.getvalue())
+        self.assertNotIn('status', r)
+        self.assertEqual(r['tx'][:2], '0x')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,115 @@
+# standard imports
+import unittest
+import logging
+
+# external imports
+from chainlib.eth.contract import (
+    ABIContractEncoder,
+    ABIContractType,
+)
+from chainlib.eth.nonce import OverrideNonceOracle
+from chainlib.eth.tx import TxFormat
+from chainlib.chain import ChainSpec
+
+# local imports
+from erc20_vend import Vend
+from erc20_vend import calldata
+
+
+logging.basicConfig(level=logging.DEBUG)
+logg = logging.getLogger()
+
+strings = [
+    '',
+    'a',
+    'foo vend',
+    'x' * 31,
+    'y' * 32,
+    'z' * 33,
+    'ballot ' * 20,
+    'æøå ₿',
+]
+
+addresses = [
+    '0x2B5AD5c4795c026514f8317c7a215E218DcCD6cF',
+    '2b5ad5c4795c026514f8317c7a215e218dccd6cf',
+    '0x0000000000000000000000000000000000000000',
+]
+
+
+class TestCalldata(unittest.TestCase):
+
+    def encode_token_arg(self, method, token_address):
+        enc = ABIContractEncoder()
+        enc.method(method)
+        enc.typ(ABIContractType.ADDRESS)
+        enc.typ(ABIContractType.UINT256)
+        enc.address(token_address)
+        enc.uint256(0)
+        return enc.get()
+
+
+    def test_create(self):
+        for name in strings:
+            for symbol in strings:
+                enc = ABIContractEncoder()
+                enc.method('create')
+                enc.typ(ABIContractType.STRING)
+                enc.typ(ABIContractType.STRING)
+                enc.string(name)
+                enc.string(symbol)
+                self.assertEqual(calldata.create.encode(name, symbol), enc.get())
+
+
+    def test_deposit_withdraw(self):
+        for a in addresses:
+            self.assertEqual(calldata.deposit.encode(a), self.encode_token_arg('deposit', a))
+            self.assertEqual(calldata.withdraw.encode(a), self.encode_token_arg('withdraw', a))
+
+        with self.assertRaises(ValueError):
+            calldata.deposit.encode(addresses[0][:-2])
+        with self.assertRaises(ValueError):
+            calldata.deposit.encode(addresses[0][:-1] + 'g')
+        with self.assertRaises(ValueError):
+            calldata.deposit.encode(addresses[0], 0)
+
+
+    def test_get_token(self):
+        for i in [0, 1, 255, 256, 2**64, 2**256 - 1]:
+            enc = ABIContractEncoder()
+            enc.method('getTokenByIndex')
+            enc.typ(ABIContractType.UINT256)
+            enc.uint256(i)
+            self.assertEqual(calldata.get_token_by_index.encode(i), enc.get())
+
+        with self.assertRaises(ValueError):
+            calldata.get_token_by_index.encode(2**256)
+        with self.assertRaises(ValueError):
+            calldata.get_token_by_index.encode(-1)
+
+
+    def test_mixed(self):
+        t = calldata.CalldataTemplate('foo', [ABIContractType.STRING, ABIContractType.ADDRESS, ABIContractType.BOOLEAN, ABIContractType.STRING], fixed={2: True})
+        enc = ABIContractEncoder()
+        enc.method('foo')
+        enc.typ(ABIContractType.STRING)
+        enc.typ(ABIContractType.ADDRESS)
+        enc.typ(ABIContractType.BOOLEAN)
+        enc.typ(ABIContractType.STRING)
+        enc.string('bar')
+        enc.address(addresses[0])
+        enc.bool(True)
+        enc.string('baz' * 11)
+        self.assertEqual(t.encode('bar', addresses[0], 'baz' * 11), enc.get())
+
+
+    def test_builder(self):
+        chain_spec = ChainSpec('evm', 'foochain', 42)
+        c = Vend(chain_spec, nonce_oracle=OverrideNonceOracle(addresses[0], 42))
+        tx = c.deposit(addresses[0], addresses[0], addresses[1], tx_format=TxFormat.DICT)
+        self.assertEqual(tx['data'], '0x' + self.encode_token_arg('deposit', addresses[1]))
+        self.assertEqual(tx['nonce'], 42)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,178 @@
+# standard imports
+import unittest
+import logging
+import os
+import shutil
+import tempfile
+
+# external imports
+from chainlib.eth.nonce import RPCNonceOracle
+from chainlib.eth.tx import (
+    receipt,
+    TxFactory,
+)
+from chainlib.eth.contract import ABIContractType
+from chainlib.eth.constant import ZERO_ADDRESS
+from chainlib.eth.address import is_same_address
+from eth_erc20 import ERC20
+from giftable_erc20_token import GiftableToken
+from hexathon import add_0x
+
+# local imports
+from erc20_vend.unittest.base import (
+    TestVendCore,
+    bytecode_has_method,
+)
+from erc20_vend import Vend
+from erc20_vend.calldata import CalldataTemplate
+from erc20_vend.data import (
+    Artifact,
+    registry,
+)
+from erc20_vend import hooks
+
+
+logging.basicConfig(level=logging.DEBUG)
+logg = logging.getLogger()
+
+
+class TestVendCloneCheck(unittest.TestCase):
+
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        f = open(os.path.join(self.path, 'noclone.bin'), 'w')
+        f.write('6080604052348015600f57600080fd5b50')
+        f.close()
+        registry.versions['noclone'] = 'noclone'
+        registry.artifacts['noclone'] = Artifact('noclone', path=self.path)
+
+
+    def tearDown(self):
+        registry.versions.pop('noclone')
+        registry.artifacts.pop('noclone', None)
+        shutil.rmtree(self.path)
+
+
+    def test_clone_unsupported(self):
+        with self.assertRaises(ValueError):
+            Vend.cargs(ZERO_ADDRESS, clone=True, version='noclone')
+        with self.assertRaises(ValueError):
+            hooks.create(token_address=ZERO_ADDRESS, clone=True, version='noclone')
+        Vend.cargs(ZERO_ADDRESS, version='noclone')
+
+
+@unittest.skipUnless(bytecode_has_method('tokenImplementation'), 'contract artifact has no clone mode')
+class TestVendClone(TestVendCore):
+
+    def create_token(self):
+        nonce_oracle = RPCNonceOracle(self.accounts[0], conn=self.conn)
+        c = Vend(self.chain_spec, signer=self.signer, nonce_oracle=nonce_oracle)
+        (tx_hash, o) = c.create(self.vend_address, self.accounts[0], 'foo vend', 'FOOVEND')
+        self.rpc.do(o)
+        o = receipt(tx_hash)
+        r = self.rpc.do(o)
+        self.assertEqual(r['status'], 1)
+        gas_used = r['gas_used']
+
+        o = c.get_token(self.vend_address, 0, sender_address=self.accounts[0])
+        r = self.rpc.do(o)
+        return (c.parse_token(r), gas_used,)
+
+
+    def test_implementation(self):
+        self.publish()
+        c = Vend(self.chain_spec)
+        o = c.token_implementation(self.vend_address, sender_address=self.accounts[0])
+        r = self.rpc.do(o)
+        self.assertTrue(is_same_address(c.parse_token_implementation(r), ZERO_ADDRESS))
+
+        self.publish(clone=True)
+        o = c.token_implementation(self.vend_address, sender_address=self.accounts[0])
+        r = self.rpc.do(o)
+        implementation_address = c.parse_token_implementation(r)
+        self.assertFalse(is_same_address(implementation_address, ZERO_ADDRESS))
+
+        # the implementation is locked by its constructor, and cannot be taken over with initialize
+        t = CalldataTemplate('initialize', [ABIContractType.STRING, ABIContractType.STRING, ABIContractType.UINT8, ABIContractType.UINT256])
+        nonce_oracle = RPCNonceOracle(self.alice, conn=self.conn)
+        c = TxFactory(self.chain_spec, signer=self.signer, nonce_oracle=nonce_oracle)
+        tx = c.template(self.alice, implementation_address, use_nonce=True)
+        tx = c.set_code(tx, add_0x(t.encode('bar vend', 'BARVEND', 0, 0)))
+        (tx_hash, o) = c.finalize(tx)
+        self.rpc.do(o)
+        o = receipt(tx_hash)
+        r = self.rpc.do(o)
+        self.assertEqual(r['status'], 0)
+
+
+    def test_clone_vend(self):
+        self.publish(clone=True, mint=True)
+        (vended_token_address, gas_used) = self.create_token()
+
+        c = ERC20(self.chain_spec)
+        o = c.name(vended_token_address, sender_address=self.accounts[0])
+        r = self.rpc.do(o)
+        self.assertEqual(c.parse_name(r), 'foo vend')
+        o = c.symbol(vended_token_address, sender_address=self.accounts[0])
+        r = self.rpc.do(o)
+        self.assertEqual(c.parse_symbol(r), 'FOOVEND')
+
+        vend_amount = 100
+        src_amount = vend_amount * (10 ** self.token_decimals)
+        nonce_oracle = RPCNonceOracle(self.accounts[0], conn=self.conn)
+        c = GiftableToken(self.chain_spec, signer=self.signer, nonce_oracle=nonce_oracle)
+        (tx_hash, o) = c.mint_to(self.token_address, self.accounts[0], self.alice, src_amount)
+        self.rpc.do(o)
+
+        nonce_oracle = RPCNonceOracle(self.alice, conn=self.conn)
+        c = ERC20(self.chain_spec, signer=self.signer, nonce_oracle=nonce_oracle)
+        (tx_hash, o) = c.approve(self.token_address, self.alice, self.vend_address, src_amount)
+        self.rpc.do(o)
+
+        c = Vend(self.chain_spec, signer=self.signer, nonce_oracle=nonce_oracle)
+        (tx_hash, o) = c.deposit(self.vend_address, self.alice, vended_token_address)
+        self.rpc.do(o)
+        o = receipt(tx_hash)
+        r = self.rpc.do(o)
+        self.assertEqual(r['status'], 1)
+
+        c = ERC20(self.chain_spec)
+        o = c.balance_of(vended_token_address, self.alice, sender_address=self.accounts[0])
+        r = self.rpc.do(o)
+        self.assertEqual(c.parse_balance(r), vend_amount)
+
+        # clone cannot be initialized a second time
+        t = CalldataTemplate('initialize', [ABIContractType.STRING, ABIContractType.STRING, ABIContractType.UINT8, ABIContractType.UINT256])
+        nonce_oracle = RPCNonceOracle(self.alice, conn=self.conn)
+        c = TxFactory(self.chain_spec, signer=self.signer, nonce_oracle=nonce_oracle)
+        tx = c.template(self.alice, vended_token_address, use_nonce=True)
+        tx = c.set_code(tx, add_0x(t.encode('bar vend', 'BARVEND', 0, 0)))
+        (tx_hash, o) = c.finalize(tx)
+        self.rpc.do(o)
+        o = receipt(tx_hash)
+        r = self.rpc.do(o)
+        self.assertEqual(r['status'], 0)
+
+
+    def test_clone_supply(self):
+        self.publish(clone=True)
+        (vended_token_address, gas_used) = self.create_token()
+        c = ERC20(self.chain_spec)
+        o = c.total_supply(vended_token_address, sender_address=self.accounts[0])
+        r = self.rpc.do(o)
+        self.assertEqual(int(r, 16), self.initial_supply)
+
+
+    def test_clone_gas(self):
+        self.publish()
+        (vended_token_address, gas_full) = self.create_token()
+
+        self.publish(clone=True)
+        (vended_token_address, gas_clone) = self.create_token()
+
+        logg.info('create gas full deployment {} clone {}'.format(gas_full, gas_clone))
+        self.assertLess(gas_clone, gas_full)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,169 @@
+# standard imports
+import unittest
+import logging
+import io
+
+# external imports
+import eth_abi
+from chainlib.eth.nonce import RPCNonceOracle
+from chainlib.eth.tx import (
+    receipt,
+    unpack,
+    TxFormat,
+)
+from chainlib.eth.address import is_same_address
+from chainlib.eth.contract import ABIContractType
+from eth_erc20 import ERC20
+from giftable_erc20_token import GiftableToken
+from hexathon import strip_0x
+
+# local imports
+from erc20_vend.unittest import TestVend
+from erc20_vend.unittest.base import bytecode_has_method
+from erc20_vend.calldata import (
+    ADDRESS_ARRAY,
+    UINT256_ARRAY,
+)
+from erc20_vend import calldata
+from erc20_vend import gas as vend_gas
+from erc20_vend import Vend
+from erc20_vend.distribute import (
+    VendDistribution,
+    default_page_size,
+)
+from erc20_vend.vend import used_withdrawn
+
+
+logging.basicConfig(level=logging.DEBUG)
+logg = logging.getLogger()
+
+
+class TestVendDistribution(unittest.TestCase):
+
+    def test_read(self):
+        f = io.StringIO('address,balance\n0x' + '11' * 20 + ',100\n' + '22' * 20 + ', 0\n\n0x' + '33' * 20 + ',' + str(2 ** 200) + '\n')
+        d = VendDistribution()
+        self.assertEqual(d.read_csv(f), 2)
+        self.assertEqual(len(d), 2)
+        self.assertEqual(d.holder(1)[1], 2 ** 200)
+        self.assertEqual(d.total(), 100 + 2 ** 200)
+        self.assertTrue(is_same_address(d.holder(0)[0], '11' * 20))
+
+        with self.assertRaises(ValueError):
+            d.add('0x' + '44' * 19, 1)
+        with self.assertRaises(ValueError):
+            d.add('0x' + '44' * 20, -1)
+
+        self.assertEqual(d.extend([('0x' + '44' * 20, 3), ('0x' + '55' * 20, 4)]), 2)
+        (addresses, values) = d.page(3, 10)
+        self.assertEqual(values, [4])
+        self.assertTrue(is_same_address(addresses[0], '55' * 20))
+
+
+    def test_encode(self):
+        token = '0x' + '11' * 20
+        holders = ['0x' + '22' * 20, '0x' + '33' * 20, '0x' + '44' * 20]
+        values = [1, 2, 3]
+        r = calldata.distribute.encode(token, holders, values)
+        self.assertEqual(r[8:], eth_abi.encode_abi(['address', 'address[]', 'uint256[]'], [token, holders, values]).hex())
+        self.assertEqual(Vend.gas(r), vend_gas.static_limit('deposit') * 3)
+
+
+    # Clone mode has no measured gas figures yet, and is left to node estimates for pages.
+    def test_page_size(self):
+        for mint in [False, True]:
+            self.assertLess(vend_gas.static_limit('distribute', mint=mint, count=default_page_size), 25000000)
+
+
+class TestVendDistribute(TestVend):
+
+    def test_transactions(self):
+        d = VendDistribution()
+        for i in range(5):
+            d.add(self.accounts[i+1], (i + 1) * 1000)
+        nonce_oracle = RPCNonceOracle(self.accounts[0], conn=self.conn)
+        c = Vend(self.chain_spec, signer=self.signer, nonce_oracle=nonce_oracle)
+        txs = list(d.transactions(c, self.vend_address, self.accounts[0], self.token_address, page_size=2, offset=1, tx_format=TxFormat.RLP_SIGNED))
+        self.assertEqual([x[0] for x in txs], [1, 3])
+        start_nonce = None
+        for i, (offset, (tx_hash, tx_raw)) in enumerate(txs):
+            tx = unpack(bytes.fromhex(strip_0x(tx_raw)), self.chain_spec)
+            if start_nonce == None:
+                start_nonce = tx['nonce']
+            self.assertEqual(tx['nonce'], start_nonce + i)
+            self.assertEqual(vend_gas.item_count(tx['data'], 1), 2)
+
+
+@unittest.skipUnless(bytecode_has_method('distribute', [ABIContractType.ADDRESS, ADDRESS_ARRAY, UINT256_ARRAY]), 'contract artifact has no distribute')
+class TestVendDistributeChain(TestVend):
+
+    def test_distribute(self):
+        nonce_oracle = RPCNonceOracle(self.accounts[0], conn=self.conn)
+        c = Vend(self.chain_spec, signer=self.signer, nonce_oracle=nonce_oracle)
+        (tx_hash, o) = c.create(self.vend_address, self.accounts[0], 'foo vend', 'FOOVEND')
+        self.rpc.do(o)
+        o = c.get_token(self.vend_address, 0, sender_address=self.accounts[0])
+        vended_token_address = c.parse_token(self.rpc.do(o))
+
+        unit = 10 ** self.token_decimals
+        holders = self.accounts[1:6]
+        d = VendDistribution()
+        for i, holder in enumerate(holders):
+            d.add(holder, (i + 1) * unit)
+        # a holder added again is skipped by the contract
+        d.add(holders[0], 100 * unit)
+
+        for (offset, (tx_hash, o)) in d.transactions(c, self.vend_address, self.accounts[0], vended_token_address, page_size=2):
+            self.rpc.do(o)
+            o = receipt(tx_hash)
+            r = self.rpc.do(o)
+            self.assertEqual(r['status'], 1)
+
+        # resending a page vends nothing more
+        (offset, (tx_hash, o)) = next(d.transactions(c, self.vend_address, self.accounts[0], vended_token_address, page_size=2))
+        self.rpc.do(o)
+        o = receipt(tx_hash)
+        r = self.rpc.do(o)
+        self.assertEqual(r['status'], 1)
+
+        c_token = ERC20(self.chain_spec)
+        for i, holder in enumerate(holders):
+            o = c_token.balance_of(vended_token_address, holder, sender_address=self.accounts[0])
+            r = self.rpc.do(o)
+            self.assertEqual(c_token.parse_balance(r), i + 1)
+
+        o = c.used_by_many(self.vend_address, holders, vended_token_address, sender_address=self.accounts[0])
+        self.assertEqual(c.parse_used_by_many(self.rpc.do(o)), [used_withdrawn] * len(holders))
+
+        # only writers may distribute
+        nonce_oracle = RPCNonceOracle(self.alice, conn=self.conn)
+        c = Vend(self.chain_spec, signer=self.signer, nonce_oracle=nonce_oracle)
+        (tx_hash, o) = c.distribute(self.vend_address, self.alice, vended_token_address, [self.accounts[7]], [unit])
+        self.rpc.do(o)
+        o = receipt(tx_hash)
+        r = self.rpc.do(o)
+        self.assertEqual(r['status'], 0)
+
+
+    # locked held tokens must not be paid out by distributing the held token as if it were vended
+    def test_distribute_unknown(self):
+        nonce_oracle = RPCNonceOracle(self.accounts[0], conn=self.conn)
+        c = GiftableToken(self.chain_spec, signer=self.signer, nonce_oracle=nonce_oracle)
+        (tx_hash, o) = c.mint_to(self.token_address, self.accounts[0], self.vend_address, 100)
+        self.rpc.do(o)
+
+        c = Vend(self.chain_spec, signer=self.signer, nonce_oracle=nonce_oracle)
+        (tx_hash, o) = c.distribute(self.vend_address, self.accounts[0], self.token_address, [self.accounts[7]], [100])
+        self.rpc.do(o)
+        o = receipt(tx_hash)
+        r = self.rpc.do(o)
+        self.assertEqual(r['status'], 0)
+
+        c_token = ERC20(self.chain_spec)
+        o = c_token.balance_of(self.token_address, self.accounts[7], sender_address=self.accounts[0])
+        r = self.rpc.do(o)
+        self.assertEqual(c_token.parse_balance(r), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
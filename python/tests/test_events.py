@@ -13,6 +13,12 @@ from hexathon import same as same_hex
 # local imports
 from erc20_vend.unittest.base import TestVendCore
 from erc20_vend import Vend
+from erc20_vend.event import (
+    TokenCreated,
+    Mint,
+    topic_transfer,
+    topic_token_mint,
+)
 
 
 logging.basicConfig(level=logging.DEBUG)
@@ -150,5 +156,69 @@ class TestVendBase(TestVendCore):
         self.assertEqual(int(dec.contents[2], 16), vend_amount)
 
 
+    def test_parse_events(self):
+        self.publish(mint=True)
+        nonce_oracle = RPCNonceOracle(self.accounts[0], conn=self.conn)
+        c = Vend(self.chain_spec, signer=self.signer, nonce_oracle=nonce_oracle)
+        (tx_hash, o) = c.create(self.vend_address, self.accounts[0], 'foo vend', 'FOOVEND')
+        self.rpc.do(o)
+        o = receipt(tx_hash)
+        rcpt_create = self.rpc.do(o)
+
+        o = c.get_token(self.vend_address, 0, sender_address=self.accounts[0])
+        r = self.rpc.do(o)
+        vended_token_address = c.parse_token(r).lower()
+
+        e = c.parse_token_created(rcpt_create['logs'][0])
+        self.assertEqual(e.idx, 0)
+        self.assertEqual(e.supply, 0)
+        self.assertEqual(e.token, vended_token_address)
+        self.assertEqual(e.tx_hash, tx_hash)
+        self.assertEqual(e.log_index, 0)
+
+        e = c.parse_mint(rcpt_create['logs'][1])
+        self.assertEqual(e.minter, self.accounts[0][2:].lower())
+        self.assertEqual(e.token, vended_token_address)
+
+        with self.assertRaises(ValueError):
+            c.parse_mint(rcpt_create['logs'][0])
+
+        vend_amount = 100
+        src_amount = vend_amount * (10 ** self.token_decimals)
+        c_token = GiftableToken(self.chain_spec, signer=self.signer, nonce_oracle=nonce_oracle)
+        (tx_hash, o) = c_token.mint_to(self.token_address, self.accounts[0], self.alice, src_amount)
+        self.rpc.do(o)
+
+        nonce_oracle = RPCNonceOracle(self.alice, conn=self.conn)
+        c_token = ERC20(self.chain_spec, signer=self.signer, nonce_oracle=nonce_oracle)
+        (tx_hash, o) = c_token.approve(self.token_address, self.alice, self.vend_address, src_amount)
+        self.rpc.do(o)
+        c = Vend(self.chain_spec, signer=self.signer, nonce_oracle=nonce_oracle)
+        (tx_hash, o) = c.deposit(self.vend_address, self.alice, vended_token_address)
+        self.rpc.do(o)
+        o = receipt(tx_hash)
+        rcpt_deposit = self.rpc.do(o)
+
+        r = c.parse_logs([rcpt_create, rcpt_deposit])
+        self.assertEqual([type(e) for e in r], [TokenCreated, Mint, Mint])
+        self.assertEqual(r[2], Mint(self.vend_address.lower(), self.alice[2:].lower(), vended_token_address, vend_amount, r[2].block_number, tx_hash, r[2].log_index))
+
+        r = c.parse_logs(rcpt_deposit['logs'], topics=[topic_token_mint])
+        self.assertEqual(len(r), 1)
+
+        # vend in supply mode is a transfer from the vend contract
+        rlog = dict(rcpt_deposit['logs'][1])
+        rlog['topics'] = [topic_transfer] + list(rlog['topics'][1:])
+        r = c.parse_logs([rlog])
+        self.assertEqual(r[0].sender, self.vend_address.lower())
+        self.assertEqual(r[0].recipient, self.alice[2:].lower())
+        self.assertEqual(r[0].token, vended_token_address)
+
+        # erc721 transfer has the same topic, but the value is indexed
+        rlog['topics'] = rlog['topics'] + [rlog['data']]
+        rlog['data'] = '0x'
+        self.assertEqual(c.parse_logs([rlog]), [])
+
+
 if __name__ == '__main__':
     unittest.main()
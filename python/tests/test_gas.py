@@ -0,0 +1,238 @@
+# standard imports
+import unittest
+import logging
+
+# external imports
+from chainlib.eth.nonce import RPCNonceOracle
+from chainlib.eth.tx import (
+    receipt,
+    TxFormat,
+)
+from giftable_erc20_token import GiftableToken
+from eth_erc20 import ERC20
+
+# local imports
+from erc20_vend.unittest import TestVend
+from erc20_vend.unittest.base import (
+    TestBatchRPCConnection,
+    bytecode_has_method,
+)
+from erc20_vend import Vend
+from erc20_vend import calldata
+from erc20_vend.hooks import constructor_args
+from erc20_vend.gas import (
+    VendGasOracle,
+    gas_table,
+    default_limit,
+    static_limit,
+)
+
+
+logging.basicConfig(level=logging.DEBUG)
+logg = logging.getLogger()
+
+
+class CountingRPCConnection(TestBatchRPCConnection):
+
+    def __init__(self, location, backend, signer):
+        super(CountingRPCConnection, self).__init__(location, backend, signer)
+        self.estimates = 0
+
+
+    def eth_estimateGas(self, p):
+        self.estimates += 1
+        return super(CountingRPCConnection, self).eth_estimateGas(p)
+
+
+class TestVendGas(TestVend):
+
+    def setUp(self):
+        super(TestVendGas, self).setUp()
+        self.rpc = CountingRPCConnection(None, self.helper, self.signer)
+        self.conn = self.rpc
+
+
+    def test_static(self):
+        self.assertEqual(Vend.gas(), default_limit)
+        self.assertEqual(Vend.gas(calldata.create.encode('foo', 'FOO')), gas_table[('create', False, False)])
+        self.assertEqual(Vend.gas(calldata.deposit.encode(self.token_address)), gas_table[('deposit', False, False)])
+        self.assertEqual(Vend.gas(Vend.cargs(self.token_address)), gas_table[('constructor', False, False)])
+        self.assertEqual(Vend.gas(Vend.bytecode() + constructor_args(self.token_address, mint=True, clone=True)), gas_table[('constructor', True, True)])
+        self.assertEqual(Vend.gas('deadbeef' + '00' * 32), default_limit)
+
+        gas_oracle = VendGasOracle(mint=True)
+        c = Vend(self.chain_spec, signer=self.signer, gas_oracle=gas_oracle)
+        tx = c.create(self.vend_address, self.accounts[0], 'foo vend', 'FOOVEND', tx_format=TxFormat.DICT)
+        self.assertEqual(tx['gas'], gas_table[('create', True, False)])
+
+        # mode of a new contract is taken from the constructor arguments
+        code = Vend.bytecode() + constructor_args(self.token_address, mint=False, clone=True)
+        self.assertEqual(gas_oracle.get_limit(code), gas_table[('constructor', False, True)])
+
+
+    # Run constructor, create, the first deposit of a large balance and the withdraw of all of it,
+    # each with the static gas limit of the mode.
+    def send_static(self, mint=False, clone=False):
+        amount = 10 ** 30
+        nonce_oracle = RPCNonceOracle(self.accounts[0], conn=self.conn)
+        c = GiftableToken(self.chain_spec, signer=self.signer, nonce_oracle=nonce_oracle)
+        (tx_hash, o) = c.mint_to(self.token_address, self.accounts[0], self.alice, amount)
+        self.rpc.do(o)
+
+        gas_oracle = VendGasOracle(mint=mint, clone=clone)
+        c = Vend(self.chain_spec, signer=self.signer, nonce_oracle=nonce_oracle, gas_oracle=gas_oracle)
+        (tx_hash, o) = c.constructor(self.accounts[0], self.token_address, mint=mint, clone=clone, decimals=self.token_decimals)
+        self.rpc.do(o)
+        o = receipt(tx_hash)
+        r = self.rpc.do(o)
+        self.assertEqual(r['status'], 1)
+        vend_address = r['contract_address']
+
+        (tx_hash, o) = c.create(vend_address, self.accounts[0], 'x' * 32, 'X' * 32)
+        self.rpc.do(o)
+        o = receipt(tx_hash)
+        r = self.rpc.do(o)
+        self.assertEqual(r['status'], 1)
+        o = c.get_token(vend_address, 0, sender_address=self.accounts[0])
+        vended_token_address = c.parse_token(self.rpc.do(o))
+
+        nonce_oracle = RPCNonceOracle(self.alice, conn=self.conn)
+        c_token = ERC20(self.chain_spec, signer=self.signer, nonce_oracle=nonce_oracle)
+        (tx_hash, o) = c_token.approve(self.token_address, self.alice, vend_address, amount)
+        self.rpc.do(o)
+        (tx_hash, o) = c_token.approve(vended_token_address, self.alice, vend_address, amount)
+        self.rpc.do(o)
+
+        c = Vend(self.chain_spec, signer=self.signer, nonce_oracle=nonce_oracle, gas_oracle=gas_oracle)
+        for (method, step) in [('deposit', c.deposit), ('withdraw', c.withdraw)]:
+            tx = step(vend_address, self.alice, vended_token_address, tx_format=TxFormat.DICT)
+            self.assertEqual(tx['gas'], static_limit(method, mint=mint, clone=clone))
+            (tx_hash, o) = c.finalize(tx)
+            self.rpc.do(o)
+            o = receipt(tx_hash)
+            r = self.rpc.do(o)
+            self.assertEqual(r['status'], 1)
+            logg.info('{} used {} of static limit {}'.format(method, r['gas_used'], tx['gas']))
+
+
+    def test_static_supply(self):
+        self.send_static()
+
+
+    def test_static_mint(self):
+        self.send_static(mint=True)
+
+
+    @unittest.skipUnless(bytecode_has_method('tokenImplementation'), 'contract artifact has no clone mode')
+    def test_static_clone(self):
+        self.send_static(clone=True)
+
+
+    @unittest.skipUnless(bytecode_has_method('tokenImplementation'), 'contract artifact has no clone mode')
+    def test_static_clone_mint(self):
+        self.send_static(mint=True, clone=True)
+
+
+    def test_estimate(self):
+        nonce_oracle = RPCNonceOracle(self.accounts[0], conn=self.conn)
+        gas_oracle = VendGasOracle(conn=self.rpc, margin=20)
+        c = Vend(self.chain_spec, signer=self.signer, nonce_oracle=nonce_oracle, gas_oracle=gas_oracle)
+        (tx_hash, o) = c.create(self.vend_address, self.accounts[0], 'foo vend', 'FOOVEND')
+        self.assertEqual(self.rpc.estimates, 1)
+        self.rpc.do(o)
+        o = receipt(tx_hash)
+        r = self.rpc.do(o)
+        self.assertEqual(r['status'], 1)
+
+        tx = c.create(self.vend_address, self.accounts[0], 'bar vend', 'BARVEND', tx_format=TxFormat.DICT)
+        self.assertEqual(self.rpc.estimates, 1)
+        self.assertGreater(tx['gas'], r['gas_used'])
+        self.assertLess(tx['gas'], gas_table[('create', False, False)])
+
+        gas_oracle.invalidate(self.vend_address)
+        c.create(self.vend_address, self.accounts[0], 'bar vend', 'BARVEND', tx_format=TxFormat.DICT)
+        self.assertEqual(self.rpc.estimates, 2)
+
+
+    # A deposit estimate for a sender without held tokens must not be used for a sender with held tokens.
+    def test_estimate_sender(self):
+        nonce_oracle = RPCNonceOracle(self.accounts[0], conn=self.conn)
+        c = Vend(self.chain_spec, signer=self.signer, nonce_oracle=nonce_oracle)
+        (tx_hash, o) = c.create(self.vend_address, self.accounts[0], 'foo vend', 'FOOVEND')
+        self.rpc.do(o)
+        o = c.get_token(self.vend_address, 0, sender_address=self.accounts[0])
+        vended_token_address = c.parse_token(self.rpc.do(o))
+
+        c = GiftableToken(self.chain_spec, signer=self.signer, nonce_oracle=nonce_oracle)
+        (tx_hash, o) = c.mint_to(self.token_address, self.accounts[0], self.alice, 100)
+        self.rpc.do(o)
+
+        nonce_oracle = RPCNonceOracle(self.alice, conn=self.conn)
+        c = ERC20(self.chain_spec, signer=self.signer, nonce_oracle=nonce_oracle)
+        (tx_hash, o) = c.approve(self.token_address, self.alice, self.vend_address, 100)
+        self.rpc.do(o)
+
+        gas_oracle = VendGasOracle(conn=self.rpc)
+        c = Vend(self.chain_spec, signer=self.signer, gas_oracle=gas_oracle)
+        tx_bob = c.deposit(self.vend_address, self.bob, vended_token_address, tx_format=TxFormat.DICT)
+        self.assertEqual(self.rpc.estimates, 1)
+
+        c = Vend(self.chain_spec, signer=self.signer, nonce_oracle=nonce_oracle, gas_oracle=gas_oracle)
+        (tx_hash, o) = c.deposit(self.vend_address, self.alice, vended_token_address)
+        self.assertEqual(self.rpc.estimates, 2)
+        self.rpc.do(o)
+        o = receipt(tx_hash)
+        r = self.rpc.do(o)
+        self.assertEqual(r['status'], 1)
+        self.assertGreater(r['gas_used'], tx_bob['gas'])
+
+
+    def test_block_expiry(self):
+        gas_oracle = VendGasOracle(conn=self.rpc, block_ttl=2)
+        c = Vend(self.chain_spec, signer=self.signer, gas_oracle=gas_oracle)
+        gas_oracle.set_block(10)
+        c.create(self.vend_address, self.accounts[0], 'foo vend', 'FOOVEND', tx_format=TxFormat.DICT)
+        gas_oracle.set_block(11)
+        c.create(self.vend_address, self.accounts[0], 'foo vend', 'FOOVEND', tx_format=TxFormat.DICT)
+        self.assertEqual(self.rpc.estimates, 1)
+        gas_oracle.set_block(12)
+        c.create(self.vend_address, self.accounts[0], 'foo vend', 'FOOVEND', tx_format=TxFormat.DICT)
+        self.assertEqual(self.rpc.estimates, 2)
+
+
+    def test_estimate_fail(self):
+        nonce_oracle = RPCNonceOracle(self.accounts[0], conn=self.conn)
+        c = Vend(self.chain_spec, signer=self.signer, nonce_oracle=nonce_oracle)
+        (tx_hash, o) = c.create(self.vend_address, self.accounts[0], 'foo vend', 'FOOVEND')
+        self.rpc.do(o)
+        o = c.get_token(self.vend_address, 0, sender_address=self.accounts[0])
+        vended_token_address = c.parse_token(self.rpc.do(o))
+
+        c = GiftableToken(self.chain_spec, signer=self.signer, nonce_oracle=nonce_oracle)
+        (tx_hash, o) = c.mint_to(self.token_address, self.accounts[0], self.alice, 100)
+        self.rpc.do(o)
+
+        # no allowance, so the deposit reverts and cannot be estimated
+        gas_oracle = VendGasOracle(conn=self.rpc)
+        c = Vend(self.chain_spec, signer=self.signer, gas_oracle=gas_oracle)
+        tx = c.deposit(self.vend_address, self.alice, vended_token_address, tx_format=TxFormat.DICT)
+        self.assertEqual(self.rpc.estimates, 1)
+        self.assertEqual(tx['gas'], gas_table[('deposit', False, False)])
+        self.assertEqual(len(gas_oracle.estimates), 0)
+
+
+    def test_constructor(self):
+        nonce_oracle = RPCNonceOracle(self.accounts[0], conn=self.conn)
+        gas_oracle = VendGasOracle(conn=self.rpc)
+        c = Vend(self.chain_spec, signer=self.signer, nonce_oracle=nonce_oracle, gas_oracle=gas_oracle)
+        (tx_hash, o) = c.constructor(self.accounts[0], self.token_address)
+        self.assertEqual(self.rpc.estimates, 1)
+        self.rpc.do(o)
+        o = receipt(tx_hash)
+        r = self.rpc.do(o)
+        self.assertEqual(r['status'], 1)
+        self.assertLess(r['gas_used'], gas_table[('constructor', False, False)])
+
+
+if __name__ == '__main__':
+    unittest.main()
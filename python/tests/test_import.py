@@ -0,0 +1,74 @@
+# standard imports
+import unittest
+import logging
+import sys
+import os
+import json
+import subprocess
+
+# external imports
+from chainlib.eth.contract import ABIContractEncoder
+
+# local imports
+import erc20_vend
+from erc20_vend.vend import Vend
+from erc20_vend import hooks
+
+
+logging.basicConfig(level=logging.DEBUG)
+logg = logging.getLogger()
+
+root_dir = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+
+
+# Modules loaded by running the code in a fresh interpreter.
+def loaded_modules(code):
+    env = dict(os.environ)
+    env['PYTHONPATH'] = root_dir
+    code += '; import sys, json; print(json.dumps(list(sys.modules.keys())))'
+    r = subprocess.run([sys.executable, '-c', code], env=env, stdout=subprocess.PIPE, check=True)
+    return json.loads(r.stdout)
+
+
+class TestImport(unittest.TestCase):
+
+    def test_lazy(self):
+        for code in [
+                'import erc20_vend',
+                'import erc20_vend; erc20_vend.args("create")',
+                'import erc20_vend; erc20_vend.create(token_address="0x" + "11" * 20)',
+                'from erc20_vend.data import registry; registry.get()',
+                ]:
+            modules = loaded_modules(code)
+            for m in ['chainlib.eth.tx', 'chainlib.eth.cli.encode', 'hexathon', 'rlp']:
+                self.assertNotIn(m, modules, code)
+
+        modules = loaded_modules('from erc20_vend import Vend')
+        self.assertIn('erc20_vend.vend', modules)
+
+        with self.assertRaises(AttributeError):
+            erc20_vend.foo
+
+
+    def test_create(self):
+        token_address = '0x' + '11' * 20
+        enc = ABIContractEncoder()
+        enc.address(token_address)
+        enc.uintn(18, 8)
+        enc.bool(True)
+        enc.bool(False)
+        self.assertEqual(erc20_vend.create(token_address=token_address, decimals='18', mint=True), Vend.bytecode() + enc.get())
+        self.assertEqual(Vend.cargs(token_address, decimals=18, mint=True), Vend.bytecode() + enc.get())
+        self.assertEqual(erc20_vend.bytecode(), Vend.bytecode())
+        self.assertEqual(erc20_vend.args('create'), (['token_address'], ['decimals', 'mint', 'clone'],))
+
+        r = erc20_vend.create(token_address='0', decimals=None)
+        self.assertEqual(r[-256:], '00' * 128)
+
+        for k in ['bytecode', 'create', 'args']:
+            self.assertIs(getattr(erc20_vend, k), getattr(hooks, k))
+            self.assertIn(k, hooks.__all__)
+
+
+if __name__ == '__main__':
+    unittest.main()
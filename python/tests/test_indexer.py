@@ -0,0 +1,162 @@
+# standard imports
+import unittest
+import logging
+import os
+import tempfile
+
+# external imports
+from chainlib.eth.nonce import RPCNonceOracle
+from chainlib.eth.tx import receipt
+from eth_erc20 import ERC20
+from giftable_erc20_token import GiftableToken
+from hexathon import strip_0x
+
+# local imports
+from erc20_vend.unittest.base import (
+    TestVendCore,
+    TestBatchRPCConnection,
+)
+from erc20_vend import Vend
+from erc20_vend.indexer import (
+    VendIndexer,
+    VendIndexStore,
+)
+
+
+logging.basicConfig(level=logging.DEBUG)
+logg = logging.getLogger()
+
+
+# Rejects log queries over more than max_range blocks, as many public nodes do.
+class RangeLimitRPCConnection(TestBatchRPCConnection):
+
+    max_range = 2
+
+    def eth_getLogs(self, p):
+        if int(p[0]['toBlock'], 16) - int(p[0]['fromBlock'], 16) >= self.max_range:
+            raise ValueError('block range too large')
+        return super(RangeLimitRPCConnection, self).eth_getLogs(p)
+
+
+class TestVendIndexer(TestVendCore):
+
+    def create_token(self, name, symbol):
+        nonce_oracle = RPCNonceOracle(self.accounts[0], conn=self.conn)
+        c = Vend(self.chain_spec, signer=self.signer, nonce_oracle=nonce_oracle)
+        (tx_hash, o) = c.create(self.vend_address, self.accounts[0], name, symbol)
+        self.rpc.do(o)
+        o = receipt(tx_hash)
+        r = self.rpc.do(o)
+        self.assertEqual(r['status'], 1)
+        return c.list_tokens(self.rpc, self.vend_address, sender_address=self.accounts[0])[-1]
+
+
+    def fund(self, holder):
+        src_amount = 100 * (10 ** self.token_decimals)
+        nonce_oracle = RPCNonceOracle(self.accounts[0], conn=self.conn)
+        c = GiftableToken(self.chain_spec, signer=self.signer, nonce_oracle=nonce_oracle)
+        (tx_hash, o) = c.mint_to(self.token_address, self.accounts[0], holder, src_amount)
+        self.rpc.do(o)
+        nonce_oracle = RPCNonceOracle(holder, conn=self.conn)
+        c = ERC20(self.chain_spec, signer=self.signer, nonce_oracle=nonce_oracle)
+        (tx_hash, o) = c.approve(self.token_address, holder, self.vend_address, src_amount * 10)
+        self.rpc.do(o)
+
+
+    def deposit(self, holder, token_address):
+        nonce_oracle = RPCNonceOracle(holder, conn=self.conn)
+        c = Vend(self.chain_spec, signer=self.signer, nonce_oracle=nonce_oracle)
+        (tx_hash, o) = c.deposit(self.vend_address, holder, token_address)
+        self.rpc.do(o)
+        o = receipt(tx_hash)
+        r = self.rpc.do(o)
+        self.assertEqual(r['status'], 1)
+
+
+    def setup_vends(self, mint=False):
+        self.publish(mint=mint)
+        self.fund(self.alice)
+        self.fund(self.bob)
+        foo = self.create_token('foo vend', 'FOOVEND')
+        bar = self.create_token('bar vend', 'BARVEND')
+        self.deposit(self.alice, foo)
+        self.deposit(self.bob, foo)
+        # deposit takes the full balance
+        self.fund(self.bob)
+        self.deposit(self.bob, bar)
+        return (strip_0x(foo).lower(), strip_0x(bar).lower(),)
+
+
+    def check_index(self, store, foo, bar, supply):
+        self.assertEqual(store.tokens(self.vend_address), [(0, foo, supply,), (1, bar, supply,)])
+        self.assertEqual(store.token_contract(bar), strip_0x(self.vend_address).lower())
+
+        alice = strip_0x(self.alice).lower()
+        bob = strip_0x(self.bob).lower()
+        self.assertEqual(store.vended(foo), sorted([alice, bob]))
+        self.assertEqual(store.vended(bar), [bob])
+
+        r = store.mints(beneficiary=self.bob, created=False)
+        self.assertEqual(len(r), 2)
+        self.assertEqual(r[0][0], foo)
+        self.assertEqual(r[1][0], bar)
+        self.assertEqual(r[0][3], 100)
+
+        r = store.mints(minter=self.accounts[0], created=True)
+        self.assertEqual(len(r), 2)
+        self.assertEqual(r[0][3], supply)
+
+
+    def test_index(self):
+        (foo, bar) = self.setup_vends()
+        store = VendIndexStore()
+        indexer = VendIndexer(self.rpc, self.vend_address, store, chunk_size=2)
+        count = indexer.sync()
+        self.assertEqual(count, 7)
+        self.check_index(store, foo, bar, self.initial_supply)
+
+
+    def test_index_mint(self):
+        (foo, bar) = self.setup_vends(mint=True)
+        store = VendIndexStore()
+        indexer = VendIndexer(self.rpc, self.vend_address, store)
+        indexer.sync()
+        self.check_index(store, foo, bar, 0)
+
+
+    def test_resume(self):
+        (foo, bar) = self.setup_vends()
+        (fd, path) = tempfile.mkstemp()
+        os.close(fd)
+        store = VendIndexStore(path)
+        indexer = VendIndexer(self.rpc, self.vend_address, store)
+        indexer.sync()
+        checkpoint = store.checkpoint(self.vend_address)
+        store.close()
+
+        self.fund(self.accounts[3])
+        self.deposit(self.accounts[3], bar)
+
+        store = VendIndexStore(path)
+        indexer = VendIndexer(self.rpc, self.vend_address, store)
+        self.assertEqual(indexer.sync(), 1)
+        self.assertGreater(store.checkpoint(self.vend_address), checkpoint)
+        self.assertEqual(len(store.vended(bar)), 2)
+        self.assertEqual(len(store.mints(created=False)), 4)
+        self.assertEqual(indexer.sync(), 0)
+        store.close()
+        os.unlink(path)
+
+
+    def test_adaptive_range(self):
+        (foo, bar) = self.setup_vends()
+        rpc = RangeLimitRPCConnection(None, self.helper, self.signer)
+        store = VendIndexStore()
+        indexer = VendIndexer(rpc, self.vend_address, store, chunk_size=64)
+        indexer.sync()
+        self.check_index(store, foo, bar, self.initial_supply)
+        self.assertEqual(indexer.chunk_size, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
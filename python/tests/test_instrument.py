@@ -0,0 +1,120 @@
+# standard imports
+import unittest
+import logging
+import json
+
+# external imports
+from chainlib.eth.nonce import RPCNonceOracle
+from chainlib.error import JSONRPCException
+from chainlib.eth.tx import receipt
+
+# local imports
+from erc20_vend.unittest import TestVend
+from erc20_vend import Vend
+from erc20_vend.instrument import (
+    Histogram,
+    HistogramCollector,
+    InstrumentedConnection,
+    contract_label,
+)
+
+
+logging.basicConfig(level=logging.DEBUG)
+logg = logging.getLogger()
+
+
+class TestHistogram(unittest.TestCase):
+
+    def test_histogram(self):
+        h = Histogram(buckets=(0.001, 0.01, 0.1))
+        self.assertEqual(h.quantile(0.5), None)
+        for v in [0.0005, 0.002, 0.003, 0.05, 1.5]:
+            h.observe(v)
+        self.assertEqual(h.counts, [1, 2, 1, 1])
+        self.assertEqual(h.count, 5)
+        self.assertEqual(h.min, 0.0005)
+        self.assertEqual(h.max, 1.5)
+        self.assertEqual(h.quantile(0.2), 0.001)
+        self.assertEqual(h.quantile(0.5), 0.01)
+        self.assertEqual(h.quantile(1.0), 1.5)
+        self.assertEqual(h.snapshot()['buckets'], [[0.001, 1], [0.01, 2], [0.1, 1], [None, 1]])
+
+
+    def test_collector(self):
+        collector = HistogramCollector()
+        collector.timing('build', 0.002, {'method': 'create', 'stage': 'total'})
+        collector.timing('build', 0.004, {'stage': 'total', 'method': 'create'})
+        collector.count('rpc_requests', {'method': 'eth_call'})
+        collector.count('rpc_requests', {'method': 'eth_call'}, value=2)
+        self.assertEqual(collector.get('build', method='create', stage='total').count, 2)
+        r = json.loads(json.dumps(collector.snapshot()))
+        self.assertEqual(len(r['timings']), 1)
+        self.assertEqual(r['timings'][0]['labels'], {'method': 'create', 'stage': 'total'})
+        self.assertAlmostEqual(r['timings'][0]['sum'], 0.006)
+        self.assertEqual(r['counters'], [{'name': 'rpc_requests', 'labels': {'method': 'eth_call'}, 'value': 3}])
+        collector.reset()
+        self.assertEqual(collector.snapshot(), {'timings': [], 'counters': []})
+
+
+class TestVendInstrument(TestVend):
+
+    def test_disabled(self):
+        nonce_oracle = RPCNonceOracle(self.accounts[0], conn=self.conn)
+        c = Vend(self.chain_spec, signer=self.signer, nonce_oracle=nonce_oracle)
+        c.create(self.vend_address, self.accounts[0], 'foo vend', 'FOOVEND')
+        self.assertEqual(c.instrument_frame, None)
+
+
+    def test_builders(self):
+        collector = HistogramCollector()
+        nonce_oracle = RPCNonceOracle(self.accounts[0], conn=self.conn)
+        c = Vend(self.chain_spec, signer=self.signer, nonce_oracle=nonce_oracle, collector=collector)
+        (tx_hash, o) = c.create(self.vend_address, self.accounts[0], 'foo vend', 'FOOVEND')
+        self.rpc.do(o)
+        contract = contract_label(self.vend_address)
+
+        stages = {}
+        for stage in ['template', 'set_code', 'finalize', 'encode', 'total']:
+            h = collector.get('build', method='create', contract=contract, stage=stage)
+            self.assertEqual(h.count, 1)
+            stages[stage] = h.sum
+        self.assertAlmostEqual(stages['total'], stages['template'] + stages['set_code'] + stages['finalize'] + stages['encode'])
+
+        c.get_token_batch(self.vend_address, 0, 3)
+        self.assertEqual(collector.get('build', method='get_token', contract=contract, stage='normalize').count, 3)
+        self.assertEqual(collector.get('build', method='get_token_batch', contract=contract, stage='total').count, 1)
+        # nested builders are stages of the outer one, not encoding
+        outer = collector.get('build', method='get_token_batch', contract=contract, stage='total').sum
+        inner = collector.get('build', method='get_token', contract=contract, stage='total').sum
+        self.assertLessEqual(collector.get('build', method='get_token_batch', contract=contract, stage='encode').sum, outer - inner + 1e-9)
+
+        (tx_hash, o) = c.constructor(self.accounts[0], self.token_address)
+        self.assertEqual(collector.get('build', method='constructor', contract=None, stage='total').count, 1)
+        self.assertEqual(c.instrument_frame, None)
+
+
+    def test_connection(self):
+        collector = HistogramCollector()
+        conn = InstrumentedConnection(self.rpc, collector)
+        nonce_oracle = RPCNonceOracle(self.accounts[0], conn=conn)
+        c = Vend(self.chain_spec, signer=self.signer, nonce_oracle=nonce_oracle)
+        (tx_hash, o) = c.create(self.vend_address, self.accounts[0], 'foo vend', 'FOOVEND')
+        conn.do(o)
+        conn.do([receipt(tx_hash), c.get_token(self.vend_address, 0, sender_address=self.accounts[0])])
+        with self.assertRaises(JSONRPCException):
+            conn.do(c.get_token(self.vend_address, 1, sender_address=self.accounts[0]))
+
+        contract = contract_label(self.vend_address)
+        self.assertEqual(collector.get('rpc', method='eth_sendRawTransaction', contract=None).count, 1)
+        self.assertEqual(collector.get('rpc', method='batch', contract=None).count, 1)
+        self.assertEqual(collector.get('rpc', method='eth_call', contract=contract).count, 1)
+        counters = {}
+        for v in collector.snapshot()['counters']:
+            counters[(v['name'], v['labels']['method'])] = v['value']
+        self.assertEqual(counters[('rpc_requests', 'eth_call')], 2)
+        self.assertEqual(counters[('rpc_requests', 'eth_getTransactionReceipt')], 1)
+        self.assertEqual(counters[('rpc_errors', 'eth_call')], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
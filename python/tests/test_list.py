@@ -0,0 +1,110 @@
+# standard imports
+import unittest
+import logging
+
+# external imports
+from chainlib.eth.nonce import RPCNonceOracle
+from chainlib.eth.tx import receipt
+from chainlib.eth.contract import ABIContractType
+from hexathon import strip_0x
+
+# local imports
+from erc20_vend.unittest import TestVend
+from erc20_vend.unittest.base import bytecode_has_method
+from erc20_vend import Vend
+
+
+logging.basicConfig(level=logging.DEBUG)
+logg = logging.getLogger()
+
+
+class TestVendList(TestVend):
+
+    def create_tokens(self, count):
+        nonce_oracle = RPCNonceOracle(self.accounts[0], conn=self.conn)
+        c = Vend(self.chain_spec, signer=self.signer, nonce_oracle=nonce_oracle)
+        for i in range(count):
+            (tx_hash, o) = c.create(self.vend_address, self.accounts[0], 'foo vend {}'.format(i), 'FOOVEND{}'.format(i))
+            self.rpc.do(o)
+            o = receipt(tx_hash)
+            r = self.rpc.do(o)
+            self.assertEqual(r['status'], 1)
+
+
+    def test_list_empty(self):
+        c = Vend(self.chain_spec)
+        r = c.list_tokens(self.rpc, self.vend_address, sender_address=self.accounts[0])
+        self.assertEqual(r, [])
+
+
+    def test_list_tokens(self):
+        self.create_tokens(5)
+        c = Vend(self.chain_spec)
+        tokens = c.list_tokens(self.rpc, self.vend_address, window=2, sender_address=self.accounts[0])
+        self.assertEqual(len(tokens), 5)
+        for i in range(5):
+            o = c.get_token(self.vend_address, i, sender_address=self.accounts[0])
+            r = self.rpc.do(o)
+            self.assertEqual(tokens[i], c.parse_token(r))
+
+        r = c.list_tokens(self.rpc, self.vend_address, offset=3, sender_address=self.accounts[0])
+        self.assertEqual(r, tokens[3:])
+
+
+    def test_list_tokens_cache(self):
+        self.create_tokens(3)
+        c = Vend(self.chain_spec)
+        tokens = c.list_tokens(self.rpc, self.vend_address, sender_address=self.accounts[0])
+        self.assertEqual(len(tokens), 3)
+        self.assertEqual(c.token_cache.get(self.vend_address), tokens)
+
+        self.create_tokens(2)
+        r = c.list_tokens(self.rpc, self.vend_address, sender_address=self.accounts[0])
+        self.assertEqual(r[:3], tokens)
+        self.assertEqual(len(r), 5)
+
+        c.token_cache.clear(self.vend_address)
+        self.assertEqual(c.token_cache.get(self.vend_address), [])
+        self.assertEqual(c.list_tokens(self.rpc, self.vend_address, sender_address=self.accounts[0]), r)
+
+
+    def test_parse_tokens(self):
+        c = Vend(self.chain_spec)
+        v = '0x' + (32).to_bytes(32, 'big').hex() + (2).to_bytes(32, 'big').hex()
+        v += bytes.fromhex(self.accounts[1][2:]).rjust(32, b'\x00').hex()
+        v += bytes.fromhex(self.accounts[2][2:]).rjust(32, b'\x00').hex()
+        self.assertEqual(c.parse_tokens(v), [strip_0x(self.accounts[1]), strip_0x(self.accounts[2])])
+
+        v = '0x' + (32).to_bytes(32, 'big').hex() + (0).to_bytes(32, 'big').hex()
+        self.assertEqual(c.parse_tokens(v), [])
+
+
+    @unittest.skipUnless(bytecode_has_method('getTokens', [ABIContractType.UINT256, ABIContractType.UINT256]), 'contract artifact has no getTokens')
+    def test_get_tokens_page(self):
+        c = Vend(self.chain_spec)
+        o = c.token_count(self.vend_address, sender_address=self.accounts[0])
+        r = self.rpc.do(o)
+        self.assertEqual(c.parse_token_count(r), 0)
+
+        self.create_tokens(5)
+        o = c.token_count(self.vend_address, sender_address=self.accounts[0])
+        r = self.rpc.do(o)
+        self.assertEqual(c.parse_token_count(r), 5)
+
+        tokens = c.list_tokens(self.rpc, self.vend_address, sender_address=self.accounts[0])
+
+        o = c.get_tokens(self.vend_address, 1, 3, sender_address=self.accounts[0])
+        r = self.rpc.do(o)
+        self.assertEqual(c.parse_tokens(r), tokens[1:4])
+
+        o = c.get_tokens(self.vend_address, 3, 10, sender_address=self.accounts[0])
+        r = self.rpc.do(o)
+        self.assertEqual(c.parse_tokens(r), tokens[3:])
+
+        o = c.get_tokens(self.vend_address, 5, 10, sender_address=self.accounts[0])
+        r = self.rpc.do(o)
+        self.assertEqual(c.parse_tokens(r), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
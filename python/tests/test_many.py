@@ -0,0 +1,261 @@
+# standard imports
+import unittest
+import logging
+
+# external imports
+from chainlib.eth.nonce import RPCNonceOracle
+from chainlib.eth.tx import (
+    receipt,
+    unpack,
+    TxFormat,
+)
+from chainlib.eth.address import is_same_address
+from eth_erc20 import ERC20
+from giftable_erc20_token import GiftableToken
+from hexathon import strip_0x
+import eth_abi
+
+# local imports
+from erc20_vend.unittest import TestVend
+from erc20_vend import Vend
+from erc20_vend.vend import batch
+from erc20_vend.unittest.base import bytecode_has_method
+from erc20_vend.calldata import (
+    STRING_ARRAY,
+    ADDRESS_ARRAY,
+    UINT256_ARRAY,
+)
+from erc20_vend import calldata
+from erc20_vend import gas as vend_gas
+from erc20_vend import event
+
+
+logging.basicConfig(level=logging.DEBUG)
+logg = logging.getLogger()
+
+
+class TestVendMany(TestVend):
+
+    def test_create_many(self):
+        nonce_oracle = RPCNonceOracle(self.accounts[0], conn=self.conn)
+        c = Vend(self.chain_spec, signer=self.signer, nonce_oracle=nonce_oracle)
+        jobs = []
+        for i in range(3):
+            jobs.append((self.accounts[0], 'foo vend {}'.format(i), 'FOOVEND{}'.format(i),))
+        txs = c.create_many(self.vend_address, jobs)
+        self.assertEqual(len(txs), 3)
+        r = self.rpc.do(batch(txs))
+        for (tx_hash, o) in txs:
+            o = receipt(tx_hash)
+            r = self.rpc.do(o)
+            self.assertEqual(r['status'], 1)
+
+        # oracle continues after the bulk nonces
+        (tx_hash, o) = c.create(self.vend_address, self.accounts[0], 'bar vend', 'BARVEND')
+        self.rpc.do(o)
+        o = receipt(tx_hash)
+        r = self.rpc.do(o)
+        self.assertEqual(r['status'], 1)
+
+        tokens = c.list_tokens(self.rpc, self.vend_address, sender_address=self.accounts[0])
+        self.assertEqual(len(tokens), 4)
+        c = ERC20(self.chain_spec)
+        for i in range(3):
+            o = c.symbol(tokens[i], sender_address=self.accounts[0])
+            r = self.rpc.do(o)
+            self.assertEqual(c.parse_symbol(r), 'FOOVEND{}'.format(i))
+
+
+    def test_deposit_withdraw_many(self):
+        nonce_oracle = RPCNonceOracle(self.accounts[0], conn=self.conn)
+        c = Vend(self.chain_spec, signer=self.signer, nonce_oracle=nonce_oracle)
+        jobs = [
+            (self.accounts[0], 'foo vend', 'FOOVEND',),
+            (self.accounts[0], 'bar vend', 'BARVEND',),
+        ]
+        txs = c.create_many(self.vend_address, jobs)
+        self.rpc.do(batch(txs))
+        tokens = c.list_tokens(self.rpc, self.vend_address, sender_address=self.accounts[0])
+
+        holders = self.accounts[1:4]
+        src_amount = 100 * (10 ** self.token_decimals)
+        c = GiftableToken(self.chain_spec, signer=self.signer, nonce_oracle=nonce_oracle)
+        for holder in holders:
+            (tx_hash, o) = c.mint_to(self.token_address, self.accounts[0], holder, src_amount)
+            self.rpc.do(o)
+            nonce_oracle_holder = RPCNonceOracle(holder, conn=self.conn)
+            c_holder = ERC20(self.chain_spec, signer=self.signer, nonce_oracle=nonce_oracle_holder)
+            (tx_hash, o) = c_holder.approve(self.token_address, holder, self.vend_address, src_amount)
+            self.rpc.do(o)
+            
+        # every holder deposits the full balance on the first token, start nonces from one batch query
+        jobs = []
+        for holder in holders:
+            jobs.append((holder, tokens[0],))
+        c = Vend(self.chain_spec, signer=self.signer)
+        txs = c.deposit_many(self.vend_address, jobs, conn=self.rpc, tx_format=TxFormat.RLP_SIGNED)
+        self.assertEqual(len(txs), 3)
+        for i, (tx_hash, tx_raw) in enumerate(txs):
+            tx = unpack(bytes.fromhex(strip_0x(tx_raw)), self.chain_spec)
+            self.assertTrue(is_same_address(tx['from'], holders[i]))
+            self.assertEqual(tx['nonce'], 1)
+
+        txs = c.deposit_many(self.vend_address, jobs, conn=self.rpc)
+        self.rpc.do(batch(txs))
+        for (tx_hash, o) in txs:
+            o = receipt(tx_hash)
+            r = self.rpc.do(o)
+            self.assertEqual(r['status'], 1)
+
+        c_token = ERC20(self.chain_spec)
+        for holder in holders:
+            o = c_token.balance_of(tokens[0], holder, sender_address=self.accounts[0])
+            r = self.rpc.do(o)
+            self.assertEqual(c_token.parse_balance(r), 100)
+
+        # several jobs per sender, nonces given explicitly
+        # withdraw on the second token is a no-op as nothing was deposited, but still takes a nonce
+        jobs = []
+        for holder in holders:
+            nonce_oracle_holder = RPCNonceOracle(holder, conn=self.conn)
+            c_holder = ERC20(self.chain_spec, signer=self.signer, nonce_oracle=nonce_oracle_holder)
+            (tx_hash, o) = c_holder.approve(tokens[0], holder, self.vend_address, 100)
+            self.rpc.do(o)
+            jobs.append((holder, tokens[0],))
+            jobs.append((holder, tokens[1],))
+
+        nonces = {}
+        for holder in holders:
+            nonces[holder] = 3
+        txs = c.withdraw_many(self.vend_address, jobs, nonces=nonces)
+        self.assertEqual(len(txs), 6)
+        self.rpc.do(batch(txs))
+        for (tx_hash, o) in txs:
+            o = receipt(tx_hash)
+            r = self.rpc.do(o)
+            self.assertEqual(r['status'], 1)
+
+        for holder in holders:
+            o = c_token.balance_of(tokens[0], holder, sender_address=self.accounts[0])
+            r = self.rpc.do(o)
+            self.assertEqual(c_token.parse_balance(r), 0)
+            o = c_token.balance_of(self.token_address, holder, sender_address=self.accounts[0])
+            r = self.rpc.do(o)
+            self.assertEqual(c_token.parse_balance(r), src_amount)
+
+
+    def test_no_nonce_source(self):
+        c = Vend(self.chain_spec, signer=self.signer)
+        with self.assertRaises(ValueError):
+            c.deposit_many(self.vend_address, [(self.alice, self.token_address,)])
+
+
+class TestVendCreateManyEncode(unittest.TestCase):
+
+    def test_create_many_tokens(self):
+        names = ['foo vend', 'bar vend with a name longer than one word', 'b\u00e5z']
+        symbols = ['FOOVEND', 'BARVEND', 'BAZVEND']
+        r = calldata.create_many.encode(names, symbols)
+        self.assertEqual(r[8:], eth_abi.encode_abi(['string[]', 'string[]'], [names, symbols]).hex())
+        self.assertEqual(vend_gas.item_count(r), 3)
+        self.assertEqual(Vend.gas(r), vend_gas.static_limit('create') * 3)
+
+        c = Vend(None)
+        with self.assertRaises(ValueError):
+            c.create_many_tokens('0x' + '11' * 20, '0x' + '22' * 20, names, symbols[:2])
+
+
+    def test_deposit_many_tokens(self):
+        tokens = ['0x' + '11' * 20, '0x' + '22' * 20]
+        values = [42, 13 * (10 ** 18)]
+        r = calldata.deposit_many.encode(tokens, values)
+        self.assertEqual(r[8:], eth_abi.encode_abi(['address[]', 'uint256[]'], [tokens, values]).hex())
+        self.assertEqual(Vend.gas(r), vend_gas.static_limit('deposit') * 2)
+
+        c = Vend(None)
+        with self.assertRaises(ValueError):
+            c.deposit_many_tokens('0x' + '33' * 20, '0x' + '44' * 20, tokens, values[:1])
+        with self.assertRaises(ValueError):
+            c.deposit_many_tokens('0x' + '33' * 20, '0x' + '44' * 20, tokens, [42, 0])
+
+
+@unittest.skipUnless(bytecode_has_method('createMany', [STRING_ARRAY, STRING_ARRAY]), 'contract artifact has no createMany')
+class TestVendCreateMany(TestVend):
+
+    def test_create_many_tokens(self):
+        nonce_oracle = RPCNonceOracle(self.accounts[0], conn=self.conn)
+        c = Vend(self.chain_spec, signer=self.signer, nonce_oracle=nonce_oracle)
+        names = []
+        symbols = []
+        for i in range(5):
+            names.append('foo vend {}'.format(i))
+            symbols.append('FOOVEND{}'.format(i))
+        (tx_hash, o) = c.create_many_tokens(self.vend_address, self.accounts[0], names, symbols)
+        self.rpc.do(o)
+        o = receipt(tx_hash)
+        r = self.rpc.do(o)
+        self.assertEqual(r['status'], 1)
+
+        created = c.parse_logs([r], topics=[event.topic_token_created])
+        self.assertEqual(len(created), 5)
+        tokens = c.list_tokens(self.rpc, self.vend_address, sender_address=self.accounts[0])
+        self.assertEqual(len(tokens), 5)
+        c_token = ERC20(self.chain_spec)
+        for i in range(5):
+            self.assertEqual(created[i].idx, i)
+            self.assertTrue(is_same_address(created[i].token, tokens[i]))
+            o = c_token.symbol(tokens[i], sender_address=self.accounts[0])
+            r = self.rpc.do(o)
+            self.assertEqual(c_token.parse_symbol(r), symbols[i])
+
+
+@unittest.skipUnless(bytecode_has_method('depositMany', [ADDRESS_ARRAY, UINT256_ARRAY]), 'contract artifact has no depositMany')
+class TestVendDepositMany(TestVend):
+
+    def test_deposit_many_tokens(self):
+        nonce_oracle = RPCNonceOracle(self.accounts[0], conn=self.conn)
+        c = Vend(self.chain_spec, signer=self.signer, nonce_oracle=nonce_oracle)
+        jobs = []
+        for i in range(3):
+            jobs.append((self.accounts[0], 'foo vend {}'.format(i), 'FOOVEND{}'.format(i),))
+        self.rpc.do(batch(c.create_many(self.vend_address, jobs)))
+        tokens = c.list_tokens(self.rpc, self.vend_address, sender_address=self.accounts[0])
+
+        unit = 10 ** self.token_decimals
+        values = [10 * unit, 20 * unit, 30 * unit]
+        src_amount = 100 * unit
+        c = GiftableToken(self.chain_spec, signer=self.signer, nonce_oracle=nonce_oracle)
+        (tx_hash, o) = c.mint_to(self.token_address, self.accounts[0], self.alice, src_amount)
+        self.rpc.do(o)
+
+        nonce_oracle = RPCNonceOracle(self.alice, conn=self.conn)
+        c_token = ERC20(self.chain_spec, signer=self.signer, nonce_oracle=nonce_oracle)
+        (tx_hash, o) = c_token.approve(self.token_address, self.alice, self.vend_address, sum(values))
+        self.rpc.do(o)
+        c = Vend(self.chain_spec, signer=self.signer, nonce_oracle=nonce_oracle)
+        (tx_hash, o) = c.deposit_many_tokens(self.vend_address, self.alice, tokens, values)
+        self.rpc.do(o)
+        o = receipt(tx_hash)
+        r = self.rpc.do(o)
+        self.assertEqual(r['status'], 1)
+
+        for i in range(3):
+            o = c_token.balance_of(tokens[i], self.alice, sender_address=self.accounts[0])
+            r = self.rpc.do(o)
+            self.assertEqual(c_token.parse_balance(r), values[i] // unit)
+        o = c_token.balance_of(self.token_address, self.alice, sender_address=self.accounts[0])
+        r = self.rpc.do(o)
+        self.assertEqual(c_token.parse_balance(r), src_amount - sum(values))
+
+        # a token already deposited for reverts the whole batch
+        (tx_hash, o) = c_token.approve(self.token_address, self.alice, self.vend_address, unit)
+        self.rpc.do(o)
+        (tx_hash, o) = c.deposit_many_tokens(self.vend_address, self.alice, tokens[:1], [unit])
+        self.rpc.do(o)
+        o = receipt(tx_hash)
+        r = self.rpc.do(o)
+        self.assertEqual(r['status'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,202 @@
+# standard imports
+import unittest
+import logging
+
+# external imports
+from chainlib.eth.nonce import RPCNonceOracle
+from chainlib.eth.tx import receipt
+from eth_erc20 import ERC20
+from giftable_erc20_token import GiftableToken
+
+# local imports
+from erc20_vend.unittest.base import TestVendCore
+from erc20_vend import Vend
+from erc20_vend import model
+from erc20_vend.model import (
+    VendModel,
+    OK,
+    ERR_USED,
+    ERR_TOKEN,
+    ERR_LOCKED,
+    ERR_ALREADY_WITHDRAWN,
+    UINT256_MAX,
+)
+
+
+logging.basicConfig(level=logging.DEBUG)
+logg = logging.getLogger()
+
+
+class TestVendModel(unittest.TestCase):
+
+    def test_constructor(self):
+        with self.assertRaises(ValueError):
+            VendModel([1], 2, decimals=3)
+        m = VendModel([1, 2, 3], 18, decimals=2)
+        self.assertEqual(m.decimal_divisor, 10 ** 16)
+        self.assertEqual(m.supply, 6)
+        self.assertEqual(VendModel([1, 2, 3], 0, mint=True).supply, 0)
+        self.assertEqual(list(m.vended([10 ** 16, 10 ** 16 - 1, 2 ** 200])), [1, 0, 2 ** 200 // 10 ** 16])
+
+
+    def test_deposit_withdraw(self):
+        unit = 10 ** 18
+        m = VendModel([100 * unit, 0, 2 ** 100 * unit, 5 * unit + 1], 18, decimals=0, mint=True)
+        idx = m.create()
+        (vended, err) = m.deposit(idx, [0, 1, 2, 3, 0])
+        self.assertEqual(list(err), [OK, OK, OK, OK, ERR_USED])
+        self.assertEqual(list(vended), [100, 0, 2 ** 100, 5, 0])
+        self.assertEqual(m.tokens[idx].minted, 105 + 2 ** 100)
+        self.assertEqual(m.tokens[idx].used_by(1), 0)
+
+        (vended, err) = m.deposit(idx, [1], values=[1])
+        self.assertEqual(list(err), [ERR_TOKEN])
+
+        m.transfer(idx, 0, 1, 1)
+        (returned, err) = m.withdraw(idx, [0, 1, 2, 3, 2])
+        self.assertEqual(list(err), [ERR_LOCKED, OK, OK, ERR_LOCKED, ERR_ALREADY_WITHDRAWN])
+        self.assertEqual(list(returned), [0, 0, 2 ** 100 * unit, 0, 0])
+        self.assertEqual(m.tokens[idx].used_by(2), UINT256_MAX)
+        self.assertEqual(m.tokens[idx].returned, 2 ** 100)
+        self.assertEqual(m.balances[2], 2 ** 100 * unit)
+
+
+    @unittest.skipIf(model.numpy == None, 'numpy not installed')
+    def test_vectorized(self):
+        numpy = model.numpy
+        rng = numpy.random.default_rng(42)
+        balances = rng.integers(0, 10 ** 12, size=10000)
+        balances[::7] = 0
+        holders = list(rng.permutation(10000)[:5000])
+        for mint in [False, True]:
+            results = []
+            for vectorized in [True, False]:
+                m = VendModel(balances, 12, decimals=4, mint=mint)
+                idx = m.create()
+                if vectorized:
+                    r = [m.deposit(idx, holders), m.deposit(idx, holders[:100])]
+                else:
+                    r = [m._VendModel__loop(m.deposit_one, idx, holders, [0] * len(holders)), m._VendModel__loop(m.deposit_one, idx, holders[:100], [0] * 100)]
+                for i in holders[:50]:
+                    m.transfer(idx, i, holders[-1], int(m.tokens[idx].balances[i]) // 2)
+                if vectorized:
+                    r.append(m.withdraw(idx))
+                else:
+                    r.append(m._VendModel__loop(m.withdraw_one, idx, range(10000)))
+                results.append((r, list(m.balances), list(m.tokens[idx].balances), m.tokens[idx].returned,))
+            for i in range(3):
+                self.assertEqual(list(results[0][0][i][0]), list(results[1][0][i][0]))
+                self.assertEqual(list(results[0][0][i][1]), list(results[1][0][i][1]))
+            self.assertEqual(results[0][1:], results[1][1:])
+
+
+# Runs the same operations on the contract and on the model, comparing transaction status
+# and all held and vended token balances after every step.
+class TestVendModelEquivalence(TestVendCore):
+
+    def send(self, holder, fn, *args):
+        nonce_oracle = RPCNonceOracle(holder, conn=self.conn)
+        c = Vend(self.chain_spec, signer=self.signer, nonce_oracle=nonce_oracle)
+        (tx_hash, o) = fn(c)(self.vend_address, holder, *args)
+        self.rpc.do(o)
+        o = receipt(tx_hash)
+        return self.rpc.do(o)['status']
+
+
+    def compare(self, m, idx, holders, vended_token_address):
+        c = ERC20(self.chain_spec)
+        for i, holder in enumerate(holders):
+            o = c.balance_of(self.token_address, holder, sender_address=self.accounts[0])
+            self.assertEqual(c.parse_balance(self.rpc.do(o)), m.balances[i])
+            o = c.balance_of(vended_token_address, holder, sender_address=self.accounts[0])
+            self.assertEqual(c.parse_balance(self.rpc.do(o)), m.tokens[idx].balances[i])
+
+
+    def check_steps(self, m, idx, holders, vended_token_address, steps):
+        for (method, i) in steps:
+            if method == 'deposit':
+                status = self.send(holders[i], lambda c: c.deposit, vended_token_address)
+                (v, err) = m.deposit(idx, [i])
+            else:
+                status = self.send(holders[i], lambda c: c.withdraw, vended_token_address)
+                (v, err) = m.withdraw(idx, [i])
+            logg.debug('{} holder {} status {} model {}'.format(method, i, status, err[0]))
+            self.assertEqual(status == 1, err[0] == OK)
+            self.compare(m, idx, holders, vended_token_address)
+
+
+    def run_mode(self, holders, mint=False, decimals=0):
+        self.publish(mint=mint, decimals=decimals)
+        unit = 10 ** self.token_decimals
+        amounts = [100 * unit, 250 * unit + 7, 0]
+
+        nonce_oracle = RPCNonceOracle(self.accounts[0], conn=self.conn)
+        c = Vend(self.chain_spec, signer=self.signer, nonce_oracle=nonce_oracle)
+        (tx_hash, o) = c.create(self.vend_address, self.accounts[0], 'foo vend', 'FOOVEND')
+        self.rpc.do(o)
+        o = c.get_token(self.vend_address, 0, sender_address=self.accounts[0])
+        vended_token_address = c.parse_token(self.rpc.do(o))
+
+        c = GiftableToken(self.chain_spec, signer=self.signer, nonce_oracle=nonce_oracle)
+        for i, holder in enumerate(holders):
+            if amounts[i] > 0:
+                (tx_hash, o) = c.mint_to(self.token_address, self.accounts[0], holder, amounts[i])
+                self.rpc.do(o)
+        o = c.total_supply(self.token_address, sender_address=self.accounts[0])
+        supply = c.parse_total_supply(self.rpc.do(o))
+
+        for holder in holders:
+            nonce_oracle = RPCNonceOracle(holder, conn=self.conn)
+            c_token = ERC20(self.chain_spec, signer=self.signer, nonce_oracle=nonce_oracle)
+            for token_address in [self.token_address, vended_token_address]:
+                (tx_hash, o) = c_token.approve(token_address, holder, self.vend_address, UINT256_MAX)
+                self.rpc.do(o)
+
+        m = VendModel(amounts, self.token_decimals, decimals=decimals, mint=mint, supply=supply)
+        idx = m.create()
+        self.compare(m, idx, holders, vended_token_address)
+        self.check_steps(m, idx, holders, vended_token_address, [
+            ('deposit', 0),
+            ('deposit', 1),
+            ('deposit', 2),
+            ('deposit', 0),
+            ('withdraw', 2),
+            ])
+
+        # move one vended unit, locking both holders
+        nonce_oracle = RPCNonceOracle(holders[0], conn=self.conn)
+        c_token = ERC20(self.chain_spec, signer=self.signer, nonce_oracle=nonce_oracle)
+        (tx_hash, o) = c_token.transfer(vended_token_address, holders[0], holders[2], 1)
+        self.rpc.do(o)
+        m.transfer(idx, 0, 2, 1)
+        self.check_steps(m, idx, holders, vended_token_address, [
+            ('withdraw', 0),
+            ('withdraw', 1),
+            ])
+
+        nonce_oracle = RPCNonceOracle(holders[2], conn=self.conn)
+        c_token = ERC20(self.chain_spec, signer=self.signer, nonce_oracle=nonce_oracle)
+        (tx_hash, o) = c_token.transfer(vended_token_address, holders[2], holders[0], 1)
+        self.rpc.do(o)
+        m.transfer(idx, 2, 0, 1)
+        self.check_steps(m, idx, holders, vended_token_address, [
+            ('withdraw', 0),
+            ('withdraw', 0),
+            ('deposit', 0),
+            ])
+
+
+    def test_supply(self):
+        self.run_mode(self.accounts[1:4])
+
+
+    def test_mint(self):
+        self.run_mode(self.accounts[1:4], mint=True)
+
+
+    def test_decimals(self):
+        self.run_mode(self.accounts[1:4], mint=True, decimals=2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,162 @@
+# standard imports
+import unittest
+import logging
+
+# external imports
+import eth_abi
+from chainlib.chain import ChainSpec
+from chainlib.eth.nonce import RPCNonceOracle
+from chainlib.eth.tx import receipt
+from chainlib.eth.address import (
+    is_same_address,
+    to_checksum_address,
+)
+from eth_erc20 import ERC20
+from giftable_erc20_token import GiftableToken
+from hexathon import strip_0x
+
+# local imports
+from erc20_vend.unittest import TestVend
+from erc20_vend.data import (
+    registry,
+    multicall_registry,
+)
+from erc20_vend import Vend
+from erc20_vend.vend import VendTokenCache
+from erc20_vend import calldata
+from erc20_vend.multicall import Multicall
+from erc20_vend.preflight import (
+    VendPreflight,
+    Preflight,
+)
+
+
+logging.basicConfig(level=logging.DEBUG)
+logg = logging.getLogger()
+
+
+def has_multicall():
+    try:
+        multicall_registry.get()
+    except ValueError:
+        return False
+    return True
+
+
+class TestMulticallEncode(unittest.TestCase):
+
+    def setUp(self):
+        self.chain_spec = ChainSpec('evm', 'foo', 42)
+
+
+    def test_encode(self):
+        targets = ['0x' + 'ab' * 20, '0x' + 'cd' * 20]
+        data = [bytes.fromhex('1234'), bytes(range(32)), bytes(range(40))]
+        r = calldata.aggregate.encode(targets, [d.hex() for d in data])
+        self.assertEqual(r[:8], calldata.aggregate.selector)
+        self.assertEqual(r[8:], eth_abi.encode_abi(['address[]', 'bytes[]'], [targets, data]).hex())
+
+
+    def test_parse(self):
+        data = [bytes.fromhex('1234'), bytes(range(32)), b'', bytes(range(40))]
+        v = eth_abi.encode_abi(['uint256', 'bool[]', 'bytes[]'], [42, [True, False, True, True], data]).hex()
+        c = Multicall(self.chain_spec)
+        (block_number, r) = c.parse_aggregate(v)
+        self.assertEqual(block_number, 42)
+        self.assertEqual(r, [(True, '1234',), (False, bytes(range(32)).hex(),), (True, '',), (True, bytes(range(40)).hex(),)])
+
+
+    def test_preflight_parse(self):
+        holders = ['0x' + '11' * 20, '0x' + '22' * 20]
+        token = '33' * 20
+        pairs = [(holders[0], 0,), (holders[1], 0,), (holders[0], 1,)]
+        results = [
+            (10).to_bytes(32, 'big'),
+            (5).to_bytes(32, 'big'),
+            (20).to_bytes(32, 'big'),
+            (0).to_bytes(32, 'big'),
+            bytes.fromhex('00' * 12 + token),
+            b'',
+                ]
+        v = eth_abi.encode_abi(['uint256', 'bool[]', 'bytes[]'], [42, [True, True, True, True, True, False], results]).hex()
+        c = VendPreflight(self.chain_spec, '0x' + '44' * 20, '0x' + '55' * 20, '0x' + '66' * 20)
+        r = c.parse(pairs, v)
+        self.assertEqual(r[0], Preflight(holders[0], 0, to_checksum_address(token), 10, 5, None))
+        self.assertEqual(r[1], Preflight(holders[1], 0, to_checksum_address(token), 20, 0, None))
+        self.assertEqual(r[2], Preflight(holders[0], 1, None, 10, 5, None))
+
+
+    def test_preflight_parse_used(self):
+        holders = ['0x' + '11' * 20, '0x' + '22' * 20]
+        token = '33' * 20
+        contract_address = '0x' + '55' * 20
+        token_cache = VendTokenCache()
+        token_cache.get(contract_address).append(token)
+        pairs = [(holders[0], 0,), (holders[1], 0,), (holders[1], 1,)]
+        c = VendPreflight(self.chain_spec, '0x' + '44' * 20, contract_address, '0x' + '66' * 20, token_cache=token_cache)
+
+        o = c.request(pairs)
+        v = strip_0x(o['params'][0]['data'])
+        (targets, inputs) = eth_abi.decode_abi(['address[]', 'bytes[]'], bytes.fromhex(v[8:]))
+        self.assertEqual(len(inputs), 6)
+        self.assertEqual(inputs[5].hex(), calldata.used_by_many.encode(holders, token))
+
+        results = [
+            (10).to_bytes(32, 'big'),
+            (5).to_bytes(32, 'big'),
+            (20).to_bytes(32, 'big'),
+            (0).to_bytes(32, 'big'),
+            b'',
+            eth_abi.encode_abi(['uint256[]'], [[0, 42]]),
+                ]
+        v = eth_abi.encode_abi(['uint256', 'bool[]', 'bytes[]'], [42, [True, True, True, True, False, True], results]).hex()
+        r = c.parse(pairs, v)
+        self.assertEqual(r[0], Preflight(holders[0], 0, token, 10, 5, 0))
+        self.assertEqual(r[1], Preflight(holders[1], 0, token, 20, 0, 42))
+        self.assertEqual(r[2], Preflight(holders[1], 1, None, 20, 0, None))
+
+
+@unittest.skipUnless(has_multicall() and registry.get().has_selector(calldata.used_by_many.selector), 'contract artifacts have no multicall or usage views')
+class TestMulticall(TestVend):
+
+    def setUp(self):
+        super(TestMulticall, self).setUp()
+        nonce_oracle = RPCNonceOracle(self.accounts[0], conn=self.conn)
+        c = Multicall(self.chain_spec, signer=self.signer, nonce_oracle=nonce_oracle)
+        (tx_hash, o) = c.constructor(self.accounts[0])
+        self.rpc.do(o)
+        o = receipt(tx_hash)
+        r = self.rpc.do(o)
+        self.assertEqual(r['status'], 1)
+        self.multicall_address = to_checksum_address(r['contract_address'])
+
+
+    def test_preflight(self):
+        nonce_oracle = RPCNonceOracle(self.accounts[0], conn=self.conn)
+        c = Vend(self.chain_spec, signer=self.signer, nonce_oracle=nonce_oracle)
+        (tx_hash, o) = c.create(self.vend_address, self.accounts[0], 'foo vend', 'FOOVEND')
+        self.rpc.do(o)
+        o = c.get_token(self.vend_address, 0, sender_address=self.accounts[0])
+        vended_token_address = c.parse_token(self.rpc.do(o))
+
+        c = GiftableToken(self.chain_spec, signer=self.signer, nonce_oracle=nonce_oracle)
+        (tx_hash, o) = c.mint_to(self.token_address, self.accounts[0], self.alice, 1000)
+        self.rpc.do(o)
+        nonce_oracle = RPCNonceOracle(self.alice, conn=self.conn)
+        c = ERC20(self.chain_spec, signer=self.signer, nonce_oracle=nonce_oracle)
+        (tx_hash, o) = c.approve(self.token_address, self.alice, self.vend_address, 400)
+        self.rpc.do(o)
+
+        pairs = [(self.alice, 0,), (self.bob, 0,), (self.alice, 1,)]
+        c = VendPreflight(self.chain_spec, self.multicall_address, self.vend_address, self.token_address)
+        r = c.check(self.rpc, pairs, sender_address=self.accounts[0])
+        self.assertTrue(is_same_address(r[0].token, vended_token_address))
+        self.assertEqual(r[0].balance, 1000)
+        self.assertEqual(r[0].allowance, 400)
+        self.assertEqual(r[1].balance, 0)
+        self.assertEqual(r[1].allowance, 0)
+        self.assertIsNone(r[2].token)
+
+
+if __name__ == '__main__':
+    unittest.main()
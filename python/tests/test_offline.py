@@ -0,0 +1,106 @@
+# standard imports
+import unittest
+import logging
+import io
+import json
+
+# external imports
+from chainlib.eth.tx import (
+    receipt,
+    raw,
+    unpack,
+)
+from chainlib.eth.nonce import nonce as nonce_query
+from chainlib.eth.address import is_same_address
+from eth_erc20 import ERC20
+from hexathon import strip_0x
+
+# local imports
+from erc20_vend.unittest import TestVend
+from erc20_vend import Vend
+from erc20_vend.offline import VendSignPipeline
+
+
+logging.basicConfig(level=logging.DEBUG)
+logg = logging.getLogger()
+
+
+class TestVendOffline(TestVend):
+
+    def test_sign_pipeline(self):
+        senders = [self.accounts[0], self.alice, self.bob]
+        keys = []
+        nonces = {}
+        for a in senders:
+            keys.append(self.keystore.get(a))
+            r = self.rpc.do(nonce_query(a))
+            nonces[a] = int(r, 16)
+
+        jobs = []
+        for i in range(9):
+            jobs.append(('create', senders[i % 3], 'foo vend {}'.format(i), 'FOOVEND{}'.format(i),))
+
+        w = io.StringIO()
+        p = VendSignPipeline(self.chain_spec, keys, gas_price=1000000000, gas_limit=4000000, workers=2, chunk_size=2)
+        (count, next_nonces) = p.run(self.vend_address, jobs, nonces, w)
+        self.assertEqual(count, 9)
+        for a in senders:
+            self.assertEqual(next_nonces[a[2:].lower()], nonces[a] + 3)
+
+        w.seek(0)
+        txs = []
+        for i, l in enumerate(w):
+            o = json.loads(l)
+            self.assertTrue(is_same_address(o['from'], senders[i % 3]))
+            self.assertEqual(o['nonce'], nonces[senders[i % 3]] + int(i / 3))
+            txs.append(o)
+        self.assertEqual(len(txs), 9)
+
+        for o in txs:
+            self.rpc.do(raw(o['raw']))
+            r = self.rpc.do(receipt(o['hash']))
+            self.assertEqual(r['status'], 1)
+
+        c = Vend(self.chain_spec)
+        tokens = c.list_tokens(self.rpc, self.vend_address, sender_address=self.accounts[0])
+        self.assertEqual(len(tokens), 9)
+        c = ERC20(self.chain_spec)
+        o = c.symbol(tokens[8], sender_address=self.accounts[0])
+        r = self.rpc.do(o)
+        self.assertEqual(c.parse_symbol(r), 'FOOVEND8')
+
+
+    def test_sign_pipeline_gas_table(self):
+        keys = [self.keystore.get(self.accounts[0])]
+        r = self.rpc.do(nonce_query(self.accounts[0]))
+        nonces = {self.accounts[0]: int(r, 16)}
+        jobs = [
+            ('create', self.accounts[0], 'foo vend', 'FOOVEND',),
+            ('create', self.accounts[0], 'bar vend', 'BARVEND',),
+            ]
+
+        w = io.StringIO()
+        p = VendSignPipeline(self.chain_spec, keys, workers=1)
+        (count, next_nonces) = p.run(self.vend_address, jobs, nonces, w)
+        self.assertEqual(count, 2)
+
+        w.seek(0)
+        for l in w:
+            o = json.loads(l)
+            tx = unpack(bytes.fromhex(strip_0x(o['raw'])), self.chain_spec)
+            self.assertEqual(tx['gas'], Vend.gas(tx['data']))
+            self.rpc.do(raw(o['raw']))
+            r = self.rpc.do(receipt(o['hash']))
+            self.assertEqual(r['status'], 1)
+
+
+    def test_sign_pipeline_nonce_missing(self):
+        p = VendSignPipeline(self.chain_spec, [], workers=1)
+        with self.assertRaises(ValueError):
+            p.run(self.vend_address, [('create', self.alice, 'foo', 'FOO')], {}, io.StringIO())
+        with self.assertRaises(ValueError):
+            p.run(self.vend_address, [('mint', self.alice, 'foo', 'FOO')], {self.alice: 0}, io.StringIO())
+
+
+if __name__ == '__main__':
+    unittest.main()
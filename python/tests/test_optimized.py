@@ -0,0 +1,128 @@
+# standard imports
+import unittest
+import logging
+import ast
+
+# external imports
+from chainlib.eth.nonce import RPCNonceOracle
+from chainlib.eth.tx import (
+    receipt,
+    TxFormat,
+)
+from chainlib.error import JSONRPCException
+import eth_abi
+from eth_erc20 import ERC20
+from giftable_erc20_token import GiftableToken
+from hexathon import add_0x
+
+# local imports
+from erc20_vend.unittest.base import TestVendCore
+from erc20_vend import Vend
+from erc20_vend.gas import estimate
+from erc20_vend.data import registry
+
+
+logging.basicConfig(level=logging.DEBUG)
+logg = logging.getLogger()
+
+
+def has_optimized():
+    try:
+        registry.get('optimized')
+    except ValueError:
+        return False
+    return True
+
+
+class TestVendVersion(unittest.TestCase):
+
+    def test_unknown_version(self):
+        with self.assertRaises(ValueError):
+            Vend.bytecode(version='foo')
+
+
+@unittest.skipUnless(has_optimized(), 'no optimized contract artifact')
+class TestVendOptimized(TestVendCore):
+
+    # Deposit and withdraw the full held balance of a fresh holder, returning the gas used by each
+    # and the held and vended token balances after each step.
+    def vend_cycle(self, holder, mint=False, version=None):
+        self.publish(mint=mint, version=version)
+        nonce_oracle = RPCNonceOracle(self.accounts[0], conn=self.conn)
+        c = Vend(self.chain_spec, signer=self.signer, nonce_oracle=nonce_oracle)
+        (tx_hash, o) = c.create(self.vend_address, self.accounts[0], 'foo vend', 'FOOVEND')
+        self.rpc.do(o)
+        o = c.get_token(self.vend_address, 0, sender_address=self.accounts[0])
+        vended_token_address = c.parse_token(self.rpc.do(o))
+
+        src_amount = 100 * (10 ** self.token_decimals)
+        c = GiftableToken(self.chain_spec, signer=self.signer, nonce_oracle=nonce_oracle)
+        (tx_hash, o) = c.mint_to(self.token_address, self.accounts[0], holder, src_amount)
+        self.rpc.do(o)
+
+        nonce_oracle = RPCNonceOracle(holder, conn=self.conn)
+        c_token = ERC20(self.chain_spec, signer=self.signer, nonce_oracle=nonce_oracle)
+        (tx_hash, o) = c_token.approve(self.token_address, holder, self.vend_address, src_amount)
+        self.rpc.do(o)
+
+        r = []
+        c = Vend(self.chain_spec, signer=self.signer, nonce_oracle=nonce_oracle)
+        for step in [c.deposit, c.withdraw]:
+            if step == c.withdraw:
+                (tx_hash, o) = c_token.approve(vended_token_address, holder, self.vend_address, 100)
+                self.rpc.do(o)
+            (tx_hash, o) = step(self.vend_address, holder, vended_token_address)
+            self.rpc.do(o)
+            o = receipt(tx_hash)
+            rcpt = self.rpc.do(o)
+            self.assertEqual(rcpt['status'], 1)
+            balances = []
+            for token_address in [self.token_address, vended_token_address]:
+                o = c_token.balance_of(token_address, holder, sender_address=self.accounts[0])
+                balances.append(c_token.parse_balance(self.rpc.do(o)))
+            r.append((rcpt['gas_used'], balances,))
+        return r
+
+
+    def test_gas(self):
+        holders = iter(self.accounts[1:])
+        for mint in [False, True]:
+            original = self.vend_cycle(next(holders), mint=mint)
+            optimized = self.vend_cycle(next(holders), mint=mint, version='optimized')
+            for i, step in enumerate(['deposit', 'withdraw']):
+                logg.info('{} mint {} gas original {} optimized {}'.format(step, mint, original[i][0], optimized[i][0]))
+                self.assertEqual(original[i][1], optimized[i][1])
+                self.assertLess(optimized[i][0], original[i][0])
+
+
+    # Revert reason of a deposit without held token allowance, from the node gas estimate.
+    def deposit_revert(self, version=None):
+        self.publish(version=version)
+        nonce_oracle = RPCNonceOracle(self.accounts[0], conn=self.conn)
+        c = Vend(self.chain_spec, signer=self.signer, nonce_oracle=nonce_oracle)
+        (tx_hash, o) = c.create(self.vend_address, self.accounts[0], 'foo vend', 'FOOVEND')
+        self.rpc.do(o)
+        o = c.get_token(self.vend_address, 0, sender_address=self.accounts[0])
+        vended_token_address = c.parse_token(self.rpc.do(o))
+        c = GiftableToken(self.chain_spec, signer=self.signer, nonce_oracle=nonce_oracle)
+        (tx_hash, o) = c.mint_to(self.token_address, self.accounts[0], self.alice, 100)
+        self.rpc.do(o)
+
+        c = Vend(self.chain_spec)
+        tx = c.deposit(self.vend_address, self.alice, vended_token_address, tx_format=TxFormat.DICT)
+        with self.assertRaises(JSONRPCException) as e:
+            self.rpc.do(estimate({'from': self.alice, 'to': add_0x(self.vend_address), 'data': tx['data']}))
+        # the exception holds the json-rpc error, whose message is the revert data
+        v = str(e.exception)
+        v = ast.literal_eval(v[v.index('{'):])
+        v = ast.literal_eval(v['error']['message'])
+        return eth_abi.decode_abi(['string'], v[4:])[0]
+
+
+    def test_revert(self):
+        self.assertEqual(self.deposit_revert(), 'ERR_TOKEN')
+        self.assertEqual(self.deposit_revert(version='optimized'), 'ERR_TOKEN')
+
+
+if __name__ == '__main__':
+    unittest.main()
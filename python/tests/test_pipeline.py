@@ -0,0 +1,119 @@
+# standard imports
+import unittest
+import logging
+
+# external imports
+from chainlib.eth.nonce import RPCNonceOracle
+from giftable_erc20_token import GiftableToken
+from eth_erc20 import ERC20
+
+# local imports
+from erc20_vend.unittest import TestVend
+from erc20_vend.unittest.base import TestBatchRPCConnection
+from erc20_vend import Vend
+from erc20_vend.pipeline import TxPipeline
+
+
+logging.basicConfig(level=logging.DEBUG)
+logg = logging.getLogger()
+
+
+# Hides receipts for the given number of polls, and counts batch requests.
+class DelayedReceiptRPCConnection(TestBatchRPCConnection):
+
+    def __init__(self, location, backend, signer, delay=0):
+        super(DelayedReceiptRPCConnection, self).__init__(location, backend, signer)
+        self.delay = delay
+        self.batches = []
+
+
+    def eth_getTransactionReceipt(self, p):
+        if self.delay > 0:
+            return None
+        return super(DelayedReceiptRPCConnection, self).eth_getTransactionReceipt(p)
+
+
+    def do(self, o, **kwargs):
+        if isinstance(o, list):
+            self.batches.append(len(o))
+            r = super(DelayedReceiptRPCConnection, self).do(o, **kwargs)
+            self.delay -= 1
+            return r
+        return super(DelayedReceiptRPCConnection, self).do(o, **kwargs)
+
+
+class TestVendPipeline(TestVend):
+
+    def setUp(self):
+        super(TestVendPipeline, self).setUp()
+        self.rpc = DelayedReceiptRPCConnection(None, self.helper, self.signer)
+        self.conn = self.rpc
+
+
+    def test_run(self):
+        nonce_oracle = RPCNonceOracle(self.accounts[0], conn=self.conn)
+        c = Vend(self.chain_spec, signer=self.signer, nonce_oracle=nonce_oracle)
+        txs = (c.create(self.vend_address, self.accounts[0], 'foo vend {}'.format(i), 'FOO{}'.format(i)) for i in range(5))
+        pipeline = TxPipeline(self.rpc, max_inflight=2, poll_interval=0)
+        r = list(pipeline.run(txs))
+        self.assertEqual([v.tag for v in r], list(range(5)))
+        for v in r:
+            self.assertEqual(v.status, 1)
+            self.assertFalse(v.reverted())
+        self.assertLessEqual(max(self.rpc.batches), 2)
+
+        tokens = c.list_tokens(self.rpc, self.vend_address, sender_address=self.accounts[0])
+        self.assertEqual(len(tokens), 5)
+
+
+    def test_revert(self):
+        src_amount = 100 * (10 ** self.token_decimals)
+        nonce_oracle = RPCNonceOracle(self.accounts[0], conn=self.conn)
+        c = GiftableToken(self.chain_spec, signer=self.signer, nonce_oracle=nonce_oracle)
+        (tx_hash, o) = c.mint_to(self.token_address, self.accounts[0], self.alice, src_amount)
+        self.rpc.do(o)
+        c = Vend(self.chain_spec, signer=self.signer, nonce_oracle=nonce_oracle)
+        (tx_hash, o) = c.create(self.vend_address, self.accounts[0], 'foo vend', 'FOOVEND')
+        self.rpc.do(o)
+        o = c.get_token(self.vend_address, 0, sender_address=self.accounts[0])
+        vended_token_address = c.parse_token(self.rpc.do(o))
+
+        # deposit without allowance reverts, deposit after approve succeeds
+        nonce_oracle = RPCNonceOracle(self.alice, conn=self.conn)
+        c = Vend(self.chain_spec, signer=self.signer, nonce_oracle=nonce_oracle)
+        c_token = ERC20(self.chain_spec, signer=self.signer, nonce_oracle=nonce_oracle)
+        txs = [
+            c.deposit(self.vend_address, self.alice, vended_token_address),
+            c_token.approve(self.token_address, self.alice, self.vend_address, src_amount),
+            c.deposit(self.vend_address, self.alice, vended_token_address),
+            ]
+        pipeline = TxPipeline(self.rpc, poll_interval=0)
+        r = sorted(pipeline.run(txs), key=lambda v: v.tag)
+        self.assertTrue(r[0].reverted())
+        self.assertEqual(r[0].receipt['transaction_hash'], txs[0][0])
+        self.assertEqual(r[1].status, 1)
+        self.assertEqual(r[2].status, 1)
+        self.assertEqual(len(self.rpc.batches), 1)
+
+
+    def test_backoff(self):
+        nonce_oracle = RPCNonceOracle(self.accounts[0], conn=self.conn)
+        c = Vend(self.chain_spec, signer=self.signer, nonce_oracle=nonce_oracle)
+        pipeline = TxPipeline(self.rpc, poll_interval=0.001, max_poll_interval=0.004, backoff=2)
+        (tx_hash, o) = c.create(self.vend_address, self.accounts[0], 'foo vend', 'FOOVEND')
+        pipeline.submit(tx_hash, o)
+        self.rpc.delay = 3
+        self.assertEqual(pipeline.poll(), [])
+        self.assertEqual(pipeline.interval, 0.002)
+        self.assertEqual(pipeline.poll(), [])
+        self.assertEqual(pipeline.poll(), [])
+        self.assertEqual(pipeline.interval, 0.004)
+        r = pipeline.wait()
+        self.assertEqual(len(r), 1)
+        self.assertEqual(r[0].tx_hash, tx_hash)
+        self.assertEqual(pipeline.interval, 0.001)
+        self.assertEqual(len(pipeline), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,83 @@
+# standard imports
+import unittest
+import logging
+
+# external imports
+from chainlib.eth.nonce import RPCNonceOracle
+from chainlib.eth.tx import receipt
+from chainlib.eth.address import is_same_address
+from eth_erc20 import ERC20
+
+# local imports
+from erc20_vend.unittest import TestVend
+from erc20_vend.unittest.base import bytecode_has_method
+from erc20_vend import Vend
+from erc20_vend.event import topic_token_created
+
+
+logging.basicConfig(level=logging.DEBUG)
+logg = logging.getLogger()
+
+
+class TestVendPredict(TestVend):
+
+    # Returns the token created events of all the transactions.
+    def create_tokens(self, count):
+        nonce_oracle = RPCNonceOracle(self.accounts[0], conn=self.conn)
+        c = Vend(self.chain_spec, signer=self.signer, nonce_oracle=nonce_oracle)
+        r = []
+        for i in range(count):
+            (tx_hash, o) = c.create(self.vend_address, self.accounts[0], 'foo vend {}'.format(i), 'FOOVEND{}'.format(i))
+            self.rpc.do(o)
+            o = receipt(tx_hash)
+            rcpt = self.rpc.do(o)
+            self.assertEqual(rcpt['status'], 1)
+            r += c.parse_logs([rcpt], topics=[topic_token_created])
+        return r
+
+
+    def check_predict(self, clone=False):
+        predicted = []
+        for i in range(3):
+            predicted.append(Vend.predict_token_address(self.vend_address, i, clone=clone))
+
+        created = self.create_tokens(3)
+        self.assertEqual(len(created), 3)
+
+        c = Vend(self.chain_spec)
+        for i in range(3):
+            self.assertEqual(created[i].idx, i)
+            self.assertTrue(is_same_address(created[i].token, predicted[i]))
+            o = c.get_token(self.vend_address, i, sender_address=self.accounts[0])
+            r = self.rpc.do(o)
+            self.assertTrue(is_same_address(c.parse_token(r), predicted[i]))
+
+        c = ERC20(self.chain_spec)
+        o = c.symbol(predicted[2], sender_address=self.accounts[0])
+        r = self.rpc.do(o)
+        self.assertEqual(c.parse_symbol(r), 'FOOVEND2')
+
+
+    def test_predict(self):
+        self.check_predict()
+
+
+    def test_predict_mint(self):
+        self.publish(mint=True)
+        self.check_predict()
+
+
+    @unittest.skipUnless(bytecode_has_method('tokenImplementation'), 'contract artifact has no clone mode')
+    def test_predict_clone(self):
+        self.publish(clone=True)
+        self.check_predict(clone=True)
+
+
+    @unittest.skipUnless(bytecode_has_method('tokenImplementation'), 'contract artifact has no clone mode')
+    def test_predict_clone_mint(self):
+        self.publish(clone=True, mint=True)
+        self.check_predict(clone=True)
+
+
+if __name__ == '__main__':
+    unittest.main()
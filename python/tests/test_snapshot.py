@@ -0,0 +1,93 @@
+# standard imports
+import unittest
+import logging
+
+# external imports
+from chainlib.eth.nonce import (
+    RPCNonceOracle,
+    nonce,
+)
+from chainlib.eth.tx import receipt
+from chainlib.eth.block import block_latest
+from hexathon import strip_0x
+from eth_erc20 import ERC20
+
+# local imports
+from erc20_vend.unittest import (
+    TestVend,
+    TestVendParams,
+)
+from erc20_vend import Vend
+
+
+logging.basicConfig(level=logging.DEBUG)
+logg = logging.getLogger()
+
+
+# Every test changes the chain and checks that it starts from the fixture state,
+# so the tests pass in any order only if the chain is reverted between them.
+class TestVendSnapshot(TestVend):
+
+    snapshot = True
+    fixtures = 0
+
+    def fixture(self):
+        super(TestVendSnapshot, self).fixture()
+        self.__class__.fixtures += 1
+        self.fixture_vend_address = self.vend_address
+        self.fixture_accounts = len(self.accounts)
+        o = block_latest()
+        self.fixture_block = self.rpc.do(o)
+        o = nonce(self.accounts[0])
+        self.fixture_nonce = int(strip_0x(self.rpc.do(o)), 16)
+
+
+    def change(self):
+        self.assertEqual(self.__class__.fixtures, 1)
+        self.assertEqual(self.vend_address, self.fixture_vend_address)
+        self.assertEqual(len(self.accounts), self.fixture_accounts)
+        o = block_latest()
+        self.assertEqual(self.rpc.do(o), self.fixture_block)
+
+        o = nonce(self.accounts[0])
+        self.assertEqual(int(strip_0x(self.rpc.do(o)), 16), self.fixture_nonce)
+
+        nonce_oracle = RPCNonceOracle(self.accounts[0], conn=self.conn)
+        c = Vend(self.chain_spec, signer=self.signer, nonce_oracle=nonce_oracle)
+        (tx_hash, o) = c.create(self.vend_address, self.accounts[0], 'foo vend', 'FOOVEND')
+        self.rpc.do(o)
+        o = receipt(tx_hash)
+        self.assertEqual(self.rpc.do(o)['status'], 1)
+        self.accounts.append(self.vend_address)
+
+
+    def test_change_one(self):
+        self.change()
+
+
+    def test_change_two(self):
+        self.change()
+
+
+    def test_change_three(self):
+        self.change()
+
+
+class TestVendParamsSnapshot(TestVendParams):
+
+    snapshot = True
+
+    def test_decimals(self):
+        nonce_oracle = RPCNonceOracle(self.accounts[0], conn=self.conn)
+        c = Vend(self.chain_spec, signer=self.signer, nonce_oracle=nonce_oracle)
+        (tx_hash, o) = c.create(self.vend_address, self.accounts[0], 'foo vend', 'FOOVEND')
+        self.rpc.do(o)
+        o = c.get_token(self.vend_address, 0, sender_address=self.accounts[0])
+        vended_token_address = c.parse_token(self.rpc.do(o))
+        c = ERC20(self.chain_spec)
+        o = c.decimals(vended_token_address, sender_address=self.accounts[0])
+        self.assertEqual(c.parse_decimals(self.rpc.do(o)), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
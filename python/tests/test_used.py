@@ -0,0 +1,83 @@
+# standard imports
+import unittest
+import logging
+
+# external imports
+import eth_abi
+from chainlib.eth.nonce import RPCNonceOracle
+from chainlib.eth.tx import receipt
+from chainlib.eth.contract import ABIContractType
+from eth_erc20 import ERC20
+from giftable_erc20_token import GiftableToken
+
+# local imports
+from erc20_vend.unittest import TestVend
+from erc20_vend.unittest.base import bytecode_has_method
+from erc20_vend import Vend
+from erc20_vend import calldata
+from erc20_vend.vend import used_withdrawn
+
+
+logging.basicConfig(level=logging.DEBUG)
+logg = logging.getLogger()
+
+
+class TestVendUsedEncode(unittest.TestCase):
+
+    def test_used_by_many(self):
+        holders = ['0x' + '11' * 20, '0x' + '22' * 20, '0x' + '33' * 20]
+        token = '0x' + '44' * 20
+        r = calldata.used_by_many.encode(holders, token)
+        self.assertEqual(r[8:], eth_abi.encode_abi(['address[]', 'address'], [holders, token]).hex())
+
+        c = Vend(None)
+        v = eth_abi.encode_abi(['uint256[]'], [[0, 42, used_withdrawn]]).hex()
+        self.assertEqual(c.parse_used_by_many(v), [0, 42, used_withdrawn])
+
+
+@unittest.skipUnless(bytecode_has_method('usedBy', [ABIContractType.ADDRESS, ABIContractType.ADDRESS]), 'contract artifact has no usage views')
+class TestVendUsed(TestVend):
+
+    def test_used(self):
+        nonce_oracle = RPCNonceOracle(self.accounts[0], conn=self.conn)
+        c = Vend(self.chain_spec, signer=self.signer, nonce_oracle=nonce_oracle)
+        (tx_hash, o) = c.create(self.vend_address, self.accounts[0], 'foo vend', 'FOOVEND')
+        self.rpc.do(o)
+        o = c.get_token(self.vend_address, 0, sender_address=self.accounts[0])
+        vended_token_address = c.parse_token(self.rpc.do(o))
+
+        src_amount = 100 * (10 ** self.token_decimals)
+        c = GiftableToken(self.chain_spec, signer=self.signer, nonce_oracle=nonce_oracle)
+        (tx_hash, o) = c.mint_to(self.token_address, self.accounts[0], self.alice, src_amount)
+        self.rpc.do(o)
+
+        nonce_oracle = RPCNonceOracle(self.alice, conn=self.conn)
+        c_token = ERC20(self.chain_spec, signer=self.signer, nonce_oracle=nonce_oracle)
+        (tx_hash, o) = c_token.approve(self.token_address, self.alice, self.vend_address, src_amount)
+        self.rpc.do(o)
+        c = Vend(self.chain_spec, signer=self.signer, nonce_oracle=nonce_oracle)
+        o = c.used_by(self.vend_address, self.alice, vended_token_address, sender_address=self.accounts[0])
+        self.assertEqual(c.parse_used_by(self.rpc.do(o)), 0)
+
+        (tx_hash, o) = c.deposit(self.vend_address, self.alice, vended_token_address)
+        self.rpc.do(o)
+        o = c.used_by(self.vend_address, self.alice, vended_token_address, sender_address=self.accounts[0])
+        self.assertEqual(c.parse_used_by(self.rpc.do(o)), src_amount)
+
+        (tx_hash, o) = c_token.approve(vended_token_address, self.alice, self.vend_address, 100)
+        self.rpc.do(o)
+        (tx_hash, o) = c.withdraw(self.vend_address, self.alice, vended_token_address)
+        self.rpc.do(o)
+        o = receipt(tx_hash)
+        r = self.rpc.do(o)
+        self.assertEqual(r['status'], 1)
+
+        o = c.used_by_many(self.vend_address, [self.alice, self.bob], vended_token_address, sender_address=self.accounts[0])
+        self.assertEqual(c.parse_used_by_many(self.rpc.do(o)), [used_withdrawn, 0])
+
+        o = c.returned(self.vend_address, vended_token_address, sender_address=self.accounts[0])
+        self.assertEqual(c.parse_returned(self.rpc.do(o)), 100)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,7 +1,7 @@
 pragma solidity >=0.8.0;
 
 // SPDX-License-Identifier: AGPL-3.0-or-later
-// File-Version: 3
+// File-Version: 5
 
 contract GiftableToken {
 
@@ -31,6 +31,10 @@ contract GiftableToken {
 	uint256 public expires;
 	bool expired;
 
+	// Set by the constructor and by initialize, so that neither a deployed token
+	// nor a clone can be initialized again, whatever its owner is later set to.
+	bool initialized;
+
 	// Implements ERC20
 	event Transfer(address indexed _from, address indexed _to, uint256 _value);
 	// Implements ERC20
@@ -58,6 +62,20 @@ contract GiftableToken {
 		symbol = _symbol;
 		decimals = _decimals;
 		expires = _expireTimestamp;
+		initialized = true;
+	}
+
+	// Set up a minimal proxy clone of this contract, taking the place of the constructor.
+	// Can only be called once on a clone, and never on a contract deployed with the constructor,
+	// including the clone implementation itself.
+	function initialize(string memory _name, string memory _symbol, uint8 _decimals, uint256 _expireTimestamp) public {
+		require(!initialized, "ERR_INITIALIZED");
+		initialized = true;
+		owner = msg.sender;
+		name = _name;
+		symbol = _symbol;
+		decimals = _decimals;
+		expires = _expireTimestamp;
 	}
 
 	// Implements ERC20
@@ -0,0 +1,26 @@
+pragma solidity ^0.8.0;
+
+// Author:	Louis Holbrook <dev@holbrook.no> 0826EDA1702D1E87C6E2875121D2E7BB88C2A746
+// SPDX-License-Identifier: AGPL-3.0-or-later
+// File-Version: 1
+// Description: Aggregate read-only calls to several contracts in a single call.
+
+contract VendMulticall {
+
+	// Call each target with the input data at the same position.
+	// A failed call does not revert the aggregate, but is reported in the success array.
+	function aggregate(address[] calldata _targets, bytes[] calldata _data) public view returns (uint256, bool[] memory, bytes[] memory) {
+		bool[] memory l_success;
+		bytes[] memory l_result;
+		uint256 i;
+
+		require(_targets.length == _data.length, "ERR_LENGTH");
+
+		l_success = new bool[](_targets.length);
+		l_result = new bytes[](_targets.length);
+		for (i = 0; i < _targets.length; i++) {
+			(l_success[i], l_result[i]) = _targets[i].staticcall(_data[i]);
+		}
+		return (block.number, l_success, l_result);
+	}
+}
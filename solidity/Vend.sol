@@ -2,7 +2,7 @@ pragma solidity ^0.8.0;
 
 // Author:	Louis Holbrook <dev@holbrook.no> 0826EDA1702D1E87C6E2875121D2E7BB88C2A746
 // SPDX-License-Identifier: AGPL-3.0-or-later
-// File-Version: 1
+// File-Version: 8
 // Description: Create and vend ERC20 voting tokens in exchange for a held ERC20 token.
 
 import "GiftableToken.sol";
@@ -18,16 +18,23 @@ contract ERC20Vend {
 	uint8 decimals;
 	uint256 supply;
 	uint256 decimalDivisor;
-	mapping ( address => uint256 ) returned;
+	// Vended tokens returned to the contract on withdraw, by token.
+	mapping ( address => uint256 ) public returned;
 	GiftableToken[] vendToken;
+	// Tokens created by this contract, which are the only tokens distribute may pay out.
+	mapping ( address => bool ) isVendToken;
 	mapping ( address => mapping ( address => uint256 ) ) used;
 
 	mapping(address => bool) writers;
 
+	// Implementation that vended tokens are minimal proxy clones of.
+	// Zero address if every vended token is a full contract deployment.
+	address public tokenImplementation;
+
 	event TokenCreated(uint256 indexed _idx, uint256 indexed _supply, address _token);
 	event Mint(address indexed _minter, address indexed _beneficiary, address indexed _token, uint256 value);
 
-	constructor(address _defaultToken, uint8 _decimals, bool _mint) {
+	constructor(address _defaultToken, uint8 _decimals, bool _mint, bool _clone) {
 		bool r;
 		bytes memory v;
 
@@ -50,6 +57,10 @@ contract ERC20Vend {
 			decimalDivisor = 1;
 		}
 		owner = msg.sender;
+
+		if (_clone) {
+			tokenImplementation = address(new GiftableToken("", "", _decimals, 0));
+		}
 	}
 
 	// Implements Writer
@@ -76,16 +87,84 @@ contract ERC20Vend {
 		return address(vendToken[_idx]);
 	}
 
+	// Number of vended tokens created.
+	function tokenCount() public view returns(uint256) {
+		return vendToken.length;
+	}
+
+	// Held token balance locked by the holder for the vended token.
+	// Zero if not yet deposited, UINT256_MAX if withdrawn.
+	function usedBy(address _holder, address _token) public view returns(uint256) {
+		return used[_holder][_token];
+	}
+
+	// Batch version of usedBy for many holders of the same vended token.
+	function usedByMany(address[] calldata _holders, address _token) public view returns(uint256[] memory) {
+		uint256[] memory l_used;
+		uint256 i;
+
+		l_used = new uint256[](_holders.length);
+		for (i = 0; i < _holders.length; i++) {
+			l_used[i] = used[_holders[i]][_token];
+		}
+		return l_used;
+	}
+
+	// Retrieve a page of vended token addresses starting at the given index.
+	// The page is truncated at the end of the token list.
+	function getTokens(uint256 _start, uint256 _count) public view returns(address[] memory) {
+		address[] memory l_tokens;
+		uint256 i;
+
+		if (_start >= vendToken.length) {
+			return l_tokens;
+		}
+		if (_count > vendToken.length - _start) {
+			_count = vendToken.length - _start;
+		}
+		l_tokens = new address[](_count);
+		for (i = 0; i < _count; i++) {
+			l_tokens[i] = address(vendToken[_start + i]);
+		}
+		return l_tokens;
+	}
+
 	// Create a new vended token.
 	function create(string calldata _name, string calldata _symbol) public returns (address) {
+		return createToken(_name, _symbol);
+	}
+
+	// Create one vended token for each name and symbol pair, in order.
+	// The number of tokens per transaction is bounded by the block gas limit.
+	function createMany(string[] calldata _names, string[] calldata _symbols) public returns (address[] memory) {
+		address[] memory l_tokens;
+		uint256 i;
+
+		require(_names.length == _symbols.length, "ERR_LENGTH");
+		l_tokens = new address[](_names.length);
+		for (i = 0; i < _names.length; i++) {
+			l_tokens[i] = createToken(_names[i], _symbols[i]);
+		}
+		return l_tokens;
+	}
+
+	// Vended tokens (and the clone implementation) must be the only contracts this contract
+	// creates, so that token addresses can be derived off-chain from the token index.
+	function createToken(string calldata _name, string calldata _symbol) private returns (address) {
 		GiftableToken l_contract;
 		address l_address;
 		uint256 l_idx;
 	
-		l_contract = new GiftableToken(_name, _symbol, decimals, 0);
+		if (tokenImplementation == address(0)) {
+			l_contract = new GiftableToken(_name, _symbol, decimals, 0);
+		} else {
+			l_contract = GiftableToken(cloneToken());
+			l_contract.initialize(_name, _symbol, decimals, 0);
+		}
 		l_address = address(l_contract);
 		l_idx = vendToken.length;
 		vendToken.push(l_contract);
+		isVendToken[l_address] = true;
 
 		if (supply > 0) {
 			l_contract.mintTo(address(this), supply);
@@ -95,12 +174,29 @@ contract ERC20Vend {
 		return l_address;
 	}
 
+	// Deploy an EIP1167 minimal proxy delegating to the token implementation.
+	// Uses no opcodes later than byzantium.
+	function cloneToken() private returns (address) {
+		bytes20 l_target;
+		address l_clone;
+
+		l_target = bytes20(tokenImplementation);
+		assembly {
+			let l_code := mload(0x40)
+			mstore(l_code, 0x3d602d80600a3d3981f3363d3d373d3d3d363d73000000000000000000000000)
+			mstore(add(l_code, 0x14), l_target)
+			mstore(add(l_code, 0x28), 0x5af43d82803e903d91602b57fd5bf30000000000000000000000000000000000)
+			l_clone := create(0, l_code, 0x37)
+		}
+		require(l_clone != address(0), "ERR_CLONE");
+		return l_clone;
+	}
+
 	// Receive the vended token for the currently held balance.
 	function deposit(address _token, uint256 _value) public returns (uint256) {
 		GiftableToken l_token;
 		bool r;
 		bytes memory v;
-		uint256 l_ratioedValue;
 		uint256 l_controlBalance;
 
 		l_token = GiftableToken(_token);
@@ -124,25 +220,84 @@ contract ERC20Vend {
 		require(r, "ERR_TOKEN");
 		r = abi.decode(v, (bool));
 		require(r, "ERR_TOKEN_TRANSFER");
-		used[msg.sender][address(l_token)] = l_controlBalance;
+		return vend(l_token, l_controlBalance);
+	}
 
-		if (decimalDivisor == 0) {
-			l_ratioedValue = l_controlBalance;
-		} else {
-			l_ratioedValue = l_controlBalance / decimalDivisor;
+	// Receive several vended tokens for explicit held token amounts, with a single transfer of the total.
+	function depositMany(address[] calldata _tokens, uint256[] calldata _values) public returns (uint256[] memory) {
+		bool r;
+		bytes memory v;
+		uint256[] memory l_vended;
+		uint256 l_total;
+		uint256 i;
+
+		require(_tokens.length == _values.length, "ERR_LENGTH");
+		for (i = 0; i < _values.length; i++) {
+			require(_values[i] > 0, "ERR_VALUE");
+			l_total += _values[i];
+		}
+
+		(r, v) = defaultToken.call(abi.encodeWithSignature("transferFrom(address,address,uint256)", msg.sender, this, l_total));
+		require(r, "ERR_TOKEN");
+		r = abi.decode(v, (bool));
+		require(r, "ERR_TOKEN_TRANSFER");
+
+		l_vended = new uint256[](_tokens.length);
+		for (i = 0; i < _tokens.length; i++) {
+			require(used[msg.sender][_tokens[i]] == 0, "ERR_USED");
+			l_vended[i] = vend(GiftableToken(_tokens[i]), _values[i]);
 		}
+		return l_vended;
+	}
+
+	// Lock the held token amount already transferred from the sender, and send the vended token for it.
+	function vend(GiftableToken _token, uint256 _value) private returns (uint256) {
+		uint256 l_ratioedValue;
+
+		used[msg.sender][address(_token)] = _value;
+		l_ratioedValue = _value / decimalDivisor;
+		send(_token, msg.sender, l_ratioedValue);
+		return l_ratioedValue;
+	}
+
+	// Vend tokens to holders for a snapshot of their held token balances, without locking any held tokens.
+	// Holders that already deposited or were distributed to are skipped, so a page can safely be sent again.
+	// Distributed holders are marked as withdrawn, and can neither deposit nor withdraw for the token.
+	function distribute(address _token, address[] calldata _holders, uint256[] calldata _values) public returns (uint256) {
+		uint256 l_ratioedValue;
+		uint256 l_total;
+		uint256 i;
+
+		require(isWriter(msg.sender));
+		require(isVendToken[_token], "ERR_TOKEN_UNKNOWN");
+		require(_holders.length == _values.length, "ERR_LENGTH");
+		for (i = 0; i < _holders.length; i++) {
+			if (used[_holders[i]][_token] > 0) {
+				continue;
+			}
+			used[_holders[i]][_token] = UINT256_MAX;
+			l_ratioedValue = _values[i] / decimalDivisor;
+			send(GiftableToken(_token), _holders[i], l_ratioedValue);
+			l_total += l_ratioedValue;
+		}
+		return l_total;
+	}
+
+	// Mint the vended token to the recipient, or transfer it from the supply held by this contract.
+	function send(GiftableToken _token, address _recipient, uint256 _value) private {
+		bool r;
+		bytes memory v;
 
 		if (supply == 0) {
-			if (!l_token.mintTo(msg.sender, l_ratioedValue)) {
+			if (!_token.mintTo(_recipient, _value)) {
 				revert("ERR_MINT");
 			}
 		} else {
-			(r, v) = _token.call(abi.encodeWithSignature("transfer(address,uint256)", msg.sender, l_ratioedValue));
+			(r, v) = address(_token).call(abi.encodeWithSignature("transfer(address,uint256)", _recipient, _value));
 			require(r, "ERR_TOKEN");
 			r = abi.decode(v, (bool));
 			require(r, "ERR_VEND_TOKEN_TRANSFER");
 		}
-		return l_ratioedValue;
 	}
 
 	// If contract locks exchanged tokens, this can be called to retrieve the locked tokens.
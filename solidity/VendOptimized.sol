@@ -0,0 +1,404 @@
+pragma solidity ^0.8.0;
+
+// Author:	Louis Holbrook <dev@holbrook.no> 0826EDA1702D1E87C6E2875121D2E7BB88C2A746
+// SPDX-License-Identifier: AGPL-3.0-or-later
+// File-Version: 3
+// Description: Gas optimized ERC20Vend, with the same interface and behavior as Vend.sol File-Version 8.
+
+import "GiftableToken.sol";
+
+interface IERC20Held {
+	function decimals() external view returns (uint8);
+	function totalSupply() external view returns (uint256);
+	function balanceOf(address _holder) external view returns (uint256);
+	function transfer(address _to, uint256 _value) external returns (bool);
+	function transferFrom(address _from, address _to, uint256 _value) external returns (bool);
+}
+
+// Values fixed by the constructor are immutables in the contract code, so no storage
+// is read for them on deposit and withdraw. Held token calls, and vended token calls that
+// Vend.sol makes as low-level calls, are typed interface calls with the same revert reasons.
+contract ERC20VendOptimized {
+	uint256 constant UINT256_MAX = 0xffffffffffffffffffffffffffffffffffffffffffffffffffffffffffffffff;
+
+	address immutable owner;
+
+	// Implements TokenSwap
+	address public immutable defaultToken;
+
+	uint8 immutable decimals;
+	uint256 immutable supply;
+	// At least 1, set by the constructor.
+	uint256 immutable decimalDivisor;
+
+	// Implementation that vended tokens are minimal proxy clones of.
+	// Zero address if every vended token is a full contract deployment.
+	address public immutable tokenImplementation;
+
+	// Vended tokens returned to the contract on withdraw, by token.
+	mapping ( address => uint256 ) public returned;
+	GiftableToken[] vendToken;
+	// Tokens created by this contract, which are the only tokens distribute may pay out.
+	mapping ( address => bool ) isVendToken;
+	mapping ( address => mapping ( address => uint256 ) ) used;
+
+	mapping(address => bool) writers;
+
+	event TokenCreated(uint256 indexed _idx, uint256 indexed _supply, address _token);
+	event Mint(address indexed _minter, address indexed _beneficiary, address indexed _token, uint256 value);
+
+	constructor(address _defaultToken, uint8 _decimals, bool _mint, bool _clone) {
+		uint8 l_controlDecimals;
+		uint256 l_supply;
+		uint256 l_decimalDivisor;
+		address l_implementation;
+
+		defaultToken = _defaultToken;
+		decimals = _decimals;
+
+		try IERC20Held(_defaultToken).decimals() returns (uint8 v) {
+			l_controlDecimals = v;
+		} catch {
+			revert("ERR_TOKEN");
+		}
+		require(l_controlDecimals >= _decimals);
+
+		if (!_mint) {
+			try IERC20Held(_defaultToken).totalSupply() returns (uint256 v) {
+				l_supply = v;
+			} catch {
+				revert("ERR_TOKEN");
+			}
+		}
+		supply = l_supply;
+
+		l_decimalDivisor = (10 ** (l_controlDecimals - _decimals));
+		if (l_decimalDivisor == 0) {
+			l_decimalDivisor = 1;
+		}
+		decimalDivisor = l_decimalDivisor;
+		owner = msg.sender;
+
+		if (_clone) {
+			l_implementation = address(new GiftableToken("", "", _decimals, 0));
+		}
+		tokenImplementation = l_implementation;
+	}
+
+	// Implements Writer
+	function addWriter(address _minter) public returns (bool) {
+		require(msg.sender == owner);
+		writers[_minter] = true;
+		return true;
+	}
+
+	// Implements Writer
+	function deleteWriter(address _minter) public returns (bool) {
+		require(msg.sender == owner || msg.sender == _minter);
+		writers[_minter] = false;
+		return true;
+	}
+
+	// Implements Writer
+	function isWriter(address _minter) public view returns(bool) {
+		return writers[_minter] || _minter == owner;
+	}
+
+	// Retrieve address of vended token by sequential index.
+	function getTokenByIndex(uint256 _idx) public view returns(address) {
+		return address(vendToken[_idx]);
+	}
+
+	// Number of vended tokens created.
+	function tokenCount() public view returns(uint256) {
+		return vendToken.length;
+	}
+
+	// Held token balance locked by the holder for the vended token.
+	// Zero if not yet deposited, UINT256_MAX if withdrawn.
+	function usedBy(address _holder, address _token) public view returns(uint256) {
+		return used[_holder][_token];
+	}
+
+	// Batch version of usedBy for many holders of the same vended token.
+	function usedByMany(address[] calldata _holders, address _token) public view returns(uint256[] memory) {
+		uint256[] memory l_used;
+		uint256 i;
+
+		l_used = new uint256[](_holders.length);
+		for (i = 0; i < _holders.length; ) {
+			l_used[i] = used[_holders[i]][_token];
+			unchecked { i++; }
+		}
+		return l_used;
+	}
+
+	// Retrieve a page of vended token addresses starting at the given index.
+	// The page is truncated at the end of the token list.
+	function getTokens(uint256 _start, uint256 _count) public view returns(address[] memory) {
+		address[] memory l_tokens;
+		uint256 l_length;
+		uint256 i;
+
+		l_length = vendToken.length;
+		if (_start >= l_length) {
+			return l_tokens;
+		}
+		if (_count > l_length - _start) {
+			_count = l_length - _start;
+		}
+		l_tokens = new address[](_count);
+		for (i = 0; i < _count; ) {
+			l_tokens[i] = address(vendToken[_start + i]);
+			unchecked { i++; }
+		}
+		return l_tokens;
+	}
+
+	// Create a new vended token.
+	function create(string calldata _name, string calldata _symbol) public returns (address) {
+		return createToken(_name, _symbol);
+	}
+
+	// Create one vended token for each name and symbol pair, in order.
+	// The number of tokens per transaction is bounded by the block gas limit.
+	function createMany(string[] calldata _names, string[] calldata _symbols) public returns (address[] memory) {
+		address[] memory l_tokens;
+		uint256 i;
+
+		require(_names.length == _symbols.length, "ERR_LENGTH");
+		l_tokens = new address[](_names.length);
+		for (i = 0; i < _names.length; ) {
+			l_tokens[i] = createToken(_names[i], _symbols[i]);
+			unchecked { i++; }
+		}
+		return l_tokens;
+	}
+
+	// Vended tokens (and the clone implementation) must be the only contracts this contract
+	// creates, so that token addresses can be derived off-chain from the token index.
+	function createToken(string calldata _name, string calldata _symbol) private returns (address) {
+		GiftableToken l_contract;
+		address l_address;
+		uint256 l_idx;
+		uint256 l_supply;
+
+		if (tokenImplementation == address(0)) {
+			l_contract = new GiftableToken(_name, _symbol, decimals, 0);
+		} else {
+			l_contract = GiftableToken(cloneToken());
+			l_contract.initialize(_name, _symbol, decimals, 0);
+		}
+		l_address = address(l_contract);
+		l_idx = vendToken.length;
+		vendToken.push(l_contract);
+		isVendToken[l_address] = true;
+
+		l_supply = supply;
+		if (l_supply > 0) {
+			l_contract.mintTo(address(this), l_supply);
+		}
+		emit TokenCreated(l_idx, l_supply, l_address);
+		emit Mint(msg.sender, msg.sender, l_address, l_supply);
+		return l_address;
+	}
+
+	// Deploy an EIP1167 minimal proxy delegating to the token implementation.
+	// Uses no opcodes later than byzantium.
+	function cloneToken() private returns (address) {
+		bytes20 l_target;
+		address l_clone;
+
+		l_target = bytes20(tokenImplementation);
+		assembly {
+			let l_code := mload(0x40)
+			mstore(l_code, 0x3d602d80600a3d3981f3363d3d373d3d3d363d73000000000000000000000000)
+			mstore(add(l_code, 0x14), l_target)
+			mstore(add(l_code, 0x28), 0x5af43d82803e903d91602b57fd5bf30000000000000000000000000000000000)
+			l_clone := create(0, l_code, 0x37)
+		}
+		require(l_clone != address(0), "ERR_CLONE");
+		return l_clone;
+	}
+
+	// Receive the vended token for the currently held balance.
+	function deposit(address _token, uint256 _value) public returns (uint256) {
+		uint256 l_controlBalance;
+
+		require(used[msg.sender][_token] == 0, "ERR_USED");
+
+		if (_value > 0) {
+			l_controlBalance = _value;
+		} else {
+			l_controlBalance = tokenBalance(defaultToken, msg.sender);
+			require(l_controlBalance < UINT256_MAX, "ERR_VALUE_TOO_HIGH");
+			if (l_controlBalance == 0) {
+				return 0;
+			}
+		}
+
+		transferTokenFrom(defaultToken, msg.sender, l_controlBalance, "ERR_TOKEN_TRANSFER");
+		return vend(GiftableToken(_token), l_controlBalance);
+	}
+
+	// Receive several vended tokens for explicit held token amounts, with a single transfer of the total.
+	function depositMany(address[] calldata _tokens, uint256[] calldata _values) public returns (uint256[] memory) {
+		uint256[] memory l_vended;
+		uint256 l_total;
+		uint256 i;
+
+		require(_tokens.length == _values.length, "ERR_LENGTH");
+		for (i = 0; i < _values.length; ) {
+			require(_values[i] > 0, "ERR_VALUE");
+			l_total += _values[i];
+			unchecked { i++; }
+		}
+
+		transferTokenFrom(defaultToken, msg.sender, l_total, "ERR_TOKEN_TRANSFER");
+
+		l_vended = new uint256[](_tokens.length);
+		for (i = 0; i < _tokens.length; ) {
+			require(used[msg.sender][_tokens[i]] == 0, "ERR_USED");
+			l_vended[i] = vend(GiftableToken(_tokens[i]), _values[i]);
+			unchecked { i++; }
+		}
+		return l_vended;
+	}
+
+	// Lock the held token amount already transferred from the sender, and send the vended token for it.
+	function vend(GiftableToken _token, uint256 _value) private returns (uint256) {
+		uint256 l_ratioedValue;
+
+		used[msg.sender][address(_token)] = _value;
+		l_ratioedValue = _value / decimalDivisor;
+		send(_token, msg.sender, l_ratioedValue);
+		return l_ratioedValue;
+	}
+
+	// Vend tokens to holders for a snapshot of their held token balances, without locking any held tokens.
+	// Holders that already deposited or were distributed to are skipped, so a page can safely be sent again.
+	// Distributed holders are marked as withdrawn, and can neither deposit nor withdraw for the token.
+	function distribute(address _token, address[] calldata _holders, uint256[] calldata _values) public returns (uint256) {
+		uint256 l_ratioedValue;
+		uint256 l_total;
+		uint256 i;
+
+		require(isWriter(msg.sender));
+		require(isVendToken[_token], "ERR_TOKEN_UNKNOWN");
+		require(_holders.length == _values.length, "ERR_LENGTH");
+		for (i = 0; i < _holders.length; ) {
+			if (used[_holders[i]][_token] == 0) {
+				used[_holders[i]][_token] = UINT256_MAX;
+				l_ratioedValue = _values[i] / decimalDivisor;
+				send(GiftableToken(_token), _holders[i], l_ratioedValue);
+				l_total += l_ratioedValue;
+			}
+			unchecked { i++; }
+		}
+		return l_total;
+	}
+
+	// Mint the vended token to the recipient, or transfer it from the supply held by this contract.
+	function send(GiftableToken _token, address _recipient, uint256 _value) private {
+		if (supply == 0) {
+			require(_token.mintTo(_recipient, _value), "ERR_MINT");
+		} else {
+			transferToken(address(_token), _recipient, _value, "ERR_VEND_TOKEN_TRANSFER");
+		}
+	}
+
+	// Token calls revert with ERR_TOKEN if the call fails, as the low-level calls of Vend.sol do.
+	function tokenBalance(address _token, address _holder) private view returns (uint256) {
+		try IERC20Held(_token).balanceOf(_holder) returns (uint256 v) {
+			return v;
+		} catch {
+			revert("ERR_TOKEN");
+		}
+	}
+
+	// Transfer methods revert with the given reason if they return false.
+	function transferToken(address _token, address _to, uint256 _value, string memory _reason) private {
+		try IERC20Held(_token).transfer(_to, _value) returns (bool r) {
+			require(r, _reason);
+		} catch {
+			revert("ERR_TOKEN");
+		}
+	}
+
+	function transferTokenFrom(address _token, address _from, uint256 _value, string memory _reason) private {
+		try IERC20Held(_token).transferFrom(_from, address(this), _value) returns (bool r) {
+			require(r, _reason);
+		} catch {
+			revert("ERR_TOKEN");
+		}
+	}
+
+	// If contract locks exchanged tokens, this can be called to retrieve the locked tokens.
+	// The vended token balance MUST match the original balance emitted on the exchange.
+	// The caller must have given allowance for the full amount.
+	function withdraw(address _token, uint256 _value) public returns (uint256) {
+		uint256 l_balance;
+		uint256 l_vendBalance;
+
+		if (_token == defaultToken) {
+			return deposit(_token, _value);
+		}
+
+		l_balance = used[msg.sender][_token];
+		if (l_balance == 0) {
+			return 0;
+		}
+		require(l_balance < UINT256_MAX, "ERR_ALREADY_WITHDRAWN");
+		l_vendBalance = checkLock(_token, msg.sender, l_balance);
+		used[msg.sender][_token] = UINT256_MAX;
+
+		if (l_vendBalance == UINT256_MAX) {
+			return 0;
+		}
+
+		if (_value > 0) {
+			require(l_vendBalance == _value, "ERR_VALUE_MISMATCH");
+		}
+
+		transferTokenFrom(_token, msg.sender, l_vendBalance, "ERR_TOKEN_TRANSFER");
+		returned[_token] += l_vendBalance;
+
+		transferToken(defaultToken, msg.sender, l_balance, "ERR_TOKEN_TRANSFER");
+
+		return l_balance;
+	}
+
+	// Implements TokenSwap
+	// Will always revert, as sync swap is not valid in this implementation.
+	function withdraw(address _outToken, address _inToken, uint256 _value) public pure returns (uint256) {
+		_outToken;
+		_inToken;
+		_value;
+		require(1 == 0, "ERR_NO_SYNC_SWAP");
+		return 0;
+	}
+
+	// returns UINT256_MAX if lock is inactive
+	// reverts if target does not have the original balance
+	function checkLock(address _token, address _target, uint256 _heldBalance) private view returns (uint256) {
+		uint256 l_currentBalance;
+
+		l_currentBalance = tokenBalance(_token, _target);
+		require(l_currentBalance * decimalDivisor == _heldBalance, "ERR_LOCKED");
+		return l_currentBalance;
+	}
+
+	// Implements EIP165
+	function supportsInterface(bytes4 _sum) public pure returns (bool) {
+		if (_sum == 0x01ffc9a7) { // EIP165
+			return true;
+		}
+		if (_sum == 0xabe1f1f5) { // Writer
+			return true;
+		}
+		if (_sum == 0x4146b765) { // TokenSwap
+			return true;
+		}
+		return false;
+	}
+}